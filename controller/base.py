@@ -0,0 +1,71 @@
+"""
+Abstract base class for the controller component of a typing game.
+
+Kept apart from the keyboard controller so controllers that don't read the
+keyboard, such as bots, can be used without importing pygame.
+"""
+
+from abc import ABC, abstractmethod
+from controller.input_queue import InputQueue
+
+
+class TypeRaceController(ABC):
+    """
+    Abstract base class for a typing game's controller.
+
+    This class provides an interface for handling player input
+    and updating the game state. Subclasses must implement
+    the `poll` method to collect input into the input queue, and the
+    `typechecker` method to apply it to the player each tick.
+
+    Attributes:
+        _player: Instance of TypeRacePlayer associated with the controller
+        _queue: InputQueue of input collected but not yet applied
+    """
+
+    def __init__(self, player, queue=None):
+        """
+        Initialize the TypeRaceController with a reference to the player or
+        game logic.
+
+        Args:
+            player: An object representing the player or game state manager.
+            queue: InputQueue to collect input in. Defaults to a queue that
+                stamps input with the player's clock.
+        """
+        self._player = player
+        self._queue = InputQueue(player.clock) if queue is None else queue
+
+    @property
+    def player(self):
+        """
+        Return the player or game logic object associated with this controller.
+
+        Returns:
+            The player or game state object.
+        """
+        return self._player
+
+    @property
+    def queue(self):
+        """Get the InputQueue of input collected but not yet applied"""
+        return self._queue
+
+    @abstractmethod
+    def poll(self):
+        """
+        Abstract method for collecting input.
+
+        Subclasses must implement this method to put new input in the queue,
+        stamped with the time it happened. It can be called more often than
+        typechecker so input is stamped close to when it happened.
+        """
+
+    @abstractmethod
+    def typechecker(self):
+        """
+        Abstract method for handling user input.
+
+        Subclasses must implement this method to define how user input
+        is processed and how the game state should be updated accordingly.
+        """
@@ -0,0 +1,102 @@
+"""
+A controller that types the prompt by itself, for headless races, load
+testing and benchmarks.
+"""
+
+import random
+import string
+from model.keystrokes import INSERT, BACKSPACE
+from controller.base import TypeRaceController
+
+
+class BotController(TypeRaceController):
+    """
+    Concrete controller that types the player's prompt at a steady speed,
+    making occasional mistakes and correcting them straight away.
+
+    Keystrokes are scheduled on the input queue's clock, so a bot races in
+    real time with a MonotonicClock and as fast as the clock is advanced with
+    a ManualClock.
+
+    Attributes:
+        _interval_ns: int representing the nanoseconds between keystrokes
+        _accuracy: float representing the chance each character is typed
+            correctly
+        _rng: random.Random used to pick mistakes
+        _next_ns: int representing the race time of the next keystroke in
+            nanoseconds
+        _position: int representing how many characters the bot has typed
+        _wrong: bool representing whether the last typed character was a
+            mistake that still needs to be deleted. Mistakes are tracked as
+            keystrokes are queued, so it can run ahead of the player.
+    """
+
+    def __init__(self, player, wpm=80, accuracy=0.97, seed=None, queue=None):
+        """
+        Create a bot to type for a player.
+
+        Args:
+            player: TypeRacePlayer to type for
+            wpm: float representing the typing speed, counting five
+                keystrokes as a word
+            accuracy: float from 0 to 1 representing the chance each
+                character is typed correctly
+            seed: int representing the seed for the bot's mistakes. If not
+                provided, a random seed is used.
+            queue: InputQueue to put the bot's keystrokes in. Defaults to a
+                queue that stamps input with the player's clock.
+        """
+        if wpm <= 0:
+            raise ValueError("The bot's wpm must be greater than zero")
+        super().__init__(player, queue)
+        self._interval_ns = int(60e9 / (wpm * 5))
+        self._accuracy = accuracy
+        self._rng = random.Random(seed)
+        self._next_ns = self._interval_ns
+        self._position = 0
+        self._wrong = False
+
+    def poll(self):
+        """
+        Put every keystroke that is due by now in the input queue, stamped
+        with the exact time the bot meant to make it.
+        """
+        player = self._player
+        start = player.start_time
+        elapsed_ns = self._queue.clock.now_ns() - start
+        prompt = player.prompt_text
+
+        # A mistake in the last character is still corrected
+        while self._next_ns <= elapsed_ns and (
+            self._position < len(prompt) or self._wrong
+        ):
+            if self._wrong:
+                event = (ord("\b"), BACKSPACE, "\b")
+                self._position -= 1
+                self._wrong = False
+            else:
+                char = prompt[self._position]
+                if self._rng.random() >= self._accuracy:
+                    char = self._rng.choice(
+                        string.ascii_lowercase.replace(char, "")
+                    )
+                    self._wrong = True
+                event = (ord(char), INSERT, char)
+                self._position += 1
+            self._queue.put(event, start + self._next_ns)
+            self._next_ns += self._interval_ns
+
+    def typechecker(self):
+        """
+        Apply the keystrokes made up to the time of this tick, sending them
+        to the player in a single batch.
+        """
+        self.poll()
+        edits = []
+        for timestamp, (key, action, edit) in self._queue.take(
+            self._player.clock.now_ns()
+        ):
+            self._player.record_keystroke(key, action, timestamp)
+            edits.append(edit)
+        if edits:
+            self._player.apply_batch(edits)
@@ -1,100 +1,117 @@
 """
 Class definitions for the controller component of a typing game.
 
-Defines abstract and concrete controller classes for managing player input
-and updating the game state based on keyboard interactions.
+Defines the keyboard controller for managing player input and updating the
+game state based on keyboard interactions. The abstract TypeRaceController
+it extends is in controller/base.py.
 """
 
-from abc import ABC, abstractmethod
 import pygame
+from model.keystrokes import INSERT, BACKSPACE, IGNORED
+from controller.base import TypeRaceController
 
 
-class TypeRaceController(ABC):
+class TextController(TypeRaceController):
     """
-    Abstract base class for a typing game's controller.
-
-    This class provides an interface for handling player input
-    and updating the game state. Subclasses must implement
-    the `typechecker` method to define specific input handling behavior.
+    Concrete controller class for handling keyboard input in a typing game.
 
-    Attributes:
-        _player: Instance of TypeRacePlayer associated with the controller
-        _active_string: string representing all text typed by the user
+    Captures typed text, spaces, and backspaces, and sends the edits made
+    since the last tick to the player.
     """
 
-    def __init__(self, player):
-        """
-        Initialize the TypeRaceController with a reference to the player or
-        game logic.
+    # The only events the game reacts to. Everything else (mouse motion,
+    # window focus and so on) is dropped by SDL before it reaches Python.
+    EVENT_TYPES = (pygame.QUIT, pygame.KEYDOWN, pygame.TEXTINPUT)
 
-        Args:
-            player: An object representing the player or game state manager.
+    def __init__(self, player, queue=None):
         """
-        self._player = player
-        self._active_string = ""
+        Create a keyboard controller for a player. The pygame display must
+        already be initialized.
 
-    @property
-    def player(self):
-        """
-        Return the player or game logic object associated with this controller.
-
-        Returns:
-            The player or game state object.
+        Args:
+            player: TypeRacePlayer to send edits to
+            queue: InputQueue to collect input in. Defaults to a queue that
+                stamps input with the player's clock.
         """
-        return self._player
+        super().__init__(player, queue)
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.EVENT_TYPES)
+        pygame.key.start_text_input()
 
-    @abstractmethod
-    def typechecker(self):
+    def poll(self):
         """
-        Abstract method for handling user input.
-
-        Subclasses must implement this method to define how user input
-        is processed and how the game state should be updated accordingly.
+        Drain pygame's event queue into the input queue, stamping every
+        event drained together with the same time.
         """
-
-
-class TextController(TypeRaceController):
-    """
-    Concrete controller class for handling keyboard input in a typing game.
-
-    Captures letter keystrokes, spaces, and backspaces, builds the current
-    input string, and updates the game state based on the typed text.
-    """
+        events = pygame.event.get()
+        if events:
+            self._queue.put_all(events)
 
     def typechecker(self):
         """
-        Handle keyboard events to build the player's active input string.
-
-        Listens for keypress events:
-        - Appends typed alphabet letters to the active input string.
-        - Handles backspace to delete the last character.
-        - Adds a space character when the spacebar is pressed.
-
-        After processing input, updates the player's displayed text.
+        Handle keyboard events and pass the resulting edits to the player.
+
+        Listens for:
+        - Text input, which types every printable character it contains,
+          including punctuation and non-ASCII letters, up to the end of the
+          prompt.
+        - Backspace, which deletes the last character.
+        - Other keypresses, which don't change the text. Keypresses that
+          produce text are left to the text input event that follows them.
+
+        Every keypress is also recorded in the player's keystroke log along
+        with its effect on the typed text, stamped with the time it was
+        collected rather than the time of this tick.
+
+        All edits from this tick are sent to the player in a single batch,
+        and the player is not updated at all if no text was edited.
         """
+        self.poll()
+        player = self._player
+        edits = []
+        # Number of characters typed once this tick's edits are applied
+        typed_length = player.typed_length
+        prompt_length = len(player.prompt_text)
+        start_time = player.start_time
+
+        # Iterate through each 'event' collected up to the time of this tick
+        for timestamp, event in self._queue.take(player.clock.now_ns()):
+            # Keys pressed before the race started count from the start
+            timestamp = max(timestamp, start_time)
+
+            if event.type == pygame.TEXTINPUT:
+                for char in event.text:
+                    if not char.isprintable():
+                        continue
+                    # The model ignores characters past the end of the
+                    # prompt, so they mustn't count towards backspaces
+                    if typed_length >= prompt_length:
+                        player.record_keystroke(ord(char), IGNORED, timestamp)
+                        continue
+                    player.record_keystroke(ord(char), INSERT, timestamp)
+                    edits.append(char)
+                    typed_length += 1
+
+            elif event.type == pygame.KEYDOWN:
+                # If backspace was pressed and the user has previously typed
+                # input, remove the last typed character
+                if event.key == pygame.K_BACKSPACE:
+                    if typed_length > 0:
+                        player.record_keystroke(event.key, BACKSPACE, timestamp)
+                        edits.append("\b")
+                        typed_length -= 1
+                    else:
+                        player.record_keystroke(event.key, IGNORED, timestamp)
+
+                # Any other key that doesn't type text still gets logged for
+                # timing analysis
+                elif not event.unicode or not event.unicode.isprintable():
+                    player.record_keystroke(event.key, IGNORED, timestamp)
 
-        # Iterate through each 'event' recorded by pygame
-        for event in pygame.event.get():
             # If the user closed the game window, set the game_over flag to True
-            if event.type == pygame.QUIT:
-                self._player.game_over = True
+            elif event.type == pygame.QUIT:
+                player.game_over = True
 
-            # If the user pressed a key on the keyboard
-            if event.type == pygame.KEYDOWN:
-                # If the key pressed was a letter, add to active string
-                if event.unicode.lower().isalpha():
-                    self._active_string += event.unicode
-
-                # If backspace was pressed and the user has previously typed
-                # input, remove the last typed input from the active string
-                if (
-                    event.key == pygame.K_BACKSPACE
-                    and len(self._active_string) > 0
-                ):
-                    self._active_string = self._active_string[:-1]
-
-                # If the spacebar was pressed, add a space to the active string
-                if event.key == pygame.K_SPACE:
-                    self._active_string += " "
-        # Update the player with the new active string
-        self._player.update_text(self._active_string)
+        # Send only this tick's edits to the player
+        if edits:
+            player.apply_batch(edits)
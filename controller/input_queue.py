@@ -0,0 +1,94 @@
+"""
+Queue of timestamped input events between the code that collects input and
+the simulation tick that applies it.
+"""
+
+from collections import deque
+from model.clock import MonotonicClock
+from model.latency import LatencyHistogram
+
+
+class InputQueue:
+    """
+    Stamp input events with the time they were collected, and hand them to
+    the simulation in order.
+
+    The events are kept in a deque, whose append and popleft are atomic, so
+    events can be put from one thread and taken from another without a lock.
+
+    Attributes:
+        _events: deque of (timestamp_ns, event) tuples in the order they were
+            put
+        _clock: Clock to stamp events with
+        latency: LatencyHistogram of the time from each event being put until
+            it was taken by the simulation
+    """
+
+    def __init__(self, clock=None):
+        """
+        Create an empty queue.
+
+        Args:
+            clock: Clock to stamp events with. Defaults to a MonotonicClock.
+                It must read the same times as the clock the simulation
+                takes events by.
+        """
+        self._events = deque()
+        self._clock = MonotonicClock() if clock is None else clock
+        self.latency = LatencyHistogram()
+
+    def put(self, event, timestamp=None):
+        """
+        Add an event to the end of the queue.
+
+        Args:
+            event: object describing the input
+            timestamp: int representing when the input happened in
+                nanoseconds. Defaults to now. Timestamps must not decrease.
+        """
+        if timestamp is None:
+            timestamp = self._clock.now_ns()
+        self._events.append((timestamp, event))
+
+    def put_all(self, events, timestamp=None):
+        """
+        Add several events that were collected at the same time to the end
+        of the queue.
+
+        Args:
+            events: iterable of objects describing the input
+            timestamp: int representing when the input was collected in
+                nanoseconds. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = self._clock.now_ns()
+        self._events.extend((timestamp, event) for event in events)
+
+    def take(self, until_ns):
+        """
+        Remove the events that happened at or before a point in time.
+
+        Args:
+            until_ns: int representing the time in nanoseconds to take
+                events up to, usually the time of the current tick
+
+        Returns a list of (timestamp_ns, event) tuples, oldest first.
+        """
+        events = self._events
+        taken = []
+        while events and events[0][0] <= until_ns:
+            taken.append(events.popleft())
+        if taken:
+            now = self._clock.now_ns()
+            for timestamp, _ in taken:
+                self.latency.record(now - timestamp)
+        return taken
+
+    @property
+    def clock(self):
+        """Get the clock events are stamped with"""
+        return self._clock
+
+    def __len__(self):
+        """Return the number of events waiting"""
+        return len(self._events)
@@ -0,0 +1,100 @@
+"""
+Keyboard controller for playing the game in a terminal with curses.
+"""
+
+import curses
+from model.keystrokes import INSERT, BACKSPACE, IGNORED
+from controller.base import TypeRaceController
+
+# Keys that delete the last character. Terminals send one of these for the
+# backspace key, depending on how they are set up.
+BACKSPACE_KEYS = (curses.KEY_BACKSPACE, "\b", "\x7f")
+# Key that ends the race, like closing the window
+ESCAPE = "\x1b"
+
+
+class TerminalController(TypeRaceController):
+    """
+    Concrete controller that reads the keyboard through curses.
+
+    Attributes:
+        _screen: curses window to read keys from
+    """
+
+    def __init__(self, player, screen, queue=None):
+        """
+        Create a terminal keyboard controller for a player.
+
+        Args:
+            player: TypeRacePlayer to send edits to
+            screen: curses window to read keys from, e.g. from open_terminal
+            queue: InputQueue to collect input in. Defaults to a queue that
+                stamps input with the player's clock.
+        """
+        super().__init__(player, queue)
+        self._screen = screen
+        # Return straight away when no key is waiting
+        self._screen.nodelay(True)
+
+    def poll(self):
+        """
+        Read every key waiting in the terminal into the input queue,
+        stamping the keys read together with the same time.
+        """
+        keys = []
+        while True:
+            try:
+                keys.append(self._screen.get_wch())
+            except curses.error:
+                break  # No more keys waiting
+        if keys:
+            self._queue.put_all(keys)
+
+    def typechecker(self):
+        """
+        Handle keys and pass the resulting edits to the player.
+
+        Printable characters are typed up to the end of the prompt,
+        backspace deletes the last character
+        and escape ends the race. Other keys don't change the text, but are
+        still recorded in the player's keystroke log, stamped with the time
+        they were read. All edits from this tick are sent to the player in a
+        single batch.
+        """
+        self.poll()
+        player = self._player
+        edits = []
+        # Number of characters typed once this tick's edits are applied
+        typed_length = player.typed_length
+        prompt_length = len(player.prompt_text)
+        start_time = player.start_time
+
+        for timestamp, key in self._queue.take(player.clock.now_ns()):
+            # Keys pressed before the race started count from the start
+            timestamp = max(timestamp, start_time)
+            # Special keys are ints, characters are strings
+            code = key if isinstance(key, int) else ord(key)
+
+            if key in BACKSPACE_KEYS:
+                if typed_length > 0:
+                    player.record_keystroke(code, BACKSPACE, timestamp)
+                    edits.append("\b")
+                    typed_length -= 1
+                else:
+                    player.record_keystroke(code, IGNORED, timestamp)
+            elif key == ESCAPE:
+                player.game_over = True
+            elif (
+                isinstance(key, str)
+                and key.isprintable()
+                and typed_length < prompt_length
+            ):
+                player.record_keystroke(code, INSERT, timestamp)
+                edits.append(key)
+                typed_length += 1
+            elif key != curses.KEY_RESIZE:
+                player.record_keystroke(code, IGNORED, timestamp)
+
+        # Send only this tick's edits to the player
+        if edits:
+            player.apply_batch(edits)
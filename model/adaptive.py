@@ -0,0 +1,174 @@
+"""
+Generate prompts adapted to the keys a player finds hardest.
+
+Kept apart from model.text_gen because it needs NumPy, which is only
+imported once the adaptive engine is used.
+"""
+
+import random
+import numpy as np
+from model.word_list import words
+
+# Characters are bucketed by code point, matching model.analytics.NUM_CHARS
+NUM_CHARS = 128
+# How much an error rate of 100% adds to a character's difficulty, compared
+# with taking twice as long as the player's average key
+ERROR_WEIGHT = 4.0
+
+
+class AdaptiveGenerator:
+    """
+    Generate prompts weighted toward words containing the characters and
+    bigrams a player is slowest at or mistypes most.
+
+    Every word has a score: 1 plus the difficulty of each of its characters
+    and bigrams. The scores of all words are kept in a vector that is only
+    adjusted for the characters and bigrams whose difficulty changed, and an
+    alias table over the scores lets each word be sampled in O(1), so a
+    prompt of k words costs O(k).
+
+    Attributes:
+        _words: NumPy array of the candidate words
+        _char_counts: int matrix with one row per word and one column per
+            character, counting how often the character appears in the word
+        _bigram_codes: array of every bigram in every word, encoded as
+            first * NUM_CHARS + second
+        _bigram_words: array of the index of the word each bigram is from
+        _char_weights: array of the current difficulty of each character
+        _bigram_weights: array of the current difficulty of each bigram
+        _scores: array of the current score of each word
+        _probability: alias table acceptance probability for each word
+        _alias: alias table fallback word for each word
+    """
+
+    def __init__(self, word_list=None):
+        """
+        Precompute the character and bigram contents of every word. All
+        words start with the same score.
+
+        Args:
+            word_list: list of word strings to choose from. Defaults to the
+                word list in word_list.py.
+        """
+        word_list = words if word_list is None else word_list
+        self._words = np.array(word_list)
+        self._char_counts = np.zeros((len(word_list), NUM_CHARS), np.float64)
+        bigram_codes = []
+        bigram_words = []
+        for i, word in enumerate(word_list):
+            codes = [min(ord(char), NUM_CHARS - 1) for char in word]
+            np.add.at(self._char_counts[i], codes, 1)
+            for first, second in zip(codes, codes[1:]):
+                bigram_codes.append(first * NUM_CHARS + second)
+                bigram_words.append(i)
+        self._bigram_codes = np.array(bigram_codes, np.int64)
+        self._bigram_words = np.array(bigram_words, np.int64)
+        self._char_weights = np.zeros(NUM_CHARS)
+        self._bigram_weights = np.zeros(NUM_CHARS**2)
+        self._scores = np.ones(len(word_list))
+        self._probability = None
+        self._alias = None
+        self._build_alias_table()
+
+    @staticmethod
+    def _difficulty(counts, errors, latency_ns, min_count):
+        """
+        Turn per-key statistics into difficulty weights. A key's difficulty
+        is how much slower than average it is (as a fraction of the average)
+        plus its error rate times ERROR_WEIGHT. Keys seen fewer than
+        min_count times have no difficulty.
+
+        Returns an array of weights.
+        """
+        seen = counts >= max(min_count, 1)
+        weights = np.zeros(len(counts))
+        if not seen.any():
+            return weights
+        mean_latency = latency_ns[seen] / counts[seen]
+        average = latency_ns[seen].sum() / counts[seen].sum()
+        weights[seen] = np.maximum(mean_latency / average - 1, 0)
+        weights[seen] += ERROR_WEIGHT * errors[seen] / counts[seen]
+        return weights
+
+    def update(self, stats, min_count=5):
+        """
+        Reweight the words using a player's latest statistics. Only the
+        scores affected by characters and bigrams whose difficulty changed
+        are recomputed.
+
+        Args:
+            stats: model.analytics.KeyStats for the player
+            min_count: int representing how often a character or bigram must
+                have been typed for its statistics to count
+        """
+        char_weights = self._difficulty(
+            stats.counts, stats.errors, stats.latency_ns, min_count
+        )
+        bigram_weights = self._difficulty(
+            stats.bigram_counts,
+            stats.bigram_errors,
+            stats.bigram_latency_ns,
+            min_count,
+        )
+
+        changed = np.flatnonzero(char_weights != self._char_weights)
+        if len(changed):
+            change = char_weights[changed] - self._char_weights[changed]
+            self._scores += self._char_counts[:, changed] @ change
+            self._char_weights = char_weights
+
+        changed = bigram_weights != self._bigram_weights
+        if changed.any():
+            affected = changed[self._bigram_codes]
+            codes = self._bigram_codes[affected]
+            np.add.at(
+                self._scores,
+                self._bigram_words[affected],
+                bigram_weights[codes] - self._bigram_weights[codes],
+            )
+            self._bigram_weights = bigram_weights
+
+        self._build_alias_table()
+
+    def _build_alias_table(self):
+        """
+        Build a Vose alias table from the word scores so each sample costs
+        one random index and one coin flip.
+        """
+        count = len(self._scores)
+        scaled = self._scores * count / self._scores.sum()
+        probability = np.ones(count)
+        alias = np.arange(count)
+        small = list(np.flatnonzero(scaled < 1))
+        large = list(np.flatnonzero(scaled >= 1))
+        while small and large:
+            less, more = small.pop(), large[-1]
+            probability[less] = scaled[less]
+            alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(large.pop())
+        self._probability = probability
+        self._alias = alias
+
+    def __call__(self, rng=random, num_words=200):
+        """
+        Generate a paragraph weighted toward the player's weak keys.
+
+        Args:
+            rng: random.Random instance (or the random module) to seed the
+                word sampling from
+            num_words: int representing how many words to generate
+
+        Returns a string representing all the words in the paragraph.
+        """
+        sampler = np.random.default_rng(rng.getrandbits(64))
+        picks = sampler.integers(len(self._scores), size=num_words)
+        keep = sampler.random(num_words) < self._probability[picks]
+        picks = np.where(keep, picks, self._alias[picks])
+        return " ".join(self._words[picks])
+
+    @property
+    def scores(self):
+        """Get the score of each word"""
+        return self._scores
@@ -0,0 +1,333 @@
+"""
+Per-key and per-bigram latency and error analytics over keystroke data.
+
+Keystrokes are handled as columns (key, action, time) in NumPy arrays, and
+every statistic is computed with vectorized operations rather than Python
+loops, so a year of replays can be summarized in seconds.
+"""
+
+import numpy as np
+from model.keystrokes import INSERT, BACKSPACE
+from model.replay import read_header
+
+# Characters are bucketed by code point. Anything outside ASCII shares
+# bucket 0, which never appears in a prompt.
+NUM_CHARS = 128
+
+# Layout of one replay record, matching model.replay.RECORD
+RECORD_DTYPE = np.dtype([("delta_us", "<u4"), ("action", "u1"), ("key", "<u4")])
+
+
+def _char_codes(codes):
+    """
+    Map code points to character buckets.
+
+    Args:
+        codes: NumPy array of unicode code points
+
+    Returns a NumPy array of bucket indexes.
+    """
+    return np.where(codes < NUM_CHARS, codes, 0)
+
+
+class KeyStats:
+    """
+    Counts, errors and total latency for every character and bigram.
+
+    Characters are identified by the prompt character the player was meant to
+    type. Bigrams are pairs of prompt characters typed one straight after the
+    other, with index first * NUM_CHARS + second. Latency is the time since
+    the previous keystroke.
+
+    Attributes:
+        counts: array of the number of times each character was typed
+        errors: array of the number of times each character was mistyped
+        latency_ns: array of the total latency in nanoseconds per character
+        bigram_counts: array of the number of times each bigram was typed
+        bigram_errors: array of the number of times the second character of
+            each bigram was mistyped
+        bigram_latency_ns: array of the total latency of the second
+            character of each bigram
+        unreadable: list of (path, reason) tuples of replay files that
+            could not be read, and were left out
+    """
+
+    def __init__(self):
+        """
+        Create empty statistics.
+        """
+        self.counts = np.zeros(NUM_CHARS, np.int64)
+        self.errors = np.zeros(NUM_CHARS, np.int64)
+        self.latency_ns = np.zeros(NUM_CHARS, np.float64)
+        self.bigram_counts = np.zeros(NUM_CHARS**2, np.int64)
+        self.bigram_errors = np.zeros(NUM_CHARS**2, np.int64)
+        self.bigram_latency_ns = np.zeros(NUM_CHARS**2, np.float64)
+        self.unreadable = []
+
+    def add(self, expected, previous, correct, latency_ns, is_bigram):
+        """
+        Add a batch of typed characters.
+
+        Args:
+            expected: array of the prompt character buckets that were meant
+                to be typed
+            previous: array of the prompt character buckets before them
+            correct: bool array of whether each character was typed correctly
+            latency_ns: array of the latency of each character
+            is_bigram: bool array of whether the previous character was typed
+                straight before, making the pair a bigram
+        """
+        wrong = ~correct
+        self.counts += np.bincount(expected, minlength=NUM_CHARS)
+        self.errors += np.bincount(expected, wrong, NUM_CHARS).astype(np.int64)
+        self.latency_ns += np.bincount(expected, latency_ns, NUM_CHARS)
+
+        bigrams = previous[is_bigram] * NUM_CHARS + expected[is_bigram]
+        size = NUM_CHARS**2
+        self.bigram_counts += np.bincount(bigrams, minlength=size)
+        self.bigram_errors += np.bincount(
+            bigrams, wrong[is_bigram], size
+        ).astype(np.int64)
+        self.bigram_latency_ns += np.bincount(
+            bigrams, latency_ns[is_bigram], size
+        )
+
+    def merge(self, other):
+        """
+        Add the statistics of another KeyStats into this one.
+
+        Args:
+            other: KeyStats to add
+        """
+        self.counts += other.counts
+        self.errors += other.errors
+        self.latency_ns += other.latency_ns
+        self.bigram_counts += other.bigram_counts
+        self.bigram_errors += other.bigram_errors
+        self.bigram_latency_ns += other.bigram_latency_ns
+        self.unreadable += other.unreadable
+
+    def error_rates(self):
+        """Return an array of the error rate of each character (NaN if never
+        typed)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.errors / self.counts
+
+    def mean_latencies(self):
+        """Return an array of the mean latency in seconds of each character
+        (NaN if never typed)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.latency_ns / self.counts / 1e9
+
+    def bigram_error_rates(self):
+        """Return an array of the error rate of each bigram (NaN if never
+        typed)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.bigram_errors / self.bigram_counts
+
+    def bigram_mean_latencies(self):
+        """Return an array of the mean latency in seconds of each bigram (NaN
+        if never typed)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.bigram_latency_ns / self.bigram_counts / 1e9
+
+    @staticmethod
+    def _worst(values, counts, number, min_count):
+        """
+        Find the indexes with the highest values among those seen often
+        enough to be meaningful.
+
+        Returns a list of (index, value) tuples, highest value first.
+        """
+        candidates = np.flatnonzero(counts >= max(min_count, 1))
+        order = candidates[np.argsort(values[candidates])[::-1][:number]]
+        return [(int(i), float(values[i])) for i in order]
+
+    def slowest_chars(self, number=5, min_count=5):
+        """
+        Get the characters with the highest mean latency.
+
+        Args:
+            number: int representing how many characters to return
+            min_count: int representing how often a character must have been
+                typed to be included
+
+        Returns a list of (character, seconds) tuples, slowest first.
+        """
+        worst = self._worst(
+            self.mean_latencies(), self.counts, number, min_count
+        )
+        return [(chr(i), value) for i, value in worst]
+
+    def error_prone_chars(self, number=5, min_count=5):
+        """
+        Get the characters with the highest error rate.
+
+        Args:
+            number: int representing how many characters to return
+            min_count: int representing how often a character must have been
+                typed to be included
+
+        Returns a list of (character, error rate) tuples, worst first.
+        """
+        worst = self._worst(self.error_rates(), self.counts, number, min_count)
+        return [(chr(i), value) for i, value in worst if value > 0]
+
+    def slowest_bigrams(self, number=5, min_count=5):
+        """
+        Get the bigrams with the highest mean latency.
+
+        Args:
+            number: int representing how many bigrams to return
+            min_count: int representing how often a bigram must have been
+                typed to be included
+
+        Returns a list of (two character string, seconds) tuples, slowest
+        first.
+        """
+        worst = self._worst(
+            self.bigram_mean_latencies(), self.bigram_counts, number, min_count
+        )
+        return [
+            (chr(i // NUM_CHARS) + chr(i % NUM_CHARS), value)
+            for i, value in worst
+        ]
+
+    def summary(self, number=5):
+        """
+        Describe the player's weakest keys and bigrams.
+
+        Args:
+            number: int representing how many of each to list
+
+        Returns a list of strings, one per line.
+        """
+
+        def show(char):
+            return repr(char) if char.strip() else "space"
+
+        def listing(items):
+            return ", ".join(items) or "none"
+
+        skipped = ""
+        if self.unreadable:
+            skipped = f" ({len(self.unreadable)} unreadable replays skipped)"
+        return [
+            f"{int(self.counts.sum())} characters analyzed{skipped}",
+            "Slowest keys: "
+            + listing(
+                f"{show(c)} {s * 1000:.0f}ms"
+                for c, s in self.slowest_chars(number)
+            ),
+            "Most mistyped: "
+            + listing(
+                f"{show(c)} {rate:.0%}"
+                for c, rate in self.error_prone_chars(number)
+            ),
+            "Slowest pairs: "
+            + listing(
+                f"{pair!r} {s * 1000:.0f}ms"
+                for pair, s in self.slowest_bigrams(number)
+            ),
+        ]
+
+
+def analyze_columns(keys, actions, times, prompt, stats=None):
+    """
+    Compute statistics for one race from its keystroke columns.
+
+    Args:
+        keys: array of the key of each keystroke (code point for inserts)
+        actions: array of the action of each keystroke
+        times: array of the time of each keystroke in nanoseconds since the
+            start of the race
+        prompt: string representing the race's prompt
+        stats: KeyStats to add to. If not provided, a new one is created.
+
+    Returns the KeyStats.
+    """
+    stats = KeyStats() if stats is None else stats
+    keys = np.asarray(keys, np.int64)
+    actions = np.asarray(actions)
+    times = np.asarray(times, np.int64)
+    prompt_codes = _char_codes(
+        np.frombuffer(prompt.encode("utf-32-le"), "<u4").astype(np.int64)
+    )
+
+    inserts = actions == INSERT
+    delta = inserts.astype(np.int64) - (actions == BACKSPACE)
+    # Caret position before each keystroke
+    position = np.cumsum(delta) - delta
+    latency = np.diff(times, prepend=0)
+
+    # A bigram is an insert straight after an insert at the previous position
+    after_insert = np.concatenate(([False], inserts[:-1]))
+    follows = np.concatenate(([False], position[1:] == position[:-1] + 1))
+    bigram = inserts & after_insert & follows & (position > 0)
+
+    typed = inserts & (position < len(prompt_codes))
+    position = position[typed]
+    expected = prompt_codes[position]
+    stats.add(
+        expected,
+        prompt_codes[np.maximum(position - 1, 0)],
+        _char_codes(keys[typed]) == expected,
+        latency[typed],
+        bigram[typed],
+    )
+    return stats
+
+
+def analyze_player(player, stats=None):
+    """
+    Compute statistics for the race of a player.
+
+    Args:
+        player: TypeRacePlayer whose keystrokes to analyze
+        stats: KeyStats to add to. If not provided, a new one is created.
+
+    Returns the KeyStats.
+    """
+    log = player.keystrokes
+    times = np.frombuffer(log.times, np.int64) - player.start_time
+    return analyze_columns(
+        np.frombuffer(log.keys, np.uint32),
+        np.frombuffer(log.actions, np.uint8),
+        times,
+        player.prompt_text,
+        stats,
+    )
+
+
+def analyze_replays(paths, stats=None):
+    """
+    Compute statistics over many recorded races. Each replay is read
+    straight into NumPy columns without unpacking records one by one. Files
+    that can't be read are skipped and listed in the KeyStats' unreadable
+    attribute, so one corrupt replay doesn't hide the rest.
+
+    Args:
+        paths: iterable of replay file paths
+        stats: KeyStats to add to. If not provided, a new one is created.
+
+    Returns the KeyStats.
+    """
+    stats = KeyStats() if stats is None else stats
+    for path in paths:
+        try:
+            with open(path, "rb") as file:
+                header, count = read_header(file)
+                records = np.fromfile(file, RECORD_DTYPE, count=count)
+            if len(records) < count:
+                raise ValueError("Replay keystrokes are truncated")
+        except (OSError, ValueError) as e:
+            stats.unreadable.append((path, str(e)))
+            continue
+        analyze_columns(
+            records["key"],
+            records["action"],
+            np.cumsum(records["delta_us"], dtype=np.int64) * 1000,
+            header.prompt,
+            stats,
+        )
+    return stats
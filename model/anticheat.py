@@ -0,0 +1,181 @@
+"""
+Detect cheating from the timing of a player's keystrokes.
+"""
+
+import math
+from array import array
+from model.keystrokes import INSERT, IGNORED
+
+# Intervals longer than this are pauses, not typing, and are left out of the
+# interval statistics
+PAUSE_NS = 2_000_000_000
+# Human keystrokes (even rolled over) are rarely closer together than this
+IMPOSSIBLE_NS = 12_000_000
+# Characters inserted closer together than this look pasted
+PASTE_NS = 2_000_000
+# How many pasted-looking characters in a row count as a paste
+PASTE_RUN = 5
+# A burst is BURST_KEYS keystrokes within BURST_NS (here 25 keys per second,
+# 300 WPM, sustained for a whole second)
+BURST_KEYS = 25
+BURST_NS = 1_000_000_000
+# Typing this regular (standard deviation / mean of the intervals) after
+# REGULAR_MIN_KEYS intervals looks scripted
+REGULAR_CV = 0.15
+REGULAR_MIN_KEYS = 50
+# Confidence at which a player is flagged
+FLAG_CONFIDENCE = 0.8
+
+
+class CheatDetector:
+    """
+    Analyze a stream of keystroke timestamps in O(1) per keystroke and keep
+    a running confidence that the player is cheating.
+
+    Keystrokes that don't edit the text, such as Shift pressed on its own
+    before a capital letter, are left out. Keystrokes collected in the same
+    poll share a timestamp, so intervals of zero are only used to spot
+    pasting, not to judge how fast the player types.
+
+    Signals used:
+    - Intervals between keys that are too short for a human.
+    - Bursts of keys faster than a human can sustain.
+    - Runs of characters that arrive all at once, as when pasting.
+    - Timing that is too regular, as from a script.
+
+    Attributes:
+        _last: int representing the time of the previous keystroke, or None
+        _count: int representing how many intervals are in the statistics
+        _mean: float representing the mean interval in nanoseconds
+        _m2: float representing the sum of squared differences from the mean
+            (Welford's online variance)
+        _impossible: int representing how many intervals were impossibly
+            short
+        _paste_run: int representing the current run of pasted-looking
+            characters
+        _pastes: int representing how many paste-like runs were seen
+        _recent: array ring buffer of the last BURST_KEYS keystroke times
+        _recent_index: int representing the next slot in _recent
+        _keys: int representing the total number of keystrokes seen
+        _bursts: int representing how many burst windows were seen
+        _in_burst: bool representing whether the last keystroke was part of
+            a burst, so one long burst is only counted once
+    """
+
+    def __init__(self):
+        """
+        Create a detector for a new player.
+        """
+        self._last = None
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._impossible = 0
+        self._paste_run = 0
+        self._pastes = 0
+        self._recent = array("q", [0] * BURST_KEYS)
+        self._recent_index = 0
+        self._keys = 0
+        self._bursts = 0
+        self._in_burst = False
+
+    def update(self, timestamp, action):
+        """
+        Add one keystroke.
+
+        Args:
+            timestamp: int representing the time of the keystroke in
+                nanoseconds
+            action: int representing the keystroke action, one of the
+                constants in model.keystrokes
+        """
+        if action == IGNORED:
+            return
+
+        # Burst detection: compare with the keystroke BURST_KEYS ago
+        oldest = self._recent[self._recent_index]
+        self._recent[self._recent_index] = timestamp
+        self._recent_index = (self._recent_index + 1) % BURST_KEYS
+        self._keys += 1
+        burst = self._keys > BURST_KEYS and timestamp - oldest < BURST_NS
+        if burst and not self._in_burst:
+            self._bursts += 1
+        self._in_burst = burst
+
+        if self._last is None:
+            self._last = timestamp
+            return
+        interval = timestamp - self._last
+        self._last = timestamp
+
+        # Paste detection: many characters inserted at once
+        if action == INSERT and interval < PASTE_NS:
+            self._paste_run += 1
+            if self._paste_run == PASTE_RUN:
+                self._pastes += 1
+        else:
+            self._paste_run = 0
+
+        if interval == 0 or interval > PAUSE_NS:
+            return
+        if interval < IMPOSSIBLE_NS:
+            self._impossible += 1
+
+        # Welford's online mean and variance
+        self._count += 1
+        difference = interval - self._mean
+        self._mean += difference / self._count
+        self._m2 += difference * (interval - self._mean)
+
+    @property
+    def regularity(self):
+        """Get the coefficient of variation of the intervals (lower is more
+        regular), or None if there are too few intervals"""
+        if self._count < REGULAR_MIN_KEYS or self._mean <= 0:
+            return None
+        return math.sqrt(self._m2 / (self._count - 1)) / self._mean
+
+    def signals(self):
+        """
+        Score each cheating signal from 0 (human) to 1 (certainly cheating).
+
+        Returns a dict mapping the signal name to its score.
+        """
+        fast = self._impossible / self._count if self._count else 0.0
+        regularity = self.regularity
+        return {
+            "impossible intervals": min(1.0, fast * 5),
+            "bursts": min(1.0, self._bursts / 2),
+            "pasting": min(1.0, float(self._pastes)),
+            "regular timing": (
+                0.0
+                if regularity is None
+                else min(1.0, max(0.0, (REGULAR_CV - regularity) / 0.1))
+            ),
+        }
+
+    @property
+    def confidence(self):
+        """Get the confidence from 0 to 1 that the player is cheating, the
+        chance that at least one signal is real"""
+        innocent = 1.0
+        for score in self.signals().values():
+            innocent *= 1 - score
+        return 1 - innocent
+
+    @property
+    def flagged(self):
+        """Get whether the player should be flagged as suspicious"""
+        return self.confidence >= FLAG_CONFIDENCE
+
+    def reasons(self):
+        """
+        Return a list of the names of the signals that contributed to the
+        confidence, strongest first.
+        """
+        signals = self.signals()
+        return sorted(
+            (name for name, score in signals.items() if score > 0),
+            key=signals.get,
+            reverse=True,
+        )
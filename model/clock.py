@@ -0,0 +1,103 @@
+"""
+Clocks used by the model to measure race time.
+
+The model only ever asks a clock for the current time in nanoseconds, so
+tests and simulations can swap in a ManualClock and drive time themselves.
+"""
+
+import time
+from abc import ABC, abstractmethod
+
+
+class Clock(ABC):
+    """
+    Abstract base class for a source of time.
+    """
+
+    @abstractmethod
+    def now_ns(self):
+        """
+        Return an int representing the current time in nanoseconds. Only the
+        difference between two readings is meaningful.
+        """
+
+    @abstractmethod
+    def sleep_until(self, deadline_ns):
+        """
+        Wait until the clock reads at least deadline_ns.
+
+        Args:
+            deadline_ns: int representing the time to wait for in nanoseconds
+        """
+
+
+class MonotonicClock(Clock):
+    """
+    Clock backed by time.perf_counter_ns, the highest resolution monotonic
+    clock available. Unaffected by changes to the system (wall clock) time.
+    """
+
+    def now_ns(self):
+        """Return the current performance counter value in nanoseconds"""
+        return time.perf_counter_ns()
+
+    def sleep_until(self, deadline_ns):
+        """Sleep until the performance counter reaches deadline_ns"""
+        delay = deadline_ns - time.perf_counter_ns()
+        if delay > 0:
+            time.sleep(delay / 1e9)
+
+
+class ManualClock(Clock):
+    """
+    Clock that only moves when told to. Used by tests, simulations and
+    replays to control time deterministically.
+
+    Attributes:
+        _now: int representing the current time in nanoseconds
+    """
+
+    def __init__(self, start_ns=0):
+        """
+        Create a new manual clock.
+
+        Args:
+            start_ns: int representing the starting time in nanoseconds
+        """
+        self._now = start_ns
+
+    def now_ns(self):
+        """Return the current time in nanoseconds"""
+        return self._now
+
+    def sleep_until(self, deadline_ns):
+        """Jump straight to deadline_ns, if it is in the future"""
+        self._now = max(self._now, deadline_ns)
+
+    def advance(self, seconds):
+        """
+        Move the clock forward.
+
+        Args:
+            seconds: float representing the number of seconds to advance by
+        """
+        self._now += round(seconds * 1_000_000_000)
+
+    def advance_ns(self, nanoseconds):
+        """
+        Move the clock forward.
+
+        Args:
+            nanoseconds: int representing the number of nanoseconds to
+                advance by
+        """
+        self._now += nanoseconds
+
+    def set_ns(self, nanoseconds):
+        """
+        Jump the clock to a specific time.
+
+        Args:
+            nanoseconds: int representing the new time in nanoseconds
+        """
+        self._now = nanoseconds
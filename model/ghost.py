@@ -0,0 +1,144 @@
+"""
+Race against a ghost: a previously recorded run streamed from its replay
+file.
+"""
+
+from model.model import TypeRacePlayer
+from model.keystrokes import INSERT, BACKSPACE
+from model.replay import RECORD, read_header
+
+
+class Ghost:
+    """
+    Follow the caret of a recorded race without loading the whole replay.
+
+    Keystroke records are read from the file in small chunks as the race
+    advances, and each record only moves the caret forward or back, so the
+    cost per frame is proportional to the keystrokes made in that frame.
+
+    Attributes:
+        _file: open binary file object of the replay
+        _remaining: int representing how many records are still in the file
+        _chunk_records: int representing how many records to read at a time
+        _chunk: iterator over the records of the current chunk
+        _next: the next (delta_us, action, key) record, or None at the end
+        _next_time: int representing the race time of _next in nanoseconds
+        _position: int representing how many characters the ghost has typed
+        _length: int representing the length of the prompt, which the ghost
+            can't type past
+        header: Replay holding the recording's details, without keystrokes
+    """
+
+    def __init__(self, path, chunk_records=256):
+        """
+        Open a replay file to stream a ghost from.
+
+        Args:
+            path: string representing the replay file
+            chunk_records: int representing how many keystroke records to
+                read from the file at a time
+        """
+        # pylint: disable=consider-using-with
+        self._file = open(path, "rb")
+        self.header, count = read_header(self._file)
+        self._remaining = count
+        self._chunk_records = chunk_records
+        self._chunk = iter(())
+        self._next = None
+        self._next_time = 0
+        self._position = 0
+        self._length = len(self.header.prompt)
+        self._read_next()
+
+    def _read_next(self):
+        """
+        Move to the next keystroke record, reading a new chunk from the file
+        when the current one is used up.
+        """
+        record = next(self._chunk, None)
+        if record is None and self._remaining > 0:
+            count = min(self._chunk_records, self._remaining)
+            data = self._file.read(count * RECORD.size)
+            count = len(data) // RECORD.size
+            self._remaining = self._remaining - count if count else 0
+            self._chunk = RECORD.iter_unpack(data[: count * RECORD.size])
+            record = next(self._chunk, None)
+        self._next = record
+        if record is None:
+            self.close()
+        else:
+            self._next_time += record[0] * 1000
+
+    def advance(self, elapsed_ns):
+        """
+        Apply every recorded keystroke made up to a point in the race. Like
+        the player, the ghost ignores characters typed past the end of the
+        prompt.
+
+        Args:
+            elapsed_ns: int representing the nanoseconds since the race
+                started
+        """
+        while self._next is not None and self._next_time <= elapsed_ns:
+            action = self._next[1]
+            if action == INSERT and self._position < self._length:
+                self._position += 1
+            elif action == BACKSPACE and self._position > 0:
+                self._position -= 1
+            self._read_next()
+
+    def close(self):
+        """
+        Close the replay file.
+        """
+        self._file.close()
+
+    @property
+    def position(self):
+        """Get the number of characters the ghost has typed"""
+        return self._position
+
+
+class GhostPlayer(TypeRacePlayer):
+    """
+    Subclass of TypeRacePlayer for racing against a recorded run. Uses the
+    same prompt and time limit as the recording.
+
+    Attributes:
+        _ghost: Ghost following the recorded run
+    """
+
+    def __init__(self, replay_path, **kwargs):
+        """
+        Initialize a new player racing against a ghost. Keyword arguments are
+        passed on to TypeRacePlayer.
+
+        Args:
+            replay_path: string representing the replay file of the ghost
+        """
+        self._ghost = Ghost(replay_path)
+        header = self._ghost.header
+        super().__init__(
+            header.time_limit,
+            text_engine=header.engine,
+            prompt=(header.seed, header.prompt),
+            **kwargs,
+        )
+
+    def update_time(self):
+        """
+        Update the time remaining, then move the ghost up to the same point
+        in its race.
+        """
+        super().update_time()
+        self._ghost.advance(self._clock.now_ns() - self._start_time)
+
+    @property
+    def ghost_position(self):
+        """Get the number of characters the ghost has typed"""
+        return self._ghost.position
+
+    @property
+    def ghost_wpm(self):
+        """Get the WPM the ghost finished with"""
+        return self._ghost.header.wpm
@@ -0,0 +1,72 @@
+"""
+Compact, append-only log of every keystroke made during a race.
+"""
+
+from array import array
+
+# Actions a keystroke can have on the typed text
+INSERT = 0  # A character was added, key holds its unicode code point
+BACKSPACE = 1  # The last character was removed
+IGNORED = 2  # The key had no effect on the typed text
+
+
+class KeystrokeLog:
+    """
+    Record keystrokes in parallel typed arrays (one column per field) so that
+    appending is O(1) and never allocates a Python object per event.
+
+    Attributes:
+        keys: array of unsigned ints representing the unicode code point of
+            inserted characters, or the pygame key code for other keystrokes
+        actions: array of unsigned bytes representing INSERT, BACKSPACE or
+            IGNORED
+        times: array of signed 64 bit ints representing when each keystroke
+            happened, in nanoseconds from time.perf_counter_ns
+
+    The network thread reads the log while the game thread appends to it,
+    so times is always appended last and truncated first. Every column then
+    holds at least len(log) entries, and a keystroke only counts once all
+    of its fields are written.
+    """
+
+    def __init__(self):
+        """
+        Create a new, empty keystroke log.
+        """
+        self.keys = array("I")
+        self.actions = array("B")
+        self.times = array("q")
+
+    def append(self, key, action, timestamp):
+        """
+        Add a keystroke to the end of the log.
+
+        Args:
+            key: int representing the code point or key code of the keystroke
+            action: int representing INSERT, BACKSPACE or IGNORED
+            timestamp: int representing the time of the keystroke in
+                nanoseconds
+        """
+        self.keys.append(key)
+        self.actions.append(action)
+        self.times.append(timestamp)
+
+    def truncate(self, length):
+        """
+        Discard every keystroke after the first `length`.
+
+        Args:
+            length: int representing how many keystrokes to keep
+        """
+        del self.times[length:]
+        del self.keys[length:]
+        del self.actions[length:]
+
+    def __len__(self):
+        """Return the number of recorded keystrokes"""
+        # times is the last column appended, see the class docstring
+        return len(self.times)
+
+    def __getitem__(self, index):
+        """Return a (key, action, timestamp) tuple for one keystroke"""
+        return self.keys[index], self.actions[index], self.times[index]
@@ -0,0 +1,226 @@
+"""
+Fixed-size histograms of latencies, such as the time from a key being
+pressed to the model applying it.
+"""
+
+from array import array
+from collections import deque
+from model.keystrokes import IGNORED
+
+# Values are bucketed by their top BITS bits, so every bucket is within
+# about 1 / 2 ** (BITS - 1) (here 6%) of the values in it
+BITS = 5
+_HALF = 1 << (BITS - 1)
+# Enough buckets for values up to 2 ** 63 nanoseconds
+NUM_BUCKETS = (64 - BITS + 2) * _HALF
+
+
+def _bucket(value):
+    """
+    Find the bucket a value belongs in.
+
+    Args:
+        value: non-negative int
+
+    Returns an int representing the bucket index.
+    """
+    if value < 2 * _HALF:
+        return value
+    shift = value.bit_length() - BITS
+    return shift * _HALF + (value >> shift)
+
+
+def _bucket_middle(index):
+    """
+    Find the value in the middle of a bucket.
+
+    Args:
+        index: int representing the bucket index
+
+    Returns a float.
+    """
+    if index < 2 * _HALF:
+        return float(index)
+    shift = index // _HALF - 1
+    low = (index % _HALF + _HALF) << shift
+    return low + (1 << shift) / 2
+
+
+class LatencyHistogram:
+    """
+    Record latencies in O(1) time and constant memory, with log-scaled
+    buckets that keep the relative error of percentiles small from
+    nanoseconds to minutes.
+
+    Attributes:
+        _counts: array of the number of latencies in each bucket
+        _count: int representing the number of latencies recorded
+        _total: int representing the sum of the latencies
+        _max: int representing the largest latency
+    """
+
+    def __init__(self):
+        """
+        Create an empty histogram.
+        """
+        self._counts = array("Q", bytes(8 * NUM_BUCKETS))
+        self._count = 0
+        self._total = 0
+        self._max = 0
+
+    def record(self, latency_ns):
+        """
+        Add one latency. Negative latencies are counted as zero.
+
+        Args:
+            latency_ns: int representing the latency in nanoseconds
+        """
+        latency_ns = max(0, latency_ns)
+        self._counts[_bucket(latency_ns)] += 1
+        self._count += 1
+        self._total += latency_ns
+        self._max = max(self._max, latency_ns)
+
+    def merge(self, other):
+        """
+        Add the latencies of another histogram into this one.
+
+        Args:
+            other: LatencyHistogram to add
+        """
+        for index, count in enumerate(other._counts):
+            if count:
+                self._counts[index] += count
+        self._count += other._count
+        self._total += other._total
+        self._max = max(self._max, other._max)
+
+    def percentile(self, fraction):
+        """
+        Estimate a percentile of the latencies.
+
+        Args:
+            fraction: float from 0 to 1, e.g. 0.99 for the 99th percentile
+
+        Returns a float representing the latency in nanoseconds, or 0 if the
+        histogram is empty.
+        """
+        if not self._count:
+            return 0.0
+        rank = max(1, round(fraction * self._count))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                # Never report more than was actually seen
+                return min(_bucket_middle(index), float(self._max))
+        return float(self._max)
+
+    @property
+    def count(self):
+        """Get the number of latencies recorded"""
+        return self._count
+
+    @property
+    def mean(self):
+        """Get the mean latency in nanoseconds, or 0 if empty"""
+        return self._total / self._count if self._count else 0.0
+
+    @property
+    def max(self):
+        """Get the largest latency in nanoseconds"""
+        return self._max
+
+    def summary(self, name):
+        """
+        Describe the latencies in one line, in milliseconds.
+
+        Args:
+            name: string naming what was measured
+
+        Returns a string.
+        """
+        if not self._count:
+            return f"{name}: no samples"
+        return (
+            f"{name}: {self._count} samples, "
+            f"mean {self.mean / 1e6:.2f}ms, "
+            f"p50 {self.percentile(0.5) / 1e6:.2f}ms, "
+            f"p99 {self.percentile(0.99) / 1e6:.2f}ms, "
+            f"max {self._max / 1e6:.2f}ms"
+        )
+
+
+class LatencyTracker:
+    """
+    Follow each keystroke that edits the typed text from the moment it was
+    received, through the model update that applies it (update_text and
+    check_accuracy), to the first frame that shows it, and record the
+    latency of each stage.
+
+    The frame counts as shown when pygame.display.flip returns, which is as
+    close to the photons leaving the screen as the game can see.
+
+    Attributes:
+        _clock: Clock (or Scheduler) that keystrokes were stamped with
+        _seen: int representing how many keystrokes of the log have been
+            followed
+        _pending: deque of the timestamps of keystrokes that have been
+            applied but not yet shown
+        to_model: LatencyHistogram from receipt until the model was updated
+        to_photon: LatencyHistogram from receipt until the frame was shown
+    """
+
+    def __init__(self, clock):
+        """
+        Create a tracker with nothing recorded.
+
+        Args:
+            clock: object with a now_ns method reading the same times as the
+                keystroke timestamps, such as the Scheduler running the race
+        """
+        self._clock = clock
+        self._seen = 0
+        self._pending = deque()
+        self.to_model = LatencyHistogram()
+        self.to_photon = LatencyHistogram()
+
+    def applied(self, keystrokes):
+        """
+        Call after each model update to follow the keystrokes it applied.
+
+        Args:
+            keystrokes: KeystrokeLog of the player
+        """
+        end = len(keystrokes)
+        if end == self._seen:
+            return
+        now = self._clock.now_ns()
+        for i in range(self._seen, end):
+            if keystrokes.actions[i] != IGNORED:
+                timestamp = keystrokes.times[i]
+                self.to_model.record(now - timestamp)
+                self._pending.append(timestamp)
+        self._seen = end
+
+    def presented(self):
+        """
+        Call once a frame has been shown, to finish following every
+        keystroke applied before it was drawn.
+        """
+        if not self._pending:
+            return
+        now = self._clock.now_ns()
+        while self._pending:
+            self.to_photon.record(now - self._pending.popleft())
+
+    def summary(self):
+        """
+        Describe the latencies of each stage.
+
+        Returns a list of strings, one per line.
+        """
+        return [
+            self.to_model.summary("input to model"),
+            self.to_photon.summary("input to photon"),
+        ]
@@ -1,8 +1,14 @@
 """Class definitions for model"""
 
-from datetime import datetime
-from model.text_gen import random_paragraph
-from model.server import Host, Client
+import copy
+from array import array
+from model.text_gen import engines, seeded_paragraph
+from model.server import Host, Client, PORT
+from model.keystrokes import KeystrokeLog, INSERT, BACKSPACE
+from model.clock import MonotonicClock
+from model.speed import SpeedTracker
+from model.anticheat import CheatDetector
+from model.standings import OPPONENT_NAME, OWN_NAME, Standings
 
 
 class TypeRacePlayer:
@@ -10,24 +16,57 @@ class TypeRacePlayer:
     Create an abstract base class representing the state of Type Race player.
 
     Attributes:
-        _start_time: datetime object representing the time the game was started
+        _clock: Clock used to measure all race times
+        _start_time: int representing the clock time in nanoseconds when the
+            game was started
         _time_limit: int representing the number of seconds the game should
             play for. Defaults to 60, but can be overridden upon the definition
             of the class
+        _text_engine: string naming the prompt generator in text_gen.engines
+        _prompt_pool: PromptPool to take the prompt from, or None to generate
+            the prompt directly
+        _prompt_seed: int representing the seed the prompt was generated from
+        _prompt_words: int representing the number of words in a generated
+            prompt
         game_over: bool representing whether or not the game is over
 
     Properties:
-        _typed_text: string representing all the text the user has typed up to
-            the current point in the game
+        _typed_chars: list of single character strings representing all the
+            text the user has typed up to the current point in the game
+        _typed_text: string cache of _typed_chars, or None if it needs to be
+            rebuilt after an edit
+        _first_change: int representing the index of the first typed
+            character edited since take_first_change was last called, or None
+            if nothing was edited
+        _word_progress: array with one entry per typed character holding the
+            state of check_accuracy after that character, encoded as
+            (correct words << 1) | (current word incorrect)
         _prompt_text: string representing the paragraph for the user to copy
-        _time_remaining: int representing the number of seconds left before time
-            is up
+        _elapsed: float representing the number of seconds since the start
+        _time_remaining: float representing the number of seconds left before
+            time is up
         _wpm: integer representing the user's current wpm adjusted for errors
         _prompt_text: string representing the paragraph for the user to type
+        _typed_count: int representing how many characters have been typed,
+            including ones deleted since
+        _error_count: int representing how many characters have been
+            mistyped, including ones corrected since
+        _keystrokes: KeystrokeLog of every key the user has pressed
+        _speed: SpeedTracker of correct characters over the last few seconds
+        _instant_wpm: int representing the user's wpm over the rolling window
 
     """
 
-    def __init__(self, time_limit=60):
+    def __init__(
+        self,
+        time_limit=60,
+        text_engine="random",
+        prompt_pool=None,
+        clock=None,
+        seed=None,
+        prompt=None,
+        prompt_words=200,
+    ):
         """
         Create a new model representing the state of a player at the
         beginning of a new game. Set all attributes and properties to their
@@ -36,45 +75,259 @@ class TypeRacePlayer:
         Args:
             time_limit: int representing the number of seconds to start the game
                 with. If not provided, default to 60 seconds.
+            text_engine: string naming the prompt generator to use, either
+                "random" (random words) or "markov" (n-gram prose). Defaults
+                to "random".
+            prompt_pool: PromptPool of pre-generated prompts. If provided, the
+                prompt is taken from the pool instead of being generated. The
+                pool must generate its prompts with text_engine so the prompt
+                can be regenerated from its seed.
+            clock: Clock to measure time with. Defaults to a MonotonicClock;
+                tests and simulations can pass a ManualClock instead.
+            seed: int representing the seed to generate the prompt from, for
+                example to replay a recorded race. If not provided, a random
+                seed is used.
+            prompt: (seed, text) tuple to use as the prompt instead of
+                generating one, for example from a replay file.
+            prompt_words: int representing the number of words to generate
+                for the prompt. Defaults to 200.
         """
-        self._start_time = datetime.now()  # Will be overwritten on game start
+        if text_engine not in engines:
+            raise ValueError(f"Unknown text engine: {text_engine}")
+        self._clock = MonotonicClock() if clock is None else clock
+        # Will be overwritten on game start
+        self._start_time = self._clock.now_ns()
         self._time_limit = time_limit
+        self._text_engine = text_engine
+        self._prompt_pool = prompt_pool
+        self._prompt_seed = seed
+        self._prompt_words = prompt_words
         self.game_over = False
+        self._typed_chars = []
         self._typed_text = ""
-        self._prompt_text = self.generate_paragraph()
+        self._first_change = 0
+        self._word_progress = array("I")
+        if prompt is None:
+            self._prompt_text = self.generate_paragraph()
+        else:
+            self._prompt_seed, self._prompt_text = prompt
+        self._elapsed = 0.0
         self._time_remaining = time_limit
         self._wpm = 0
         self._mistake_indexes = [0] * len(self._prompt_text)
+        self._typed_count = 0
+        self._error_count = 0
+        self._keystrokes = KeystrokeLog()
+        self._speed = SpeedTracker()
+        self._instant_wpm = 0
 
     def set_start_time(self):
         """
         Set the start time of the game to the current time.
         """
-        self._start_time = datetime.now()
+        self._start_time = self._clock.now_ns()
+
+    def append_char(self, char):
+        """
+        Called by the controller when the user types a character. Adds the
+        character to the typed text and updates the accuracy state for that
+        character only. Characters typed past the end of the prompt are
+        ignored.
+
+        Args:
+            char: single character string typed by the user
+        """
+        index = len(self._typed_chars)
+        if index >= len(self._prompt_text):
+            return
+        prompt_char = self._prompt_text[index]
+        state = self._word_progress[-1] if index else 0
+        self._typed_count += 1
+
+        if char == prompt_char:
+            self._mistake_indexes[index] = 0
+            self._speed.add(1)
+        else:
+            self._mistake_indexes[index] = 1
+            self._error_count += 1
+            state |= 1  # The current word is incorrect
+
+        if prompt_char == " ":  # End of the word has been reached
+            if not state & 1:
+                state += 2  # One more correct word
+            # Reset the incorrect word flag only if the user matched the
+            # space, otherwise keep it set for the next word
+            if char == " ":
+                state &= ~1
+
+        self._typed_chars.append(char)
+        self._word_progress.append(state)
+        self._typed_text = None
+        self._mark_change(index)
+
+    def backspace(self):
+        """
+        Called by the controller when the user presses backspace. Removes the
+        last typed character, if there is one, and rolls the accuracy state
+        back to the previous character. Mistakes still count against the
+        accuracy once they are deleted.
+        """
+        if self._typed_chars:
+            if not self._mistake_indexes[len(self._typed_chars) - 1]:
+                self._speed.add(-1)  # A correct character was removed
+            self._typed_chars.pop()
+            self._word_progress.pop()
+            self._typed_text = None
+            self._mark_change(len(self._typed_chars))
+
+    def _mark_change(self, index):
+        """
+        Remember that a typed character was edited, for take_first_change.
+
+        Args:
+            index: int representing the index of the edited character
+        """
+        if self._first_change is None or index < self._first_change:
+            self._first_change = index
+
+    def take_first_change(self):
+        """
+        Find where the typed text changed since this was last called, so a
+        view can redraw only the characters from there to the caret instead
+        of the whole text.
+
+        Returns an int representing the index of the first character edited,
+        or None if nothing was edited.
+        """
+        first, self._first_change = self._first_change, None
+        return first
+
+    def apply_batch(self, edits):
+        """
+        Apply all edits made since the last update in one call.
+
+        Args:
+            edits: iterable of single character strings, where "\\b" means
+                backspace and any other character is typed
+        """
+        for edit in edits:
+            if edit == "\b":
+                self.backspace()
+            else:
+                self.append_char(edit)
 
     def update_text(self, text):
         """
-        Called by the controller when a new user input is received. Acts as a
-        setter method.
+        Replace the typed text with a new string. Only the characters after
+        the common prefix of the old and new text are reprocessed.
 
         Args:
             text: string representing all text entered by the user
         """
-        self._typed_text = text
+        common = 0
+        for old_char, new_char in zip(self._typed_chars, text):
+            if old_char != new_char:
+                break
+            common += 1
+        for _ in range(len(self._typed_chars) - common):
+            self.backspace()
+        for char in text[common:]:
+            self.append_char(char)
+
+    def record_keystroke(self, key, action, timestamp=None):
+        """
+        Called by the controller for every key pressed, before the typed text
+        is updated. Stamps the keystroke with a high resolution timestamp and
+        appends it to the keystroke log.
+
+        Args:
+            key: int representing the unicode code point of an inserted
+                character, or the key code for any other key
+            action: int representing the effect of the key, one of the
+                constants in model.keystrokes
+            timestamp: int representing when the key was pressed, in
+                nanoseconds on the player's clock. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = self._clock.now_ns()
+        self._keystrokes.append(key, action, timestamp)
+
+    def apply_keystroke(self, key, action):
+        """
+        Record a keystroke from a keystroke log and apply its edit, as when
+        replaying a recorded race.
+
+        Args:
+            key: int representing the unicode code point of an inserted
+                character, or the key code for any other key
+            action: int representing the effect of the key, one of the
+                constants in model.keystrokes
+        """
+        self.record_keystroke(key, action)
+        if action == INSERT:
+            self.append_char(chr(key))
+        elif action == BACKSPACE:
+            self.backspace()
+
+    def snapshot(self):
+        """
+        Capture the typing state of the player so it can be restored later,
+        for example to seek within a replay.
+
+        Returns a dict holding copies of the player's state.
+        """
+        return {
+            "typed_chars": list(self._typed_chars),
+            "word_progress": array("I", self._word_progress),
+            "mistake_indexes": list(self._mistake_indexes),
+            "typed_count": self._typed_count,
+            "error_count": self._error_count,
+            "keystrokes": len(self._keystrokes),
+            "speed": copy.deepcopy(self._speed),
+            "elapsed": self._elapsed,
+            "time_remaining": self._time_remaining,
+            "wpm": self._wpm,
+            "instant_wpm": self._instant_wpm,
+            "game_over": self.game_over,
+        }
+
+    def restore(self, snapshot):
+        """
+        Return the player to a state captured with snapshot. Keystrokes
+        recorded after the snapshot are discarded.
+
+        Args:
+            snapshot: dict returned by snapshot
+        """
+        self._typed_chars = list(snapshot["typed_chars"])
+        self._typed_text = None
+        self._first_change = 0
+        self._word_progress = array("I", snapshot["word_progress"])
+        self._mistake_indexes = list(snapshot["mistake_indexes"])
+        self._typed_count = snapshot["typed_count"]
+        self._error_count = snapshot["error_count"]
+        self._keystrokes.truncate(snapshot["keystrokes"])
+        self._speed = copy.deepcopy(snapshot["speed"])
+        self._elapsed = snapshot["elapsed"]
+        self._time_remaining = snapshot["time_remaining"]
+        self._wpm = snapshot["wpm"]
+        self._instant_wpm = snapshot["instant_wpm"]
+        self.game_over = snapshot["game_over"]
 
     def update_time(self):
         """
-        Update the amount of time remaining by comparing the current system
-        time with the start time.
+        Update the amount of time remaining by comparing the current clock
+        time with the start time. Time is kept to fractions of a second.
 
         Update the time_remaining property. If there is no more time remaining,
         set the game over flag to True.
         """
         # Compare the current time with the start time to determine how much
         # time has elapsed
-        time_delta = datetime.now() - self._start_time
+        self._elapsed = (self._clock.now_ns() - self._start_time) / 1e9
         # Turn time elapsed into time remaining
-        self._time_remaining = self._time_limit - time_delta.seconds
+        self._time_remaining = self._time_limit - self._elapsed
+        self._speed.advance(self._elapsed)
 
         # If there is no time remaining, set the game over flag to True
         if self._time_remaining <= 0:
@@ -85,56 +338,64 @@ class TypeRacePlayer:
         Calculate the user's current wpm by determining how many correct words
         have been typed within the time elapsed.
 
-        Update the wpm property with the new wpm.
+        Update the wpm property with the new wpm, and the instant_wpm property
+        with the wpm over the last few seconds.
         """
         correct_words = self.check_accuracy()
 
         # Calculate the new wpm
-        elapsed_minutes = (self._time_limit - self._time_remaining) / 60
+        elapsed_minutes = self._elapsed / 60
         # Avoid zero division on start up (when the elapsed minutes would be
         # zero)
         if elapsed_minutes > 0:
-            self._wpm = int(correct_words // elapsed_minutes)
+            self._wpm = int(correct_words / elapsed_minutes)
+        self._instant_wpm = int(self._speed.wpm(self._elapsed))
 
     def check_accuracy(self):
         """
-        Compare the typed text with the prompt text to determine what mistakes
-        the user has made and how many correct words have been typed. Update
-        the mistake index to indicate which characters are incorrect.
+        Determine how many correct words have been typed. The mistake indexes
+        and word counts are kept up to date as each character is typed or
+        deleted, so this is O(1).
+
+        A word counts as correct once the space after it in the prompt has
+        been reached without any mistakes in the word.
 
         Return an int representing the number of correct words.
         """
-        correct_words = 0
-        incorrect_word = False  # Tracks if the current word is incorrect
-
-        for i, typed_char in enumerate(self._typed_text):
-            prompt_char = self._prompt_text[i]
-
-            if typed_char == prompt_char:
-                self._mistake_indexes[i] = 0
-            else:
-                incorrect_word = True
-                self._mistake_indexes[i] = 1
-
-            if prompt_char == " ":  # End of the word has been reached
-                if not incorrect_word:
-                    correct_words += 1
-                # Reset the incorrect word flag only if the user matched the
-                # space, otherwise keep the incorrect word flag set to true for
-                # the next word
-                if typed_char == " ":
-                    incorrect_word = False  # Reset the incorrect word flag
-        return correct_words
+        if not self._word_progress:
+            return 0
+        return self._word_progress[-1] >> 1
 
     def generate_paragraph(self):
         """
         Generate a random paragraph to use as the the prompt for the typing
-        race.
+        race, and remember the seed it was generated from.
 
         Returns a string representing the entire prompt paragraph for the user
         to type.
         """
-        return random_paragraph()
+        if self._prompt_pool is not None and self._prompt_seed is None:
+            self._prompt_seed, paragraph = self._prompt_pool.get()
+        else:
+            self._prompt_seed, paragraph = seeded_paragraph(
+                self._text_engine, self._prompt_seed, self._prompt_words
+            )
+        return paragraph
+
+    @property
+    def clock(self):
+        """Get clock"""
+        return self._clock
+
+    @property
+    def start_time(self):
+        """Get start time in clock nanoseconds"""
+        return self._start_time
+
+    @property
+    def elapsed(self):
+        """Get seconds elapsed since the start"""
+        return self._elapsed
 
     @property
     def time_remaining(self):
@@ -143,19 +404,66 @@ class TypeRacePlayer:
 
     @property
     def typed_text(self):
-        """Get typed_text"""
+        """Get typed_text, joining the typed characters only after an edit"""
+        if self._typed_text is None:
+            self._typed_text = "".join(self._typed_chars)
         return self._typed_text
 
+    @property
+    def typed_length(self):
+        """Get the number of typed characters"""
+        return len(self._typed_chars)
+
     @property
     def wpm(self):
         """Get wpm"""
         return self._wpm
 
+    @property
+    def instant_wpm(self):
+        """Get wpm over the rolling window"""
+        return self._instant_wpm
+
+    @property
+    def speed(self):
+        """Get the SpeedTracker holding the rolling wpm and speed curve"""
+        return self._speed
+
+    @property
+    def accuracy(self):
+        """
+        Get the fraction of characters typed correctly, counting every
+        mistake made, even ones corrected since
+        """
+        if not self._typed_count:
+            return 1.0
+        return 1 - self._error_count / self._typed_count
+
     @property
     def mistake_indexes(self):
         """Get error array"""
         return self._mistake_indexes
 
+    @property
+    def keystrokes(self):
+        """Get keystroke log"""
+        return self._keystrokes
+
+    @property
+    def prompt_seed(self):
+        """Get the seed the prompt was generated from"""
+        return self._prompt_seed
+
+    @property
+    def text_engine(self):
+        """Get the name of the prompt generator"""
+        return self._text_engine
+
+    @property
+    def time_limit(self):
+        """Get time_limit"""
+        return self._time_limit
+
     @property
     def prompt_text(self):
         """Get prompt_text"""
@@ -169,18 +477,47 @@ class HostPlayer(TypeRacePlayer):
 
     Attributes:
         opponent_wpm: int represent the words per minute of the opposing player
+        opponent_detector: CheatDetector analyzing the opponent's keystrokes
+        standings: Standings of this player and the opponent
         _host: Host object containing the connection to the client
     """
 
-    def __init__(self, time_limit=60):
+    def __init__(
+        self,
+        time_limit=60,
+        port=PORT,
+        network_rate=2.0,
+        host_ip=None,
+        **kwargs,
+    ):
         """
-        Initialize a new host player.
+        Initialize a new host player. Other keyword arguments are passed on
+        to TypeRacePlayer.
+
+        Args:
+            time_limit: int representing the number of seconds in the game
+            port: int representing the TCP port to listen on
+            network_rate: float representing how many updates per second to
+                exchange with the client
+            host_ip: string representing the IPv4 address to listen on. If
+                not provided, the LAN address of this computer is detected.
         """
-        super().__init__(time_limit)
+        super().__init__(time_limit, **kwargs)
         self.opponent_wpm = 0
-        self._host = Host(self)
+        self.opponent_detector = CheatDetector()
+        self.standings = Standings(len(self.prompt_text))
+        self.standings.update(OWN_NAME, 0, 0)
+        self.standings.update(OPPONENT_NAME, 0, 0)
+        self._host = Host(self, port, network_rate, host_ip)
         self.start_server()
 
+    def update_wpm(self):
+        """
+        Update the wpm, and this player's row of the standings.
+        """
+        super().update_wpm()
+        self.standings.update(OWN_NAME, self.typed_length, self.wpm)
+
     def start_server(self):
         """
         Instruct Host to start the server and start the thread that will
@@ -188,6 +525,11 @@ class HostPlayer(TypeRacePlayer):
         """
         self._host.start_server()
 
+    @property
+    def network(self):
+        """Get the Host exchanging updates with the client"""
+        return self._host
+
 
 class ClientPlayer(TypeRacePlayer):
     """
@@ -196,21 +538,55 @@ class ClientPlayer(TypeRacePlayer):
 
     Attributes:
         opponent_wpm: int represent the words per minute of the opposing player
+        opponent_detector: CheatDetector analyzing the opponent's keystrokes
+        standings: Standings of this player and the opponent
         _client: Client object containing the connection to the host
     """
 
-    def __init__(self, time_limit=60):
+    def __init__(
+        self,
+        time_limit=60,
+        port=PORT,
+        network_rate=2.0,
+        host_ip=None,
+        **kwargs,
+    ):
         """
-        Initialize a new client player.
+        Initialize a new client player. Other keyword arguments are passed on
+        to TypeRacePlayer.
+
+        Args:
+            time_limit: int representing the number of seconds in the game
+            port: int representing the TCP port the host listens on
+            network_rate: float representing how many updates per second to
+                exchange with the host
+            host_ip: string representing the IPv4 address of the host. If
+                not provided, the user is asked for it.
         """
-        super().__init__(time_limit)
+        super().__init__(time_limit, **kwargs)
         self.opponent_wpm = 0
-        self._client = Client(self)
+        self.opponent_detector = CheatDetector()
+        self.standings = Standings(len(self.prompt_text))
+        self.standings.update(OWN_NAME, 0, 0)
+        self.standings.update(OPPONENT_NAME, 0, 0)
+        self._client = Client(self, port, network_rate, host_ip)
         self.connect_server()
 
+    def update_wpm(self):
+        """
+        Update the wpm, and this player's row of the standings.
+        """
+        super().update_wpm()
+        self.standings.update(OWN_NAME, self.typed_length, self.wpm)
+
     def connect_server(self):
         """
         Instruct Client to connect to the server and start the thread that will
         continuously exchange words per minute with the host.
         """
         self._client.connect_server()
+
+    @property
+    def network(self):
+        """Get the Client exchanging updates with the host"""
+        return self._client
@@ -0,0 +1,215 @@
+"""
+Markov chain (n-gram) text generation for more natural looking prompts.
+
+Transition tables are built once from a local corpus and stored in a compact
+CSR (compressed sparse row) layout:
+
+- Each row is one state, a tuple of `order` consecutive word ids.
+- `indptr[row]` to `indptr[row + 1]` is the slice of `indices` holding the
+  word ids that followed that state in the corpus. A successor that appeared
+  several times is stored several times, so picking a uniformly random entry
+  from the slice is a weighted choice that costs O(1) per word.
+
+The tables are serialized to a small binary cache file so later launches only
+have to read a few arrays instead of re-parsing the corpus.
+"""
+
+import os
+import random
+import re
+import struct
+from array import array
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus.txt")
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "corpus.ngram")
+
+# Magic bytes, format version, order, vocabulary size, rows, edges
+_HEADER = struct.Struct("<4sHHIII")
+_MAGIC = b"TRNG"
+_VERSION = 1
+
+
+def tokenize(text):
+    """
+    Split a corpus into lowercase words containing only letters, which are
+    the only characters the controller lets the player type.
+
+    Args:
+        text: string containing the raw corpus
+
+    Returns a list of word strings.
+    """
+    return re.findall(r"[a-z]+", text.lower())
+
+
+class NgramTable:
+    """
+    Precomputed transition table for an order-n Markov chain over words.
+
+    Attributes:
+        order: int representing how many previous words make up a state
+        vocab: list of word strings, indexed by word id
+        state_words: array of word ids, `order` entries per row
+        indptr: array of row offsets into indices (CSR layout)
+        indices: array of successor word ids (CSR layout)
+        _rows: dict mapping a state tuple to its row number
+    """
+
+    def __init__(self, order, vocab, state_words, indptr, indices):
+        """
+        Create a table from already built CSR arrays. Use `build` or `load`
+        instead of calling this directly.
+        """
+        self.order = order
+        self.vocab = vocab
+        self.state_words = state_words
+        self.indptr = indptr
+        self.indices = indices
+        self._rows = {
+            tuple(state_words[row * order : (row + 1) * order]): row
+            for row in range(len(indptr) - 1)
+        }
+
+    @classmethod
+    def build(cls, text, order=2):
+        """
+        Build a transition table from a corpus.
+
+        The corpus is treated as circular so that every state has at least one
+        successor and generation never reaches a dead end.
+
+        Args:
+            text: string containing the corpus
+            order: int representing the number of words in each state
+
+        Returns a new NgramTable.
+        """
+        tokens = tokenize(text)
+        if len(tokens) <= order:
+            raise ValueError("Corpus is too short for the requested order")
+
+        vocab = sorted(set(tokens))
+        word_ids = {word: i for i, word in enumerate(vocab)}
+        ids = [word_ids[word] for word in tokens]
+        wrapped = ids + ids[:order]
+
+        # Group successors by state, keeping the first-seen order of states
+        successors = {}
+        for i in range(len(ids)):
+            state = tuple(wrapped[i : i + order])
+            successors.setdefault(state, []).append(wrapped[i + order])
+
+        state_words = array("I")
+        indptr = array("I", [0])
+        indices = array("I")
+        for state, following in successors.items():
+            state_words.extend(state)
+            indices.extend(following)
+            indptr.append(len(indices))
+        return cls(order, vocab, state_words, indptr, indices)
+
+    def save(self, path):
+        """
+        Serialize the table to a binary file.
+
+        Args:
+            path: string representing the file to write
+        """
+        vocab_bytes = "\n".join(self.vocab).encode()
+        with open(path, "wb") as file:
+            file.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    _VERSION,
+                    self.order,
+                    len(vocab_bytes),
+                    len(self.indptr) - 1,
+                    len(self.indices),
+                )
+            )
+            file.write(vocab_bytes)
+            self.state_words.tofile(file)
+            self.indptr.tofile(file)
+            self.indices.tofile(file)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a table previously written with `save`.
+
+        Args:
+            path: string representing the file to read
+
+        Returns a new NgramTable.
+        """
+        with open(path, "rb") as file:
+            magic, version, order, vocab_size, rows, edges = _HEADER.unpack(
+                file.read(_HEADER.size)
+            )
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path} is not a type-race n-gram table")
+            vocab = file.read(vocab_size).decode().split("\n")
+            state_words = array("I")
+            state_words.fromfile(file, rows * order)
+            indptr = array("I")
+            indptr.fromfile(file, rows + 1)
+            indices = array("I")
+            indices.fromfile(file, edges)
+        return cls(order, vocab, state_words, indptr, indices)
+
+    def generate(self, num_words, rng=random):
+        """
+        Generate a sequence of words by walking the Markov chain.
+
+        Args:
+            num_words: int representing how many words to generate
+            rng: random.Random instance (or the random module) used for all
+                choices
+
+        Returns a list of word strings.
+        """
+        order = self.order
+        row = rng.randrange(len(self.indptr) - 1)
+        state = list(self.state_words[row * order : (row + 1) * order])
+        output = [self.vocab[word] for word in state[:num_words]]
+
+        while len(output) < num_words:
+            start = self.indptr[row]
+            # Successors are stored once per occurrence, so a uniform pick
+            # from the row is weighted by frequency
+            word = self.indices[
+                start + rng.randrange(self.indptr[row + 1] - start)
+            ]
+            output.append(self.vocab[word])
+            state = state[1:] + [word]
+            row = self._rows[tuple(state)]
+        return output
+
+
+def load_table(corpus_path=CORPUS_PATH, cache_path=CACHE_PATH, order=2):
+    """
+    Load the transition table from the cache, rebuilding it from the corpus
+    when the cache is missing, out of date, or built with a different order.
+
+    Args:
+        corpus_path: string representing the corpus text file
+        cache_path: string representing the serialized table file
+        order: int representing the number of words in each state
+
+    Returns an NgramTable.
+    """
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(corpus_path):
+            table = NgramTable.load(cache_path)
+            if table.order == order:
+                return table
+    except (OSError, ValueError, EOFError):
+        pass  # Fall through and rebuild the cache
+
+    with open(corpus_path, encoding="utf-8") as file:
+        table = NgramTable.build(file.read(), order)
+    try:
+        table.save(cache_path)
+    except OSError as e:
+        print("Could not write n-gram cache:", e)
+    return table
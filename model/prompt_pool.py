@@ -0,0 +1,158 @@
+"""
+Pool of pre-generated prompts so starting a race never waits on text
+generation.
+"""
+
+import threading
+from collections import deque
+
+
+class PromptPool:
+    """
+    Keep a number of ready prompts on hand, refilled by a background worker
+    thread whenever the pool drops below a low-water mark.
+
+    Prompts are (seed, text) tuples as returned by text_gen.seeded_paragraph.
+    Recently generated prompt texts are remembered so the same prompt is
+    rarely given out twice in a row. If the generator keeps repeating itself
+    the repeat is used anyway after a few tries, so the worker never spins.
+
+    Attributes:
+        _generate: function taking no arguments that returns a new
+            (seed, text) prompt
+        _size: int representing how many prompts the worker keeps ready
+        _low_water: int representing the pool size that wakes the worker
+        _retries: int representing how many duplicates in a row the worker
+            drops before using one anyway
+        _ready: deque of prompt tuples waiting to be handed out
+        _recent: deque of hashes of the most recently generated prompts
+        _recent_set: set mirroring _recent for O(1) duplicate checks
+        _condition: threading.Condition guarding all of the above
+        _running: bool representing whether the worker should keep going
+        _thread: threading.Thread running the refill worker
+    """
+
+    def __init__(self, generate, size=32, low_water=8, history=1024, retries=8):
+        """
+        Create a new pool and start its refill worker.
+
+        Args:
+            generate: function taking no arguments that returns a new
+                (seed, text) prompt, such as
+                functools.partial(seeded_paragraph, "markov")
+            size: int representing how many prompts to keep ready
+            low_water: int representing the pool size below which the worker
+                starts refilling
+            history: int representing how many recent prompts to remember
+                for deduplication
+            retries: int representing how many duplicate prompts in a row to
+                drop before using one anyway
+        """
+        self._generate = generate
+        self._size = size
+        self._low_water = low_water
+        self._retries = retries
+        self._ready = deque()
+        self._recent = deque(maxlen=history)
+        self._recent_set = set()
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._refill, daemon=True)
+        self._thread.start()
+
+    def _remember(self, prompt):
+        """
+        Record a prompt as recently generated.
+
+        Must be called with the condition held. Returns False if the prompt
+        was already remembered (a duplicate), True otherwise.
+        """
+        key = hash(prompt[1])
+        if key in self._recent_set:
+            return False
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_set.discard(self._recent[0])
+        self._recent.append(key)
+        self._recent_set.add(key)
+        return True
+
+    def _refill(self):
+        """
+        Worker thread loop. Sleeps until the pool drops below the low-water
+        mark, then generates prompts until the pool is full again.
+        """
+        while True:
+            with self._condition:
+                while self._running and len(self._ready) >= self._low_water:
+                    self._condition.wait()
+
+            # Generate outside of the lock so get() is never blocked, and keep
+            # going until the pool is full again
+            duplicates = 0
+            while True:
+                prompt = self._generate()
+                with self._condition:
+                    if not self._running:
+                        return
+                    if self._remember(prompt) or duplicates >= self._retries:
+                        duplicates = 0
+                        self._ready.append(prompt)
+                        self._condition.notify_all()
+                    else:
+                        duplicates += 1
+                    if len(self._ready) >= self._size:
+                        break
+
+    def get(self):
+        """
+        Take a prompt from the pool.
+
+        If the pool is empty (for example right after startup) a prompt is
+        generated on the calling thread instead of waiting for the worker.
+
+        Returns a (seed, text) prompt tuple.
+        """
+        with self._condition:
+            if self._ready:
+                prompt = self._ready.popleft()
+                if len(self._ready) < self._low_water:
+                    self._condition.notify_all()
+                return prompt
+            self._condition.notify_all()
+
+        prompt = self._generate()
+        with self._condition:
+            self._remember(prompt)
+        return prompt
+
+    def wait_ready(self, count=None, timeout=None):
+        """
+        Block until the pool holds at least `count` prompts. Useful for
+        warming the pool up before the first race.
+
+        Args:
+            count: int representing how many prompts to wait for. Defaults to
+                the low-water mark.
+            timeout: float representing the maximum number of seconds to
+                wait, or None to wait forever
+
+        Returns True if enough prompts are ready, False on timeout.
+        """
+        count = self._low_water if count is None else count
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: len(self._ready) >= count, timeout
+            )
+
+    def close(self):
+        """
+        Stop the refill worker.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+
+    def __len__(self):
+        """Return the number of ready prompts"""
+        return len(self._ready)
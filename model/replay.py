@@ -0,0 +1,300 @@
+"""
+Record races to compact binary files and play them back.
+
+A replay file holds a fixed size header followed by one fixed size record
+per keystroke:
+
+- Header: magic bytes, format version, prompt seed, text engine name, time
+  limit, race duration, reported WPM, the number of records, and the size of
+  the compressed prompt.
+- Prompt: the zlib compressed prompt text. Stored because some prompts (such
+  as adaptive ones) cannot be regenerated from their seed alone.
+- Record: microseconds since the previous keystroke, the keystroke action,
+  and the key (unicode code point for inserted characters).
+"""
+
+import os
+import time
+import zlib
+from dataclasses import dataclass
+import struct
+from model.clock import ManualClock
+from model.keystrokes import KeystrokeLog
+from model.model import TypeRacePlayer
+
+HEADER = struct.Struct("<4sHI16sddHII")
+RECORD = struct.Struct("<IBI")
+_MAGIC = b"TRRP"
+_VERSION = 2
+
+
+@dataclass
+class Replay:
+    """
+    A recorded race.
+
+    Attributes:
+        seed: int representing the seed the prompt was generated from
+        engine: string naming the text engine that generated the prompt
+        time_limit: float representing the race length in seconds
+        duration: float representing the elapsed seconds when the race ended
+        wpm: int representing the WPM reported at the end of the race
+        prompt: string representing the race's prompt
+        keystrokes: KeystrokeLog with times in nanoseconds since the race
+            started, or None if only the header has been read
+    """
+
+    seed: int
+    engine: str
+    time_limit: float
+    duration: float
+    wpm: int
+    prompt: str
+    keystrokes: KeystrokeLog = None
+
+
+def save_replay(player, path):
+    """
+    Write a finished race to a replay file.
+
+    Args:
+        player: TypeRacePlayer whose race should be saved
+        path: string representing the file to write. Missing directories are
+            created.
+    """
+    log = player.keystrokes
+    records = bytearray()
+    previous = player.start_time
+    for key, action, timestamp in zip(log.keys, log.actions, log.times):
+        delta_us = max(0, timestamp - previous) // 1000
+        records += RECORD.pack(min(delta_us, 0xFFFFFFFF), action, key)
+        # Advance by the rounded delta so rounding errors don't accumulate
+        previous += delta_us * 1000
+
+    prompt = zlib.compress(player.prompt_text.encode())
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(
+            HEADER.pack(
+                _MAGIC,
+                _VERSION,
+                player.prompt_seed,
+                player.text_engine.encode(),
+                player.time_limit,
+                player.elapsed,
+                min(player.wpm, 0xFFFF),
+                len(log),
+                len(prompt),
+            )
+        )
+        file.write(prompt)
+        file.write(records)
+
+
+def read_header(file):
+    """
+    Read and check the header and prompt at the start of an open replay file,
+    leaving the file positioned at the first keystroke record.
+
+    Args:
+        file: binary file object positioned at the start of a replay
+
+    Returns a tuple of a Replay without keystrokes, and an int representing
+    the number of keystroke records that follow.
+    """
+    data = file.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError("Replay file is truncated")
+    (
+        magic,
+        version,
+        seed,
+        engine,
+        time_limit,
+        duration,
+        wpm,
+        count,
+        prompt_size,
+    ) = HEADER.unpack(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("Not a type-race replay file")
+    try:
+        prompt = zlib.decompress(file.read(prompt_size)).decode()
+    except zlib.error as e:
+        raise ValueError("Replay prompt is corrupt") from e
+    engine = engine.rstrip(b"\0").decode()
+    return Replay(seed, engine, time_limit, duration, wpm, prompt), count
+
+
+def load_replay(path):
+    """
+    Read a replay file.
+
+    Args:
+        path: string representing the file to read
+
+    Returns a Replay.
+
+    Raises ValueError if the file isn't a replay or is truncated.
+    """
+    with open(path, "rb") as file:
+        replay, count = read_header(file)
+        data = file.read(count * RECORD.size)
+    if len(data) < count * RECORD.size:
+        raise ValueError("Replay keystrokes are truncated")
+
+    log = KeystrokeLog()
+    timestamp = 0
+    for delta_us, action, key in RECORD.iter_unpack(data):
+        timestamp += delta_us * 1000
+        log.append(key, action, timestamp)
+    replay.keystrokes = log
+    return replay
+
+
+class ReplayEngine:
+    """
+    Drive a TypeRacePlayer (and optionally a view) from a recorded race.
+
+    While loading, the engine plays the whole race once and keeps a snapshot
+    of the player every `snapshot_interval` seconds. Seeking restores the
+    closest earlier snapshot and plays forward from there, so a seek costs
+    at most one snapshot interval of keystrokes.
+
+    Attributes:
+        _replay: Replay being played
+        _player: TypeRacePlayer driven by the replay, using a ManualClock
+        _view: TypeRaceView to draw after every frame, or None
+        _index: int representing the next keystroke to apply
+        _interval: float representing the seconds between snapshots
+        _snapshots: list of (keystroke index, player snapshot) tuples, one
+            per snapshot interval
+    """
+
+    def __init__(self, replay, snapshot_interval=5.0):
+        """
+        Create a player for the recorded race and build seek snapshots.
+
+        Args:
+            replay: Replay to play back
+            snapshot_interval: float representing the seconds of race time
+                between seek snapshots
+        """
+        self._replay = replay
+        self._player = TypeRacePlayer(
+            replay.time_limit,
+            text_engine=replay.engine,
+            prompt=(replay.seed, replay.prompt),
+            clock=ManualClock(),
+        )
+        self._player.set_start_time()
+        self._view = None
+        self._index = 0
+        self._interval = snapshot_interval
+        self._snapshots = [(0, self._player.snapshot())]
+
+        # Play the whole race once to record the snapshots
+        second = snapshot_interval
+        while second < replay.duration:
+            self.advance_to(second)
+            self._snapshots.append((self._index, self._player.snapshot()))
+            second += snapshot_interval
+        self.seek(0)
+
+    def attach_view(self, view):
+        """
+        Set the view to draw during playback. The view is created after the
+        engine because it needs the engine's player.
+
+        Args:
+            view: TypeRaceView created with this engine's player
+        """
+        self._view = view
+
+    def advance_to(self, seconds):
+        """
+        Apply every keystroke made up to a point in the race, then update the
+        player's time and WPM.
+
+        Args:
+            seconds: float representing the race time to advance to. Never
+                goes past the end of the recorded race.
+        """
+        target = round(min(seconds, self._replay.duration) * 1e9)
+        log = self._replay.keystrokes
+        clock = self._player.clock
+        while self._index < len(log) and log.times[self._index] <= target:
+            key, action, timestamp = log[self._index]
+            clock.set_ns(timestamp)
+            self._player.apply_keystroke(key, action)
+            self._index += 1
+        clock.set_ns(target)
+        self._player.update_time()
+        self._player.update_wpm()
+        if target >= round(self._replay.duration * 1e9):
+            self._player.game_over = True
+
+    def seek(self, seconds):
+        """
+        Jump to any point in the race.
+
+        Args:
+            seconds: float representing the race time to jump to
+        """
+        slot = max(
+            0, min(int(seconds // self._interval), len(self._snapshots) - 1)
+        )
+        index, snapshot = self._snapshots[slot]
+        self._index = index
+        self._player.restore(snapshot)
+        if slot:
+            self._player.clock.set_ns(round(slot * self._interval * 1e9))
+        else:
+            self._player.clock.set_ns(0)
+        self.advance_to(seconds)
+
+    def play(self, speed=1.0, fps=60, on_frame=None):
+        """
+        Play the race from the current position to the end.
+
+        Args:
+            speed: float representing the playback speed relative to real
+                time, e.g. 1.0 for real time or 4.0 for four times faster.
+                None plays as fast as possible, one second of race time per
+                frame.
+            fps: int representing how many frames to draw per second of wall
+                time
+            on_frame: function called with no arguments after every frame,
+                for example to keep the window responsive. Return True from
+                it to stop playback early.
+        """
+        start_race = self._player.elapsed
+        start_wall = time.perf_counter()
+        frame = 0
+        while not self._player.game_over:
+            frame += 1
+            if speed is None:
+                race_time = start_race + frame
+            else:
+                race_time = start_race + frame / fps * speed
+            self.advance_to(race_time)
+            if self._view is not None:
+                self._view.draw()
+            if on_frame is not None and on_frame():
+                break
+            if speed is not None:
+                delay = start_wall + frame / fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    @property
+    def player(self):
+        """Get the player driven by the replay"""
+        return self._player
+
+    @property
+    def replay(self):
+        """Get the replay being played"""
+        return self._replay
@@ -0,0 +1,285 @@
+"""
+Persistent store of race results with leaderboard queries, backed by SQLite.
+"""
+
+import sqlite3
+import sys
+import time
+from array import array
+from datetime import date, datetime, timezone
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    prompt_id TEXT NOT NULL,
+    wpm INTEGER NOT NULL,
+    accuracy REAL NOT NULL,
+    duration REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    day INTEGER NOT NULL,
+    curve BLOB,
+    curve_step INTEGER
+);
+CREATE INDEX IF NOT EXISTS races_by_prompt ON races (prompt_id, wpm DESC);
+CREATE INDEX IF NOT EXISTS races_by_day ON races (day, wpm DESC);
+CREATE INDEX IF NOT EXISTS races_by_player ON races (player, wpm DESC);
+"""
+
+_COLUMNS = "player, prompt_id, wpm, accuracy, duration, finished_at"
+
+# Columns added after the first version of the schema, with their types
+_ADDED_COLUMNS = {"curve": "BLOB", "curve_step": "INTEGER"}
+
+
+def _pack_curve(curve):
+    """
+    Pack a speed curve into bytes to store, as little endian 16 bit ints.
+
+    Args:
+        curve: iterable of int WPM samples
+
+    Returns bytes.
+    """
+    samples = array("H", curve)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def _unpack_curve(data):
+    """
+    Unpack a speed curve packed with _pack_curve.
+
+    Args:
+        data: bytes to unpack
+
+    Returns a list of int WPM samples.
+    """
+    samples = array("H", data)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tolist()
+
+
+def prompt_id(player):
+    """
+    Build the id identifying a player's prompt, which can be regenerated from
+    the text engine and seed.
+
+    Args:
+        player: TypeRacePlayer to build the id for
+
+    Returns a string of the form "engine:seed".
+    """
+    return f"{player.text_engine}:{player.prompt_seed}"
+
+
+class ResultsStore:
+    """
+    Store every finished race in a local SQLite database.
+
+    The database uses write-ahead logging so leaderboard reads never wait on
+    writes, and every leaderboard query is answered from an index on
+    (key, wpm DESC) so top-N lookups stay fast with millions of rows. Results
+    are buffered and written in batches, one transaction per batch.
+
+    Attributes:
+        _connection: sqlite3.Connection to the database
+        _batch_size: int representing how many results to buffer before
+            writing them
+        _pending: list of result rows waiting to be written
+    """
+
+    def __init__(self, path="results.db", batch_size=100):
+        """
+        Open (and if needed create) a results database.
+
+        Args:
+            path: string representing the database file, or ":memory:"
+            batch_size: int representing how many results to buffer before
+                writing them to the database
+        """
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        # Databases made before a column was added don't have it yet
+        existing = {
+            row[1]
+            for row in self._connection.execute("PRAGMA table_info(races)")
+        }
+        with self._connection:
+            for column, kind in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._connection.execute(
+                        f"ALTER TABLE races ADD COLUMN {column} {kind}"
+                    )
+        self._batch_size = batch_size
+        self._pending = []
+
+    def add(
+        self,
+        player,
+        prompt,
+        wpm,
+        accuracy,
+        duration,
+        finished_at=None,
+        curve=None,
+        curve_step=None,
+    ):
+        """
+        Buffer a race result, writing the buffer once it is full.
+
+        Args:
+            player: string representing the name of the player
+            prompt: string identifying the prompt, see prompt_id
+            wpm: int representing the final WPM
+            accuracy: float between 0 and 1 representing the fraction of
+                typed characters that were correct
+            duration: float representing the length of the race in seconds
+            finished_at: float representing the unix time the race finished.
+                Defaults to now.
+            curve: iterable of int WPM samples of the race's speed curve, or
+                None if it wasn't recorded
+            curve_step: int representing the seconds between curve samples
+        """
+        if finished_at is None:
+            finished_at = time.time()
+        if curve is not None:
+            curve = _pack_curve(curve)
+        self._pending.append(
+            (
+                player,
+                prompt,
+                wpm,
+                accuracy,
+                duration,
+                finished_at,
+                curve,
+                curve_step,
+            )
+        )
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def add_race(self, name, player):
+        """
+        Buffer the result of a finished race, with its speed curve.
+
+        Args:
+            name: string representing the name of the player
+            player: TypeRacePlayer that finished the race
+        """
+        self.add(
+            name,
+            prompt_id(player),
+            player.wpm,
+            player.accuracy,
+            player.elapsed,
+            curve=player.speed.curve,
+            curve_step=player.speed.curve_step,
+        )
+
+    def flush(self):
+        """
+        Write all buffered results in a single transaction.
+        """
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO races ({_COLUMNS}, curve, curve_step, day) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, CAST(? / 86400 AS INTEGER))",
+                [row + (row[5],) for row in self._pending],
+            )
+        self._pending.clear()
+
+    def _top(self, column, value, count):
+        """
+        Query the fastest races with a given value in an indexed column.
+
+        Returns a list of (player, prompt_id, wpm, accuracy, duration,
+        finished_at) tuples, fastest first.
+        """
+        self.flush()
+        return self._connection.execute(
+            f"SELECT {_COLUMNS} FROM races WHERE {column} = ? "
+            "ORDER BY wpm DESC LIMIT ?",
+            (value, count),
+        ).fetchall()
+
+    def top_by_prompt(self, prompt, count=10):
+        """
+        Get the leaderboard for one prompt.
+
+        Args:
+            prompt: string identifying the prompt, see prompt_id
+            count: int representing how many results to return
+
+        Returns a list of result tuples, fastest first.
+        """
+        return self._top("prompt_id", prompt, count)
+
+    def top_by_day(self, day=None, count=10):
+        """
+        Get the leaderboard for one (UTC) day.
+
+        Args:
+            day: datetime.date of the day. Defaults to today.
+            count: int representing how many results to return
+
+        Returns a list of result tuples, fastest first.
+        """
+        if day is None:
+            day = datetime.now(timezone.utc).date()
+        return self._top("day", (day - date(1970, 1, 1)).days, count)
+
+    def top_by_player(self, player, count=10):
+        """
+        Get a player's best races.
+
+        Args:
+            player: string representing the name of the player
+            count: int representing how many results to return
+
+        Returns a list of result tuples, fastest first.
+        """
+        return self._top("player", player, count)
+
+    def latest_curve(self, player):
+        """
+        Get the speed curve of a player's most recent race.
+
+        Args:
+            player: string representing the name of the player
+
+        Returns a (list of int WPM samples, int seconds between samples)
+        tuple, or None if the player has no race with a curve.
+        """
+        self.flush()
+        row = self._connection.execute(
+            "SELECT curve, curve_step FROM races "
+            "WHERE player = ? AND curve IS NOT NULL "
+            "ORDER BY finished_at DESC LIMIT 1",
+            (player,),
+        ).fetchone()
+        if row is None:
+            return None
+        return _unpack_curve(row[0]), row[1]
+
+    def close(self):
+        """
+        Write any buffered results and close the database.
+        """
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        """Use the store as a context manager that closes it on exit"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the store"""
+        self.close()
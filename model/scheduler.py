@@ -0,0 +1,310 @@
+"""
+Run the parts of the game loop at their own rates.
+
+The simulation (input and scoring) runs on a fixed timestep, so race time
+advances in equal ticks however long each frame takes to draw. Rendering
+runs at its own, optionally capped, rate.
+"""
+
+import time
+from array import array
+from model.clock import ManualClock, MonotonicClock
+
+
+class TaskStats:
+    """
+    Measurements of how often a task ran and how long it took.
+
+    Attributes:
+        durations: array of the wall time of each run in nanoseconds
+        dropped: int representing how many fixed ticks were skipped because
+            the task fell too far behind
+        _first_ns: int representing the scheduled time of the first run, or
+            None before the first run
+        _last_ns: int representing the scheduled time of the latest run
+    """
+
+    def __init__(self):
+        """
+        Create empty statistics.
+        """
+        self.durations = array("q")
+        self.dropped = 0
+        self._first_ns = None
+        self._last_ns = 0
+
+    def record(self, scheduled_ns, duration_ns):
+        """
+        Add one run of the task.
+
+        Args:
+            scheduled_ns: int representing the time the run was for, in
+                nanoseconds on the scheduler's clock
+            duration_ns: int representing the wall time the run took in
+                nanoseconds
+        """
+        if self._first_ns is None:
+            self._first_ns = scheduled_ns
+        self._last_ns = scheduled_ns
+        self.durations.append(duration_ns)
+
+    @property
+    def count(self):
+        """Get the number of runs"""
+        return len(self.durations)
+
+    @property
+    def rate(self):
+        """Get the achieved number of runs per second, or 0 if there were
+        fewer than two runs"""
+        if self.count < 2 or self._last_ns == self._first_ns:
+            return 0.0
+        return (self.count - 1) * 1e9 / (self._last_ns - self._first_ns)
+
+    def percentile(self, fraction):
+        """
+        Get a percentile of the run durations.
+
+        Args:
+            fraction: float from 0 to 1, e.g. 0.99 for the 99th percentile
+
+        Returns an int representing the duration in nanoseconds, or 0 if the
+        task never ran.
+        """
+        if not self.durations:
+            return 0
+        ordered = sorted(self.durations)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def summary(self, name, target_rate=None):
+        """
+        Describe the measurements in one line.
+
+        Args:
+            name: string naming the task
+            target_rate: float representing the rate the task was meant to
+                run at, or None if uncapped
+
+        Returns a string.
+        """
+        if not self.durations:
+            return f"{name}: never ran"
+        target = f"{target_rate:g}/s" if target_rate else "uncapped"
+        line = (
+            f"{name}: {self.count} runs at {self.rate:.1f}/s ({target}), "
+            f"mean {sum(self.durations) / self.count / 1000:.1f}us, "
+            f"p99 {self.percentile(0.99) / 1000:.1f}us, "
+            f"max {max(self.durations) / 1000:.1f}us"
+        )
+        if self.dropped:
+            line += f", {self.dropped} ticks dropped"
+        return line
+
+
+class Task:
+    """
+    A callback run by the Scheduler.
+
+    Attributes:
+        name: string naming the task
+        rate: float representing the runs per second, or 0 to run on every
+            pass of the loop
+        callback: function taking no arguments to run
+        fixed: bool representing whether the task runs on a fixed timestep,
+            catching up on missed ticks, or just runs as often as it can up
+            to its rate
+        interval_ns: int representing the nanoseconds between runs
+        next_ns: int representing the time of the next run
+        stats: TaskStats of the runs so far
+    """
+
+    def __init__(self, name, rate, callback, fixed):
+        """
+        Create a task. See the attributes for the arguments.
+        """
+        self.name = name
+        self.rate = rate
+        self.callback = callback
+        self.fixed = fixed
+        self.interval_ns = round(1e9 / rate) if rate else 0
+        self.next_ns = 0
+        self.stats = TaskStats()
+
+
+class Scheduler:
+    """
+    Run fixed timestep and rate capped tasks from one loop.
+
+    A fixed task runs once per interval of the scheduler's clock. If the loop
+    falls behind, for example during a slow frame, it runs the missed ticks
+    back to back to catch up, up to max_catch_up at a time. While a fixed
+    task runs, tick_clock reads the time the tick was scheduled for rather
+    than the time it actually ran, so give tick_clock to the model to keep
+    race time and keystroke timestamps independent of frame times.
+
+    On a ManualClock, the clock is moved forward by the wall time each task
+    takes, so a simulated run skips the waits but not the work.
+
+    Attributes:
+        _clock: Clock the schedule follows
+        _simulated: bool representing whether _clock is a ManualClock
+        _task_start: int representing the performance counter when the
+            running task started, or None between tasks
+        _tick_clock: ManualClock set to the scheduled time of each fixed tick
+        _tasks: list of Task objects in the order they were added
+        _max_catch_up: int representing how many missed fixed ticks may run
+            in a row before the rest are dropped
+        _stopped: bool representing whether stop() was called
+    """
+
+    def __init__(self, clock=None, max_catch_up=8):
+        """
+        Create a scheduler with no tasks.
+
+        Args:
+            clock: Clock to schedule tasks by. Defaults to a MonotonicClock;
+                with a ManualClock the loop jumps from one deadline to the
+                next without waiting, for simulations and benchmarks.
+            max_catch_up: int representing how many missed fixed ticks may
+                run in a row before the rest are dropped
+        """
+        self._clock = MonotonicClock() if clock is None else clock
+        self._simulated = isinstance(self._clock, ManualClock)
+        self._task_start = None
+        self._tick_clock = ManualClock(self._clock.now_ns())
+        self._tasks = []
+        self._max_catch_up = max_catch_up
+        self._stopped = False
+
+    def add(self, name, rate, callback, fixed=False):
+        """
+        Add a task to run, starting straight away.
+
+        Args:
+            name: string naming the task in reports
+            rate: float representing the runs per second, or 0 to run on
+                every pass of the loop
+            callback: function taking no arguments to run
+            fixed: bool representing whether to run the task on a fixed
+                timestep
+        """
+        if fixed and not rate:
+            raise ValueError("A fixed timestep task needs a rate")
+        task = Task(name, rate, callback, fixed)
+        task.next_ns = self._clock.now_ns()
+        if fixed:
+            # The tick clock reads the time of the next fixed tick
+            self._tick_clock.set_ns(task.next_ns)
+        self._tasks.append(task)
+
+    def _run(self, task, scheduled_ns):
+        """
+        Run a task once and record how long it took.
+        """
+        start = self._task_start = time.perf_counter_ns()
+        task.callback()
+        duration = time.perf_counter_ns() - start
+        self._task_start = None
+        if self._simulated:
+            self._clock.advance_ns(duration)
+        task.stats.record(scheduled_ns, duration)
+
+    def step(self):
+        """
+        Run every task that is due.
+
+        Returns an int representing the time the next task is due.
+        """
+        for task in self._tasks:
+            now = self._clock.now_ns()
+            if now < task.next_ns:
+                continue
+            if task.fixed:
+                runs = 0
+                while task.next_ns <= now and runs < self._max_catch_up:
+                    self._tick_clock.set_ns(task.next_ns)
+                    self._run(task, task.next_ns)
+                    task.next_ns += task.interval_ns
+                    runs += 1
+                    if self._stopped:
+                        break
+                if task.next_ns <= now:
+                    # Too far behind to catch up, skip the missed ticks
+                    missed = (now - task.next_ns) // task.interval_ns + 1
+                    task.stats.dropped += missed
+                    task.next_ns += missed * task.interval_ns
+            else:
+                self._run(task, now)
+                # Keep to the rate on average, but don't try to make up for
+                # runs missed by more than one interval
+                task.next_ns = max(task.next_ns + task.interval_ns, now)
+            if self._stopped:
+                break
+        deadlines = [task.next_ns for task in self._tasks if task.rate]
+        return min(deadlines) if deadlines else self._clock.now_ns()
+
+    def run(self):
+        """
+        Run the tasks until stop() is called, sleeping between deadlines.
+
+        With a real clock, an uncapped task keeps the loop from sleeping at
+        all. With a ManualClock, time only moves when the loop sleeps, so
+        uncapped tasks run once per deadline instead.
+        """
+        uncapped = any(not task.rate for task in self._tasks)
+        while not self._stopped:
+            deadline = self.step()
+            if not self._stopped and (self._simulated or not uncapped):
+                self._clock.sleep_until(deadline)
+
+    def now_ns(self):
+        """
+        Return an int representing the current time on the scheduler's
+        clock in nanoseconds. On a ManualClock, this includes the work done
+        so far by the running task.
+        """
+        now = self._clock.now_ns()
+        if self._simulated and self._task_start is not None:
+            now += time.perf_counter_ns() - self._task_start
+        return now
+
+    def stop(self):
+        """
+        Stop the loop once the task that is running returns.
+        """
+        self._stopped = True
+
+    def report(self):
+        """
+        Describe how each task kept up with its rate.
+
+        Returns a list of strings, one per task.
+        """
+        return [
+            task.stats.summary(task.name, task.rate) for task in self._tasks
+        ]
+
+    @property
+    def clock(self):
+        """Get the clock tasks are scheduled by"""
+        return self._clock
+
+    @property
+    def tick_clock(self):
+        """Get the clock reading the scheduled time of the current fixed
+        tick"""
+        return self._tick_clock
+
+    def stats(self, name):
+        """
+        Get the measurements of a task.
+
+        Args:
+            name: string naming the task
+
+        Returns the TaskStats of the task.
+        """
+        for task in self._tasks:
+            if task.name == name:
+                return task.stats
+        raise KeyError(name)
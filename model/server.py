@@ -4,12 +4,15 @@ Contains a classes to support networking for multiplayer game mode.
 
 import socket
 import threading
-import time
 from abc import ABC, abstractmethod
 import platform
 import subprocess
 import sys
 import os
+from model.clock import MonotonicClock
+from model.keystrokes import INSERT, BACKSPACE
+from model.scheduler import TaskStats
+from model.standings import OPPONENT_NAME
 
 PORT = 5555
 s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -19,31 +22,101 @@ class Network(ABC):
     """
     Base class to support networking between a host and client.
 
+    Each message is one line: the sender's wpm, a space, then a comma
+    separated list of "action:microseconds" pairs for every keystroke made
+    since the previous message, timed from the start of the sender's race.
+
     Attributes:
         _player: HostPlayer object representing the model of the host
             player
         _host_ip: string representing the IPv4 address of the host computer
+        _port: int representing the TCP port of the server
+        _interval_ns: int representing the nanoseconds between updates
+        _clock: MonotonicClock timing the updates
+        _sent: int representing how many of this player's keystrokes have
+            already been sent
+        _opponent_progress: int representing how many characters the
+            opponent has typed, counted from their keystrokes
+        stats: TaskStats of the round trip time of each update
     """
 
-    def __init__(self, player):
+    def __init__(self, player, port=PORT, update_rate=2.0, host_ip=None):
         self._player = player
-        self._host_ip = self.get_host_ip()
+        self._host_ip = host_ip or self.get_host_ip()
+        self._port = port
+        self._interval_ns = round(1e9 / update_rate)
+        self._clock = MonotonicClock()
+        self._sent = 0
+        self._opponent_progress = 0
+        self.stats = TaskStats()
+
+    def encode_message(self):
+        """
+        Build the next message to send to the other player.
+
+        Returns the message as bytes.
+        """
+        log = self._player.keystrokes
+        start = self._player.start_time
+        end = len(log)
+        keystrokes = ",".join(
+            f"{log.actions[i]}:{(log.times[i] - start) // 1000}"
+            for i in range(self._sent, end)
+        )
+        self._sent = end
+        return f"{self._player.wpm} {keystrokes}\n".encode()
+
+    def receive_message(self, line):
+        """
+        Update the opponent's wpm and progress from a received message, and
+        feed their keystroke timing to the cheat detector.
+
+        Args:
+            line: string containing one message, without the newline
+        """
+        wpm, _, keystrokes = line.partition(" ")
+        self._player.opponent_wpm = int(wpm)
+        detector = self._player.opponent_detector
+        was_flagged = detector.flagged
+        progress = self._opponent_progress
+        for keystroke in filter(None, keystrokes.split(",")):
+            action, microseconds = keystroke.split(":")
+            detector.update(int(microseconds) * 1000, int(action))
+            if int(action) == INSERT:
+                progress += 1
+            elif int(action) == BACKSPACE:
+                progress = max(0, progress - 1)
+        self._opponent_progress = progress
+        if hasattr(self._player, "standings"):
+            self._player.standings.update(
+                OPPONENT_NAME, progress, self._player.opponent_wpm
+            )
+        if detector.flagged and not was_flagged:
+            print(
+                "SERVER: Opponent flagged as suspicious "
+                f"({detector.confidence:.0%} confidence: "
+                f"{', '.join(detector.reasons())})"
+            )
 
     def transmit_receive_wpm(self, conn):
         """
-        Threaded function that exchanges wpm with the other player. Continuously
-        transmit this player's wpm and receive the opponent's wpm.
+        Threaded function that exchanges wpm and keystroke timing with the
+        other player. Continuously transmit this player's wpm and receive the
+        opponent's wpm.
 
         Args:
             conn: socket object representing the connection to the other player
         """
+        reader = conn.makefile("r")
+        next_ns = self._clock.now_ns()
         while True:
-            my_wpm = self._player.wpm
-            conn.send(str(my_wpm).encode())
+            start = self._clock.now_ns()
+            conn.sendall(self.encode_message())
 
-            opponent_wpm = conn.recv(1024).decode()
-            if opponent_wpm:
-                self._player.opponent_wpm = int(opponent_wpm)
+            line = reader.readline()
+            self.stats.record(start, self._clock.now_ns() - start)
+            if line:
+                self.receive_message(line.rstrip("\n"))
             else:
                 print("SERVER: No data received, close connection")
                 break
@@ -51,7 +124,9 @@ class Network(ABC):
             if self._player.game_over:
                 print("SERVER: Game ended, close connection (player.game_over)")
                 break
-            time.sleep(0.5)
+            # Keep to the update rate however long the exchange took
+            next_ns = max(next_ns + self._interval_ns, self._clock.now_ns())
+            self._clock.sleep_until(next_ns)
 
     @abstractmethod
     def get_host_ip(self):
@@ -137,7 +212,7 @@ class Host(Network):
         and port. Then start a new thread to transmit and receive wpm.
         """
         try:
-            s.bind((self._host_ip, PORT))
+            s.bind((self._host_ip, self._port))
         except socket.error as e:
             print("SERVER: Failed to bind server", e)
 
@@ -182,7 +257,7 @@ class Client(Network):
         transmit and receive wpm.
         """
         try:
-            s.connect((self._host_ip, PORT))
+            s.connect((self._host_ip, self._port))
         except socket.error as e:
             print("SERVER: Connection Failed", e)
 
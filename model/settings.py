@@ -0,0 +1,181 @@
+"""
+Game settings loaded once at startup from a TOML file, environment variables
+and command line overrides.
+
+Later sources override earlier ones:
+
+1. The defaults in Settings.
+2. The TOML file (typerace.toml in the working directory, if it exists).
+3. Environment variables named TYPERACE_<SETTING>, e.g. TYPERACE_PORT=6000.
+4. Command line overrides, e.g. --set port=6000.
+"""
+
+import os
+import tomllib
+from dataclasses import dataclass, fields, replace
+
+DEFAULT_PATH = "typerace.toml"
+ENV_PREFIX = "TYPERACE_"
+
+# Allowed values for settings that are a choice between names
+CHOICES = {
+    "text_engine": ("random", "markov", "adaptive"),
+    "render_mode": ("software", "gpu", "terminal"),
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Immutable game settings.
+
+    Attributes:
+        time_limit: float representing the race length in seconds
+        prompt_words: int representing the number of words in a prompt
+        text_engine: string naming the prompt generator
+        port: int representing the TCP port used for multiplayer
+        network_rate: float representing how many times per second to
+            exchange updates with the other player
+        tick_rate: int representing how many times per second to update the
+            game simulation
+        input_rate: float representing how many times per second to collect
+            input, stamping it with the time it was collected
+        fps_cap: int representing the maximum frames drawn per second, or 0
+            for no limit
+        render_mode: string naming the rendering backend, "software",
+            "gpu" (which falls back to software without a GPU renderer) or
+            "terminal" to play in the terminal with curses
+        window_width: int representing the starting window width in pixels
+        window_height: int representing the starting window height in
+            pixels
+        font_size: int representing the prompt font size in points
+        ui_scale: float representing how much to scale the fonts and layout
+            by, e.g. 2 on HiDPI screens that don't report their scale
+        prompt_lines: int representing how many lines of the prompt to show,
+            wrapped at word boundaries, or 1 for a single scrolling line
+    """
+
+    time_limit: float = 60
+    prompt_words: int = 200
+    text_engine: str = "random"
+    port: int = 5555
+    network_rate: float = 2.0
+    tick_rate: int = 120
+    input_rate: float = 1000.0
+    fps_cap: int = 60
+    render_mode: str = "software"
+    window_width: int = 800
+    window_height: int = 600
+    font_size: int = 32
+    ui_scale: float = 1.0
+    prompt_lines: int = 1
+
+    def __post_init__(self):
+        """
+        Check that every setting has a sensible value.
+        """
+        for name, choices in CHOICES.items():
+            if getattr(self, name) not in choices:
+                raise ValueError(
+                    f"{name} must be one of {', '.join(choices)}, "
+                    f"not {getattr(self, name)!r}"
+                )
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if field.type in (int, float) and value < 0:
+                raise ValueError(f"{field.name} can't be negative")
+        for name in (
+            "time_limit",
+            "prompt_words",
+            "network_rate",
+            "tick_rate",
+            "input_rate",
+            "ui_scale",
+            "prompt_lines",
+        ):
+            if getattr(self, name) == 0:
+                raise ValueError(f"{name} must be greater than zero")
+        if not 0 < self.port < 65536:
+            raise ValueError("port must be between 1 and 65535")
+
+
+def _convert(name, value):
+    """
+    Convert a setting to the type of its field, accepting strings from the
+    environment or command line. Whole number settings only accept whole
+    numbers, so a TOML value like 2.5 isn't silently cut down to 2.
+
+    Args:
+        name: string naming the setting
+        value: value read from a source
+
+    Returns the converted value.
+    """
+    types = {field.name: field.type for field in fields(Settings)}
+    if name not in types:
+        raise ValueError(f"Unknown setting: {name}")
+    if types[name] is int and (
+        isinstance(value, bool)
+        or (isinstance(value, float) and not value.is_integer())
+    ):
+        raise ValueError(f"{name} must be a whole number, not {value!r}")
+    try:
+        value = types[name](value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid value for {name}: {value!r}") from e
+    return value
+
+
+def load_settings(path=None, env=None, overrides=None):
+    """
+    Build the settings from every source. Call once at startup and pass the
+    result to the parts of the game that need it.
+
+    Args:
+        path: string representing the TOML file to read. Defaults to
+            typerace.toml, which is skipped if it doesn't exist. A path given
+            explicitly must exist.
+        env: mapping of environment variables. Defaults to os.environ.
+            Variables with the TYPERACE_ prefix that don't name a setting
+            are ignored with a warning.
+        overrides: dict mapping setting names to values from the command
+            line
+
+    Returns a Settings.
+    """
+    values = {}
+    names = {field.name for field in fields(Settings)}
+
+    if path is not None or os.path.exists(DEFAULT_PATH):
+        with open(path or DEFAULT_PATH, "rb") as file:
+            for name, value in tomllib.load(file).items():
+                values[name] = _convert(name, value)
+
+    env = os.environ if env is None else env
+    for key, value in env.items():
+        if key.startswith(ENV_PREFIX):
+            name = key[len(ENV_PREFIX) :].lower()
+            if name not in names:
+                print(f"Ignoring unknown setting in environment: {key}")
+                continue
+            values[name] = _convert(name, value)
+
+    for name, value in (overrides or {}).items():
+        values[name] = _convert(name, value)
+
+    return replace(Settings(), **values)
+
+
+def parse_override(text):
+    """
+    Parse a command line override of the form name=value.
+
+    Args:
+        text: string given on the command line
+
+    Returns a (name, value) tuple of strings.
+    """
+    name, separator, value = text.partition("=")
+    if not separator:
+        raise ValueError(f"Expected name=value, got {text!r}")
+    return name.strip(), value.strip()
@@ -0,0 +1,120 @@
+"""
+Rolling-window typing speed and a downsampled speed curve for each race.
+"""
+
+from array import array
+
+
+class SpeedTracker:
+    """
+    Track correct characters typed per second in a ring buffer covering the
+    last few seconds, giving an instantaneous WPM in O(1) per update instead
+    of rescanning the keystroke history.
+
+    Attributes:
+        _window: int representing the length of the rolling window in seconds
+        _buckets: array of ints, the net correct characters typed in each of
+            the last `_window` seconds, indexed by second modulo `_window`
+        _window_sum: int representing the sum of all buckets
+        _second: int representing the second currently being filled
+        _max_points: int representing the most points the curve may hold
+        _curve: array of WPM samples, one every `_curve_step` seconds
+        _curve_step: int representing the seconds between curve samples.
+            Doubles every time the curve fills up.
+    """
+
+    def __init__(self, window=10, max_points=120):
+        """
+        Create a new speed tracker at the start of a race.
+
+        Args:
+            window: int representing how many seconds the instantaneous WPM
+                should cover
+            max_points: int representing the most samples to keep in the
+                speed curve. When it fills up, neighbouring samples are
+                averaged together to halve the curve's resolution.
+        """
+        self._window = window
+        self._buckets = array("i", [0] * window)
+        self._window_sum = 0
+        self._second = 0
+        self._max_points = max_points
+        self._curve = array("H")
+        self._curve_step = 1
+
+    def add(self, count):
+        """
+        Add correct characters to the current second. A negative count
+        removes them, for example when a correct character is deleted.
+
+        Args:
+            count: int representing the change in correct characters
+        """
+        self._buckets[self._second % self._window] += count
+        self._window_sum += count
+
+    def advance(self, elapsed):
+        """
+        Move the tracker up to the current race time, closing any seconds
+        that have finished. Every second of the race is closed exactly once,
+        so the cost is O(1) amortized over the race.
+
+        Args:
+            elapsed: float representing the seconds since the race started
+        """
+        target = int(elapsed)
+        while self._second < target:
+            self._second += 1
+            if self._second % self._curve_step == 0:
+                # The buckets hold exactly the whole seconds before this one
+                span = min(self._window, self._second)
+                self._sample(max(0, self._window_sum) / 5 / (span / 60))
+            bucket = self._second % self._window
+            self._window_sum -= self._buckets[bucket]
+            self._buckets[bucket] = 0
+
+    def _sample(self, wpm):
+        """
+        Append a sample to the speed curve, halving the resolution of the
+        curve first if it is full.
+
+        Args:
+            wpm: float representing the instantaneous WPM to record
+        """
+        if len(self._curve) == self._max_points:
+            self._curve = array(
+                "H",
+                [
+                    (self._curve[i] + self._curve[i + 1]) // 2
+                    for i in range(0, len(self._curve) - 1, 2)
+                ],
+            )
+            self._curve_step *= 2
+        self._curve.append(min(int(wpm), 0xFFFF))
+
+    def wpm(self, elapsed):
+        """
+        Calculate the words per minute over the rolling window, using five
+        characters per word. The window holds the previous whole seconds plus
+        the part of the current second so far. During the first seconds of
+        the race only the time elapsed so far is counted.
+
+        Args:
+            elapsed: float representing the seconds since the race started
+
+        Returns a float representing the instantaneous WPM.
+        """
+        span = min(self._window - 1 + elapsed % 1, elapsed)
+        if span <= 0:
+            return 0.0
+        return max(0, self._window_sum) / 5 / (span / 60)
+
+    @property
+    def curve(self):
+        """Get the speed curve samples"""
+        return self._curve
+
+    @property
+    def curve_step(self):
+        """Get the number of seconds between speed curve samples"""
+        return self._curve_step
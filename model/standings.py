@@ -0,0 +1,128 @@
+"""
+Standings of every racer in a multiplayer race, updated from network
+snapshots and read by the view every frame.
+"""
+
+# Names of the racer playing on this computer and of the other player in a
+# two player race
+OWN_NAME = "You"
+OPPONENT_NAME = "Opponent"
+
+
+class Racer:
+    """
+    One racer's latest known progress.
+
+    Attributes:
+        name: string naming the racer
+        progress: int representing how many characters of the prompt the
+            racer has typed
+        wpm: int representing the racer's words per minute
+        version: int counting the changes to progress and wpm, so views can
+            tell when to draw the racer again
+    """
+
+    def __init__(self, name):
+        """
+        Create a racer who hasn't typed anything yet.
+
+        Args:
+            name: string naming the racer
+        """
+        self.name = name
+        self.progress = 0
+        self.wpm = 0
+        self.version = 0
+
+
+class Standings:
+    """
+    Every racer in a race, ranked by how far through the prompt they are.
+
+    Updates come from the network thread and the game loop, and the ranking
+    is read by the view every frame, so it is only sorted again after a
+    racer's values actually change.
+
+    Attributes:
+        prompt_length: int representing the number of characters in the
+            prompt
+        _racers: dict mapping names to Racers, in the order they joined
+        _ranked: list of Racers in race order, or None if it must be sorted
+            again
+    """
+
+    def __init__(self, prompt_length):
+        """
+        Create standings with no racers.
+
+        Args:
+            prompt_length: int representing the number of characters in the
+                prompt
+        """
+        self.prompt_length = prompt_length
+        self._racers = {}
+        self._ranked = None
+
+    def update(self, name, progress, wpm):
+        """
+        Set a racer's progress, adding them if they are new.
+
+        Args:
+            name: string naming the racer
+            progress: int representing how many characters they have typed
+            wpm: int representing their words per minute
+        """
+        racer = self._racers.get(name)
+        if racer is None:
+            racer = self._racers[name] = Racer(name)
+            self._ranked = None
+        if racer.progress == progress and racer.wpm == wpm:
+            return
+        racer.progress = progress
+        racer.wpm = wpm
+        racer.version += 1
+        self._ranked = None
+
+    def ranked(self):
+        """
+        Get the racers in race order: furthest through the prompt first,
+        then fastest, then by name.
+
+        Returns a list of Racers, which must not be changed.
+        """
+        ranked = self._ranked
+        if ranked is None:
+            ranked = self._ranked = sorted(
+                list(self._racers.values()),
+                key=lambda racer: (-racer.progress, -racer.wpm, racer.name),
+            )
+        return ranked
+
+    def leaders(self, count, name):
+        """
+        Choose the racers to show when only some fit: the leaders, with one
+        racer in the last place shown if they are further back.
+
+        Args:
+            count: int representing how many racers fit
+            name: string naming the racer to always show, usually OWN_NAME
+
+        Returns a list of (position, Racer) tuples, leader first.
+        """
+        ranked = self.ranked()
+        shown = list(enumerate(ranked[:count], start=1))
+        if len(ranked) > count > 0:
+            for position, racer in enumerate(ranked, start=1):
+                if racer.name == name:
+                    if position > count:
+                        shown[-1] = (position, racer)
+                    break
+        return shown
+
+    def __len__(self):
+        """Return the number of racers"""
+        return len(self._racers)
+
+    def __getitem__(self, name):
+        """Get the Racer with a name"""
+        return self._racers[name]
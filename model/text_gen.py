@@ -1,21 +1,115 @@
 """Generate a paragraph of text for all players to type."""
 
 import random
-from model.word_list import words
+from model.ngram import load_table
 
+_ngram_table = None
+_adaptive = None
 
-def random_paragraph():
+# Largest prompt seed. Seeds are 32 bit so they fit in a replay header.
+MAX_SEED = 2**32 - 1
+
+
+def random_paragraph(rng=random, num_words=200):
     """
-    Generate a random paragraph of 200 words from the word list in word_list.py.
+    Generate a random paragraph of words from the word list in word_list.py.
+
+    Args:
+        rng: random.Random instance (or the random module) to draw words with
+        num_words: int representing how many words to generate
 
     Returns a string representing all the words in the paragraph.
     """
-    # Create a list of 200 randomly chosen words from the word list
-    random_words = random.choices(words, k=200)
+    # Imported here so the word list is only loaded once it is needed
+    # pylint: disable=import-outside-toplevel
+    from model.word_list import words
+
+    # Create a list of randomly chosen words from the word list
+    random_words = rng.choices(words, k=num_words)
     # Join all words in the list and separate with spaces.
     return " ".join(random_words)
 
 
+def markov_paragraph(rng=random, num_words=200):
+    """
+    Generate a paragraph of words by walking an n-gram Markov chain built
+    from the local corpus, which reads more like real prose than
+    random_paragraph.
+
+    The transition table is loaded on first use and kept for later prompts.
+
+    Args:
+        rng: random.Random instance (or the random module) to walk the chain
+            with
+        num_words: int representing how many words to generate
+
+    Returns a string representing all the words in the paragraph.
+    """
+    global _ngram_table  # pylint: disable=global-statement
+    if _ngram_table is None:
+        _ngram_table = load_table()
+    return " ".join(_ngram_table.generate(num_words, rng))
+
+
+def adaptive_generator():
+    """
+    Get the shared adaptive generator, creating it on first use. Call its
+    update method with a player's statistics to adapt future prompts.
+
+    Returns an AdaptiveGenerator.
+    """
+    global _adaptive  # pylint: disable=global-statement
+    if _adaptive is None:
+        # Imported here so NumPy is only loaded once the engine is used
+        # pylint: disable=import-outside-toplevel
+        from model.adaptive import AdaptiveGenerator
+
+        _adaptive = AdaptiveGenerator()
+    return _adaptive
+
+
+def adaptive_paragraph(rng=random, num_words=200):
+    """
+    Generate a paragraph of words, favouring words that contain the
+    player's slowest and most mistyped characters and bigrams.
+
+    Args:
+        rng: random.Random instance (or the random module) to draw words with
+        num_words: int representing how many words to generate
+
+    Returns a string representing all the words in the paragraph.
+    """
+    return adaptive_generator()(rng, num_words)
+
+
+# Prompt generators that can be selected by name
+engines = {
+    "random": random_paragraph,
+    "markov": markov_paragraph,
+    "adaptive": adaptive_paragraph,
+}
+
+
+def seeded_paragraph(engine="random", seed=None, num_words=200):
+    """
+    Generate a paragraph that can be regenerated exactly from its seed, so
+    a race can be identified by (engine, seed). The adaptive engine also
+    depends on the statistics it was last updated with, so replays store the
+    prompt text as well.
+
+    Args:
+        engine: string naming the generator in engines
+        seed: int representing the seed to generate from. If not provided, a
+            new random 32 bit seed is picked.
+        num_words: int representing how many words to generate
+
+    Returns a tuple of the int seed and the paragraph string.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    return seed, engines[engine](random.Random(seed), num_words)
+
+
 def sample_paragraph():
     """
     Pre-set paragraph of 200 words without punctuation.
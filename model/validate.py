@@ -0,0 +1,144 @@
+"""
+Re-score recorded races in parallel to audit reported results.
+
+Run from the repository root with:
+
+    python -m model.validate replays/*.trr --report audit.csv
+"""
+
+import argparse
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from model.replay import ReplayEngine, load_replay
+
+
+@dataclass
+class ValidationResult:
+    """
+    Outcome of re-scoring one replay.
+
+    Attributes:
+        path: string representing the replay file
+        reported_wpm: int representing the WPM stored in the replay, or None
+            if the file could not be read
+        recomputed_wpm: int representing the WPM from replaying the
+            keystrokes, or None if the file could not be read
+        error: string describing why the file could not be re-scored, or
+            None
+    """
+
+    path: str
+    reported_wpm: int = None
+    recomputed_wpm: int = None
+    error: str = None
+
+    def flagged(self, tolerance=0):
+        """
+        Check whether the race needs a closer look.
+
+        Args:
+            tolerance: int representing how far the recomputed WPM may be
+                from the reported WPM
+
+        Returns True if the file is unreadable or the WPMs differ by more
+        than the tolerance.
+        """
+        if self.error is not None:
+            return True
+        return abs(self.reported_wpm - self.recomputed_wpm) > tolerance
+
+
+def rescore(path):
+    """
+    Replay a race through the TypeRacePlayer scoring logic.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+
+    Args:
+        path: string representing the replay file
+
+    Returns a ValidationResult.
+    """
+    try:
+        replay = load_replay(path)
+        # One snapshot is enough, the race is only played once
+        engine = ReplayEngine(replay, snapshot_interval=float("inf"))
+        engine.advance_to(replay.duration)
+    except (OSError, ValueError, KeyError) as e:
+        return ValidationResult(path, error=str(e))
+    return ValidationResult(path, replay.wpm, engine.player.wpm)
+
+
+def validate_replays(paths, workers=None, chunksize=8):
+    """
+    Re-score replays across a pool of worker processes.
+
+    Results are yielded in the same order as paths as soon as they are
+    ready, so a report can be written while the rest are still running.
+
+    Args:
+        paths: list of replay file paths
+        workers: int representing how many processes to use. Defaults to
+            the number of CPUs.
+        chunksize: int representing how many replays to send to a worker at
+            a time
+
+    Yields a ValidationResult per replay.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(rescore, paths, chunksize=chunksize)
+
+
+def main(argv=None):
+    """
+    Command line entry point. Writes a CSV report of every replay and
+    prints a summary of the flagged races.
+
+    Args:
+        argv: list of command line arguments. Defaults to sys.argv[1:].
+
+    Returns an int exit code: 1 if any race was flagged, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("paths", nargs="+", help="replay files to re-score")
+    parser.add_argument("--workers", type=int, help="number of processes")
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=0,
+        help="allowed difference between reported and recomputed WPM",
+    )
+    parser.add_argument(
+        "--report", help="CSV file to write (defaults to standard output)"
+    )
+    args = parser.parse_args(argv)
+
+    # pylint: disable=consider-using-with
+    output = open(args.report, "w", newline="") if args.report else sys.stdout
+    writer = csv.writer(output)
+    writer.writerow(
+        ["path", "reported_wpm", "recomputed_wpm", "flagged", "error"]
+    )
+    flagged = 0
+    for result in validate_replays(args.paths, args.workers):
+        is_flagged = result.flagged(args.tolerance)
+        flagged += is_flagged
+        writer.writerow(
+            [
+                result.path,
+                result.reported_wpm,
+                result.recomputed_wpm,
+                int(is_flagged),
+                result.error or "",
+            ]
+        )
+    if output is not sys.stdout:
+        output.close()
+    print(f"{flagged} of {len(args.paths)} races flagged", file=sys.stderr)
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
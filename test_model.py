@@ -1,10 +1,42 @@
 """
 Unit tests for Sleepy Follow user account class.
 """
-from unittest.mock import patch
-from datetime import timedelta
+
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+from datetime import date
 import pytest
 from model.model import TypeRacePlayer
+from model.ngram import NgramTable, load_table
+from model.text_gen import MAX_SEED
+from model.prompt_pool import PromptPool
+from model.keystrokes import INSERT, BACKSPACE, IGNORED
+from model.clock import ManualClock
+from model.replay import ReplayEngine, load_replay, save_replay
+from model.ghost import GhostPlayer
+from model.results import ResultsStore
+from model.analytics import (
+    NUM_CHARS,
+    KeyStats,
+    analyze_player,
+    analyze_replays,
+)
+from model.adaptive import ERROR_WEIGHT, AdaptiveGenerator
+from model.validate import validate_replays
+from model.anticheat import CheatDetector
+from model.server import Network
+from model.settings import Settings, load_settings, parse_override
+from model.scheduler import Scheduler
+from model.latency import LatencyHistogram, LatencyTracker
+from model.standings import OPPONENT_NAME, Standings
+from controller.input_queue import InputQueue
+from controller.bot import BotController
+import typerace
+
 
 @pytest.fixture
 def player():
@@ -12,7 +44,7 @@ def player():
     Fixture that returns a new instance of SinglePlayer with a 60-second
     time limit.
     """
-    return TypeRacePlayer(time_limit=60)
+    return TypeRacePlayer(time_limit=60, clock=ManualClock())
 
 
 def test_update_text(player):
@@ -24,24 +56,22 @@ def test_update_text(player):
     assert player.typed_text == sample_input
 
 
-@patch("model.model.datetime")
-def test_update_time_game_over(mock_datetime, player):
+def test_update_time_game_over(player):
     """
     Test that update_time sets game_over to True when time runs out.
     """
-    mock_datetime.now.return_value = player._start_time + timedelta(seconds=70)
+    player.clock.advance(70)
     player.update_time()
     assert player.time_remaining <= 0
     assert player.game_over is True
 
 
-@patch("model.model.datetime")
-def test_wpm(mock_datetime, player):
+def test_wpm(player):
     """
     Test that update_wpm correctly calculates WPM based on typed correct
     words and elapsed time.
     """
-    mock_datetime.now.return_value = player._start_time + timedelta(seconds=30)
+    player.clock.advance(30)
     player.update_time()
     player._prompt_text = "this is my test sentence "
     player.update_text("this is my test sentence ")
@@ -84,3 +114,892 @@ def test_generate_paragraph(player):
     paragraph = player.generate_paragraph()
     assert isinstance(paragraph, str)
     assert len(paragraph) > 0
+
+
+def test_markov_engine_generates_corpus_words():
+    """
+    Test that the markov text engine builds prompts only from words in the
+    corpus.
+    """
+    player = TypeRacePlayer(text_engine="markov")
+    table = load_table()
+    prompt_words = player.prompt_text.split(" ")
+    assert len(prompt_words) == 200
+    assert set(prompt_words) <= set(table.vocab)
+
+
+def test_ngram_table_round_trip(tmp_path):
+    """
+    Test that a saved n-gram table loads back with identical CSR arrays and
+    generates the same words for the same seed.
+    """
+    table = NgramTable.build("the cat sat on the mat and the cat ran", 1)
+    path = tmp_path / "table.ngram"
+    table.save(path)
+    loaded = NgramTable.load(path)
+    assert loaded.vocab == table.vocab
+    assert loaded.indptr == table.indptr
+    assert loaded.indices == table.indices
+    assert loaded.generate(20, random.Random(1)) == table.generate(
+        20, random.Random(1)
+    )
+
+
+def test_prompt_pool_refills_and_deduplicates():
+    """
+    Test that the prompt pool fills itself in the background, never hands
+    out a duplicate prompt, and serves the player's prompt.
+    """
+    counter = iter(range(1_000_000))
+    # Only every third prompt is new, the two after it repeat it and must
+    # be dropped
+    pool = PromptPool(
+        lambda: (0, f"prompt {next(counter) // 3 * 3}"), size=6, low_water=2
+    )
+    try:
+        prompts = []
+        for _ in range(3):
+            assert pool.wait_ready(6, timeout=5)
+            prompts += [pool.get() for _ in range(5)]
+        assert len(set(prompts)) == len(prompts)
+        player = TypeRacePlayer(prompt_pool=pool)
+        assert player.prompt_seed == 0
+        assert player.prompt_text.startswith("prompt ")
+    finally:
+        pool.close()
+
+    # A generator that only repeats itself still fills the pool
+    pool = PromptPool(lambda: (0, "prompt"), size=3, low_water=1, retries=2)
+    try:
+        assert pool.wait_ready(3, timeout=5)
+    finally:
+        pool.close()
+
+
+def test_record_keystroke(player):
+    """
+    Test that recorded keystrokes land in the player's keystroke log in order
+    with non-decreasing timestamps.
+    """
+    player.record_keystroke(ord("a"), INSERT)
+    player.record_keystroke(8, BACKSPACE)
+    log = player.keystrokes
+    assert len(log) == 2
+    assert log[0][:2] == (ord("a"), INSERT)
+    assert log[1][:2] == (8, BACKSPACE)
+    assert log.times[0] <= log.times[1]
+
+
+def test_delta_edits_match_update_text(player):
+    """
+    Test that typing with append_char, backspace and apply_batch gives the
+    same text, mistakes and correct word count as setting the whole string.
+    """
+    player._prompt_text = "this is my test sentence "
+    player.apply_batch("thsi\b\b\bhis is mx")
+    player.backspace()
+    player.append_char("y")
+    player.apply_batch(" test ")
+    assert player.typed_text == "this is my test "
+    assert player.check_accuracy() == 4
+
+    other = TypeRacePlayer()
+    other._prompt_text = player._prompt_text
+    other.update_text("this is mx test ")
+    assert other.check_accuracy() == 3
+    other.update_text("this is my test ")
+    assert other.check_accuracy() == 4
+    assert other.mistake_indexes[:16] == player.mistake_indexes[:16]
+
+
+def test_take_first_change(player):
+    """
+    Test that the player reports the first typed character edited since it
+    was last asked, so views only redraw from there.
+    """
+    player.update_text("abcd")
+    assert player.take_first_change() == 0
+    assert player.take_first_change() is None
+    player.backspace()
+    player.append_char("x")
+    assert player.take_first_change() == 3
+    player.update_text("aycd")
+    assert player.take_first_change() == 1
+    player.restore(player.snapshot())
+    assert player.take_first_change() == 0
+
+
+def test_accuracy_counts_corrected_mistakes(player):
+    """
+    Test that a mistake still counts against the accuracy after it is
+    deleted and typed again correctly.
+    """
+    player._prompt_text = "this is my test sentence "
+    player.apply_batch("thsi")
+    assert player.accuracy == 0.5
+    player.apply_batch("\b\bis")
+    assert player.typed_text == "this"
+    assert player.accuracy == pytest.approx(4 / 6)
+    assert player.mistake_indexes[:4] == [0, 0, 0, 0]
+
+    snapshot = player.snapshot()
+    player.apply_batch(" iz")
+    player.restore(snapshot)
+    assert player.accuracy == pytest.approx(4 / 6)
+
+
+def test_wpm_sub_second(player):
+    """
+    Test that WPM uses fractional elapsed time, so it is already correct
+    before the first whole second has passed.
+    """
+    player._prompt_text = "one two three "
+    player.update_text("one ")
+    player.clock.advance(0.5)
+    player.update_time()
+    player.update_wpm()
+    assert player.time_remaining == pytest.approx(59.5)
+    assert player.wpm == 120  # 1 word in 1/120 of a minute
+
+
+def test_instant_wpm_rolling_window(player):
+    """
+    Test that the instantaneous WPM only counts the last few seconds and that
+    the speed curve gets one sample per second.
+    """
+    player._prompt_text = "abcde " * 100
+    # 50 correct characters (10 words) in the first second
+    player.update_text(("abcde " * 10)[:50])
+    player.clock.advance(1)
+    player.update_time()
+    player.update_wpm()
+    assert player.instant_wpm == 600
+    # Nothing typed for the next 14 seconds, so the window is empty
+    for _ in range(14):
+        player.clock.advance(1)
+        player.update_time()
+    player.update_wpm()
+    assert player.instant_wpm == 0
+    assert player.wpm == 32  # 8 finished words in a quarter of a minute
+    curve = player.speed.curve
+    assert curve[0] == 600
+    assert len(curve) == 15
+    assert curve[-1] == 0
+
+
+def test_replay_round_trip_and_seek(player, tmp_path):
+    """
+    Test that a saved race replays to the same WPM and that seeking gives the
+    same state as playing from the start.
+    """
+    player.set_start_time()
+    for char in player.prompt_text[:80] + "\b\bxy":
+        player.clock.advance(0.25)
+        if char == "\b":
+            player.apply_keystroke(8, BACKSPACE)
+        else:
+            player.apply_keystroke(ord(char), INSERT)
+        player.update_time()
+        player.update_wpm()
+    path = tmp_path / "race.trr"
+    save_replay(player, str(path))
+
+    replay = load_replay(path)
+    assert len(replay.keystrokes) == 84
+    engine = ReplayEngine(replay, snapshot_interval=2.0)
+    assert engine.player.prompt_text == player.prompt_text
+    engine.play(speed=None)
+    assert engine.player.typed_text == player.typed_text
+    assert engine.player.wpm == player.wpm == replay.wpm
+
+    engine.seek(7.3)
+    sought = engine.player.typed_text
+    fresh = ReplayEngine(replay, snapshot_interval=100.0)
+    fresh.advance_to(7.3)
+    assert sought == fresh.player.typed_text
+    assert len(sought) == 29  # Keystrokes at 0.25, 0.5, ... 7.25 seconds
+
+
+def test_ghost_streams_recorded_caret(player, tmp_path):
+    """
+    Test that a ghost player gets the recorded prompt and that the ghost's
+    caret follows the recording, reading it in small chunks.
+    """
+    player.set_start_time()
+    for char in player.prompt_text[:10]:
+        player.clock.advance(0.5)
+        player.apply_keystroke(ord(char), INSERT)
+    player.clock.advance(0.5)
+    player.apply_keystroke(8, BACKSPACE)
+    player.update_time()
+    path = str(tmp_path / "ghost.trr")
+    save_replay(player, path)
+
+    racer = GhostPlayer(path, clock=ManualClock())
+    racer._ghost._chunk_records = 3
+    assert racer.prompt_text == player.prompt_text
+    racer.set_start_time()
+    racer.clock.advance(2.2)
+    racer.update_time()
+    assert racer.ghost_position == 4
+    racer.clock.advance(3.0)
+    racer.update_time()
+    assert racer.ghost_position == 10
+    racer.clock.advance(10)
+    racer.update_time()
+    assert racer.ghost_position == 9
+
+
+def test_ghost_stays_on_prompt(tmp_path):
+    """
+    Test that a ghost recorded typing past the end of its prompt stops at
+    the end, as the player did.
+    """
+    player = TypeRacePlayer(clock=ManualClock(), prompt=(0, "ab"))
+    player.set_start_time()
+    for char in "abc":
+        player.clock.advance(0.5)
+        player.apply_keystroke(ord(char), INSERT)
+    player.clock.advance(0.5)
+    player.apply_keystroke(8, BACKSPACE)
+    player.update_time()
+    path = str(tmp_path / "ghost.trr")
+    save_replay(player, path)
+
+    racer = GhostPlayer(path, clock=ManualClock())
+    racer.set_start_time()
+    racer.clock.advance(1.6)
+    racer.update_time()
+    assert racer.ghost_position == 2
+    racer.clock.advance(1.0)
+    racer.update_time()
+    assert racer.ghost_position == player.typed_length == 1
+
+
+def test_results_store_leaderboards(tmp_path):
+    """
+    Test that batched results are written and that each leaderboard returns
+    the fastest matching races first.
+    """
+    day = 86400 * 20000  # Midnight UTC, 2024-10-04
+    with ResultsStore(str(tmp_path / "results.db"), batch_size=3) as store:
+        store.add("ana", "random:1", 50, 0.9, 60, day + 10)
+        store.add("ana", "random:2", 70, 0.95, 60, day + 20)
+        store.add("ben", "random:1", 60, 1.0, 60, day + 30)
+        store.add("ben", "random:1", 40, 0.8, 60, day + 86400)
+        assert [row[2] for row in store.top_by_prompt("random:1")] == [
+            60,
+            50,
+            40,
+        ]
+        assert [row[2] for row in store.top_by_player("ana", 1)] == [70]
+        today = store.top_by_day(date(2024, 10, 4))
+        assert [row[0] for row in today] == ["ana", "ben", "ana"]
+
+    # Results are still there after reopening the database
+    with ResultsStore(str(tmp_path / "results.db")) as store:
+        assert len(store.top_by_prompt("random:1")) == 3
+        assert store.latest_curve("ana") is None
+
+
+def test_results_store_speed_curve(player, tmp_path):
+    """
+    Test that a race's speed curve is saved with its result, including in a
+    database made before curves were stored.
+    """
+    path = str(tmp_path / "results.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE races (id INTEGER PRIMARY KEY, player TEXT NOT NULL, "
+            "prompt_id TEXT NOT NULL, wpm INTEGER NOT NULL, "
+            "accuracy REAL NOT NULL, duration REAL NOT NULL, "
+            "finished_at REAL NOT NULL, day INTEGER NOT NULL)"
+        )
+    connection.close()
+
+    player.set_start_time()
+    for char in player.prompt_text[:40]:
+        player.clock.advance(0.25)
+        player.apply_keystroke(ord(char), INSERT)
+        player.update_time()
+    assert len(player.speed.curve) == 10
+    with ResultsStore(path) as store:
+        store.add("ana", "random:1", 50, 0.9, 60, 10)
+        store.add_race("ana", player)
+        curve, step = store.latest_curve("ana")
+    assert curve == list(player.speed.curve)
+    assert step == 1
+
+
+def test_key_stats_from_player_and_replay(player, tmp_path):
+    """
+    Test that per-key and per-bigram statistics count mistakes and latency
+    per prompt character, that a replay gives the same statistics as the
+    live race, and that unreadable replays are skipped.
+    """
+    player._prompt_text = "abab"
+    player._mistake_indexes = [0] * 4
+    player.set_start_time()
+    # Type "a", "x" (wrong), backspace, then "b" "a" "b"
+    for key, action, delay in (
+        (ord("a"), INSERT, 0.1),
+        (ord("x"), INSERT, 0.3),
+        (8, BACKSPACE, 0.2),
+        (ord("b"), INSERT, 0.2),
+        (ord("a"), INSERT, 0.1),
+        (ord("b"), INSERT, 0.2),
+    ):
+        player.clock.advance(delay)
+        player.apply_keystroke(key, action)
+    stats = analyze_player(player)
+    a, b = ord("a"), ord("b")
+    assert stats.counts[a] == 2 and stats.counts[b] == 3
+    assert stats.errors[b] == 1 and stats.errors[a] == 0
+    assert stats.mean_latencies()[a] == pytest.approx(0.1)
+    assert stats.bigram_counts[a * NUM_CHARS + b] == 2
+    assert stats.bigram_counts[b * NUM_CHARS + a] == 1
+    assert stats.slowest_chars(1, min_count=1)[0][0] == "b"
+    assert stats.error_prone_chars(min_count=1) == [("b", pytest.approx(1 / 3))]
+
+    # The replay regenerates the prompt from the seed, so compare a real one
+    player = TypeRacePlayer(clock=ManualClock())
+    player.set_start_time()
+    for char in player.prompt_text[:30]:
+        player.clock.advance(0.2)
+        player.apply_keystroke(ord(char), INSERT)
+    path = str(tmp_path / "race.trr")
+    save_replay(player, path)
+    live = analyze_player(player)
+    # Unreadable files are skipped rather than ending the analysis
+    truncated = tmp_path / "truncated.trr"
+    with open(path, "rb") as file:
+        truncated.write_bytes(file.read()[:-5])
+    corrupt = tmp_path / "corrupt.trr"
+    corrupt.write_bytes(b"not a replay")
+    recorded = analyze_replays([path, str(truncated), path, str(corrupt)])
+    assert (recorded.counts == 2 * live.counts).all()
+    assert (recorded.bigram_counts == 2 * live.bigram_counts).all()
+    assert [path for path, _ in recorded.unreadable] == [
+        str(truncated),
+        str(corrupt),
+    ]
+    assert "2 unreadable replays skipped" in recorded.summary()[0]
+
+
+def test_adaptive_generator_favours_weak_keys():
+    """
+    Test that the adaptive generator scores words containing a mistyped
+    character higher, only changes the scores of affected words, and
+    samples weak words more often.
+    """
+    generator = AdaptiveGenerator(["aa", "bb", "ab", "cc"])
+    assert generator(random.Random(3), 10).count(" ") == 9
+    stats = KeyStats()
+    a = ord("a")
+    stats.counts[a] = stats.counts[ord("b")] = 10
+    stats.latency_ns[a] = stats.latency_ns[ord("b")] = 10 * 1e8
+    stats.errors[a] = 5  # Half of all a's are mistyped
+    generator.update(stats)
+    scores = generator.scores
+    assert scores[0] == pytest.approx(1 + 2 * ERROR_WEIGHT / 2)
+    assert scores[2] == pytest.approx(1 + ERROR_WEIGHT / 2)
+    assert scores[1] == scores[3] == 1
+    sample = generator(random.Random(1), 2000).split(" ")
+    assert sample.count("aa") > 2 * sample.count("bb")
+
+
+def test_validate_replays_flags_wrong_wpm(player, tmp_path):
+    """
+    Test that batch validation re-scores replays in worker processes and
+    flags a race whose reported WPM does not match its keystrokes, as well as
+    unreadable and truncated files.
+    """
+    player.set_start_time()
+    for char in player.prompt_text[:60]:
+        player.clock.advance(0.2)
+        player.apply_keystroke(ord(char), INSERT)
+    player.update_time()
+    player.update_wpm()
+    honest = str(tmp_path / "honest.trr")
+    save_replay(player, honest)
+    player._wpm += 50
+    cheated = str(tmp_path / "cheated.trr")
+    save_replay(player, cheated)
+    broken = tmp_path / "broken.trr"
+    broken.write_bytes(b"not a replay")
+    truncated = tmp_path / "truncated.trr"
+    with open(honest, "rb") as file:
+        truncated.write_bytes(file.read()[:-5])
+
+    paths = [honest, cheated, str(broken), str(truncated)]
+    results = list(validate_replays(paths, workers=2))
+    assert [result.flagged() for result in results] == [
+        False,
+        True,
+        True,
+        True,
+    ]
+    assert results[1].recomputed_wpm == results[0].reported_wpm
+    assert results[2].error is not None
+    assert "truncated" in results[3].error
+
+
+def test_cheat_detector():
+    """
+    Test that human-like typing is not flagged, while scripted regular
+    timing and pasted text are.
+    """
+    rng = random.Random(0)
+    human, bot, paster = CheatDetector(), CheatDetector(), CheatDetector()
+    human_time = bot_time = 0
+    for _ in range(300):
+        human_time += int(rng.lognormvariate(math.log(180e6), 0.5))
+        human.update(human_time, INSERT)
+        bot_time += 60_000_000
+        bot.update(bot_time, INSERT)
+    for i in range(40):
+        paster.update(1_000_000_000 + i * 1000, INSERT)
+
+    assert human.confidence < 0.2 and not human.flagged
+    assert bot.flagged and bot.reasons()[0] == "regular timing"
+    assert paster.flagged and "pasting" in paster.reasons()
+
+
+def test_cheat_detector_batched_keys():
+    """
+    Test that keystrokes collected in the same poll and Shift pressed just
+    before a capital letter don't get an honest player flagged.
+    """
+    rng = random.Random(0)
+    detector = CheatDetector()
+    time = 0
+    for i in range(300):
+        time += int(rng.lognormvariate(math.log(180e6), 0.5))
+        if i % 10 == 0:
+            detector.update(time - 5_000_000, IGNORED)
+        detector.update(time, INSERT)
+        if i % 3 == 0:
+            # The next key was drained in the same poll as this one
+            detector.update(time, INSERT)
+
+    assert not detector.flagged and detector.confidence < 0.2
+
+
+def test_network_message_round_trip(player):
+    """
+    Test that a network message carries the wpm and new keystroke timing,
+    only once each keystroke is fully recorded, and that the receiving side
+    feeds it to the opponent cheat detector.
+    """
+
+    class LocalNetwork(Network):
+        """Network that doesn't look up an IP address"""
+
+        def get_host_ip(self):
+            return "127.0.0.1"
+
+    player.set_start_time()
+    player.clock.advance(0.5)
+    player.apply_keystroke(ord("a"), INSERT)
+    player._wpm = 42
+    sender = LocalNetwork(player)
+    assert sender.encode_message() == b"42 0:500000\n"
+    assert sender.encode_message() == b"42 \n"
+
+    # A keystroke the game thread is still appending isn't sent until its
+    # time is written
+    player.keystrokes.keys.append(ord("b"))
+    player.keystrokes.actions.append(INSERT)
+    assert sender.encode_message() == b"42 \n"
+    player.keystrokes.times.append(player.start_time + 700_000_000)
+    assert sender.encode_message() == b"42 0:700000\n"
+
+    opponent = TypeRacePlayer(clock=ManualClock())
+    opponent.opponent_wpm = 0
+    opponent.opponent_detector = CheatDetector()
+    LocalNetwork(opponent).receive_message("42 0:500000,1:600000")
+    assert opponent.opponent_wpm == 42
+    assert opponent.opponent_detector._keys == 2
+
+
+def test_standings(player):
+    """
+    Test that racers are ranked by progress then WPM, that the ranking and
+    a racer's version only change when their values do, and that network
+    messages move the opponent through the standings.
+    """
+    standings = Standings(100)
+    standings.update("a", 10, 50)
+    standings.update("b", 20, 40)
+    standings.update("c", 20, 60)
+    ranked = standings.ranked()
+    assert [racer.name for racer in ranked] == ["c", "b", "a"]
+    assert standings.ranked() is ranked
+
+    standings.update("a", 10, 50)
+    assert standings["a"].version == 1
+    assert standings.ranked() is ranked
+    standings.update("a", 30, 50)
+    assert standings["a"].version == 2
+    assert [racer.name for racer in standings.ranked()] == ["a", "c", "b"]
+    assert len(standings) == 3
+
+    class LocalNetwork(Network):
+        """Network that doesn't look up an IP address"""
+
+        def get_host_ip(self):
+            return "127.0.0.1"
+
+    player.opponent_wpm = 0
+    player.opponent_detector = CheatDetector()
+    player.standings = Standings(len(player.prompt_text))
+    network = LocalNetwork(player)
+    network.receive_message(f"30 {INSERT}:1000,{INSERT}:2000,{INSERT}:3000")
+    network.receive_message(f"31 {BACKSPACE}:4000,{IGNORED}:5000")
+    opponent = player.standings[OPPONENT_NAME]
+    assert (opponent.progress, opponent.wpm) == (2, 31)
+
+
+def test_settings_precedence(tmp_path):
+    """
+    Test that settings from the TOML file, the environment and the command
+    line override each other in that order, and that bad values are rejected.
+    """
+    config = tmp_path / "typerace.toml"
+    config.write_text('time_limit = 30\nport = 6000\ntext_engine = "markov"\n')
+    env = {"TYPERACE_PORT": "7000", "TYPERACE_PROMPT_WORDS": "50"}
+    overrides = dict([parse_override("prompt_words = 25")])
+
+    settings = load_settings(str(config), env, overrides)
+    assert settings.time_limit == 30
+    assert settings.text_engine == "markov"
+    assert settings.port == 7000
+    assert settings.prompt_words == 25
+    assert settings.font_size == Settings().font_size
+
+    player = TypeRacePlayer(
+        settings.time_limit,
+        text_engine=settings.text_engine,
+        prompt_words=settings.prompt_words,
+        clock=ManualClock(),
+    )
+    assert len(player.prompt_text.split()) == 25
+
+    with pytest.raises(AttributeError):
+        settings.port = 1
+    for bad in (
+        {"colour": "red"},
+        {"port": "http"},
+        {"tick_rate": "0"},
+        {"prompt_words": 2.5},
+        {"fps_cap": True},
+    ):
+        with pytest.raises(ValueError):
+            load_settings(str(config), {}, bad)
+    assert (
+        load_settings(str(config), {}, {"prompt_words": 25.0}).prompt_words
+        == 25
+    )
+    with pytest.raises(ValueError):
+        parse_override("port")
+
+
+def test_settings_errors(tmp_path, monkeypatch, capsys):
+    """
+    Test that a missing config file is a command line error and unknown
+    settings in the environment are ignored with a warning.
+    """
+    with pytest.raises(SystemExit):
+        typerace.parse_args([f"--config={tmp_path / 'missing.toml'}"])
+    assert "missing.toml" in capsys.readouterr().err
+
+    monkeypatch.chdir(tmp_path)
+    env = {"TYPERACE_COLOUR": "red", "TYPERACE_PORT": "7000"}
+    assert load_settings(env=env).port == 7000
+    assert "TYPERACE_COLOUR" in capsys.readouterr().out
+
+
+def test_bot_types_prompt(player):
+    """
+    Test that a bot types the prompt on the player's clock at its set speed,
+    correcting its mistakes.
+    """
+    bot = BotController(player, wpm=60, accuracy=0.9, seed=1)
+    player.set_start_time()
+    # 60 WPM is five keystrokes per second
+    player.clock.advance(10)
+    bot.typechecker()
+
+    assert len(player.keystrokes) == 50
+    assert BACKSPACE in player.keystrokes.actions
+    typed = player.typed_text
+    # Only the last character can still be a mistake
+    assert typed[:-1] == player.prompt_text[: len(typed) - 1]
+
+
+def test_bot_finishes_prompt():
+    """
+    Test that a bot corrects a mistake in the last character of the prompt,
+    and that its speed and accuracy are checked on the command line.
+    """
+    player = TypeRacePlayer(clock=ManualClock(), prompt=(0, "ab"))
+    # Every character is wrong at first, and right once corrected
+    bot = BotController(player, wpm=60, accuracy=0.5, seed=0)
+    mistakes = iter([1.0, 0.0] * 2)
+    bot._rng.random = lambda: next(mistakes)
+    player.set_start_time()
+    player.clock.advance(10)
+    bot.typechecker()
+    assert player.typed_text == "ab"
+    assert list(player.keystrokes.actions) == [INSERT, BACKSPACE, INSERT] * 2
+
+    with pytest.raises(ValueError):
+        BotController(player, wpm=0)
+    for argument in ("--bot-wpm=0", "--bot-wpm=-5", "--bot-accuracy=0"):
+        with pytest.raises(SystemExit):
+            typerace.parse_args([argument])
+    args = typerace.parse_args(["--bot-wpm=120", "--bot-accuracy=1"])[0]
+    assert (args.bot_wpm, args.bot_accuracy) == (120.0, 1.0)
+
+
+def test_headless_bench(capsys):
+    """
+    Test that a headless benchmark race runs on a simulated clock, one tick
+    per loop, and reports its tick times.
+    """
+    assert (
+        typerace.main(
+            [
+                "--mode=single",
+                "--headless",
+                "--bench",
+                "--seed=1",
+                "--set=time_limit=2",
+                "--set=tick_rate=100",
+            ]
+        )
+        == 0
+    )
+    output = capsys.readouterr().out
+    assert "simulation: 201 runs at 100.0/s (100/s)" in output
+    assert "input to model: " in output
+    assert "Game over. WPM: " in output
+
+
+def test_races_take_prompts_from_pool(monkeypatch):
+    """
+    Test that a race without a seed takes its prompt from a prompt pool
+    started in the background, and a seeded race generates its own.
+    """
+    taken = []
+
+    class CountingPool(PromptPool):
+        """PromptPool that records the prompts it hands out"""
+
+        def get(self):
+            prompt = super().get()
+            taken.append(prompt)
+            return prompt
+
+    monkeypatch.setattr(typerace, "PromptPool", CountingPool)
+    argv = [
+        "--mode=single",
+        "--headless",
+        "--bench",
+        "--set=time_limit=1",
+        "--set=prompt_words=5",
+    ]
+    assert typerace.main(argv) == 0
+    assert len(taken) == 1
+    assert typerace.main(argv + ["--seed=1"]) == 0
+    assert len(taken) == 1
+
+
+def test_adaptive_start_with_bad_replay(tmp_path, monkeypatch, capsys):
+    """
+    Test that a corrupt replay doesn't stop an adaptive race from starting.
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "replays").mkdir()
+    (tmp_path / "replays" / "corrupt.trr").write_bytes(b"not a replay")
+    argv = [
+        "--mode=single",
+        "--headless",
+        "--bench",
+        "--seed=1",
+        "--set=text_engine=adaptive",
+        "--set=time_limit=1",
+    ]
+    assert typerace.main(argv) == 0
+    assert "Skipping unreadable replay" in capsys.readouterr().out
+
+
+def test_bot_races_not_saved(tmp_path, monkeypatch, capsys):
+    """
+    Test that a race typed by a bot writes no replay or result unless asked
+    to with --save.
+    """
+    monkeypatch.chdir(tmp_path)
+    argv = [
+        "--mode=single",
+        "--headless",
+        "--seed=1",
+        "--set=time_limit=1",
+        "--name=bot",
+    ]
+    assert typerace.main(argv) == 0
+    assert "not saved" in capsys.readouterr().out
+    assert not (tmp_path / "replays").exists()
+    assert not (tmp_path / "results.db").exists()
+
+    assert typerace.main(argv + ["--save"]) == 0
+    assert "1. bot: " in capsys.readouterr().out
+    assert len(list((tmp_path / "replays").iterdir())) == 1
+
+
+def test_seed_argument(tmp_path, capsys):
+    """
+    Test that prompt seeds must fit in a replay header, and that the
+    largest one is saved and loaded.
+    """
+    for seed in ("-1", "5000000000", "abc"):
+        with pytest.raises(SystemExit):
+            typerace.parse_args([f"--seed={seed}"])
+        assert "whole number from 0 to" in capsys.readouterr().err
+    seed = typerace.parse_args([f"--seed={MAX_SEED}"])[0].seed
+    player = TypeRacePlayer(clock=ManualClock(), seed=seed, prompt_words=5)
+    path = str(tmp_path / "race.trr")
+    save_replay(player, path)
+    assert load_replay(path).seed == MAX_SEED
+
+
+def test_replay_speed_argument(capsys):
+    """
+    Test that the replay speed must be a positive number or 'max'.
+    """
+    assert typerace.parse_args(["--speed=4"])[0].speed == 4.0
+    assert typerace.parse_args(["--speed=max"])[0].speed is None
+    assert typerace.parse_args([])[0].speed == 1.0
+    for speed in ("fast", "0", "-2"):
+        with pytest.raises(SystemExit):
+            typerace.parse_args([f"--speed={speed}"])
+        assert "positive number or 'max'" in capsys.readouterr().err
+
+
+def test_scheduler_fixed_timestep():
+    """
+    Test that fixed ticks keep to their schedule and see their scheduled
+    time through tick_clock even when a slow frame delays them, and that
+    ticks too far behind are dropped.
+    """
+    clock = ManualClock()
+    scheduler = Scheduler(clock, max_catch_up=3)
+    ticks = []
+
+    def tick():
+        ticks.append(scheduler.tick_clock.now_ns())
+        if len(ticks) == 12:
+            scheduler.stop()
+
+    def slow_frame():
+        # Every frame takes a quarter of a second to draw
+        clock.advance(0.25)
+
+    scheduler.add("simulation", 10, tick, fixed=True)
+    scheduler.add("render", 2, slow_frame)
+    scheduler.run()
+
+    # Ticks are 100ms apart in race time however late they ran
+    assert ticks[:3] == [0, 100_000_000, 200_000_000]
+    assert all(t % 100_000_000 == 0 for t in ticks)
+    assert scheduler.stats("simulation").dropped > 0
+    assert scheduler.stats("render").count >= 2
+    assert scheduler.report()[0].startswith("simulation: 12 runs")
+
+
+def test_input_queue_latency():
+    """
+    Test that queued input is only taken once the tick reaches its
+    timestamp, and that the wait is recorded in a histogram.
+    """
+    clock = ManualClock()
+    queue = InputQueue(clock)
+    for ms in (1, 3, 12):
+        clock.set_ns(ms * 1_000_000)
+        queue.put(ms)
+
+    clock.set_ns(16_000_000)
+    assert [event for _, event in queue.take(8_000_000)] == [1, 3]
+    assert len(queue) == 1
+    assert [event for _, event in queue.take(16_000_000)] == [12]
+    assert queue.latency.count == 3
+    assert queue.latency.mean == pytest.approx(32_000_000 / 3)
+
+    histogram = LatencyHistogram()
+    for latency in range(1, 100_001):
+        histogram.record(latency * 1000)
+    # Percentiles are within the 6% bucket error
+    assert histogram.percentile(0.5) == pytest.approx(50_000_000, rel=0.06)
+    assert histogram.percentile(0.99) == pytest.approx(99_000_000, rel=0.06)
+    assert histogram.max == 100_000_000
+
+
+def test_latency_tracker(player):
+    """
+    Test that keystrokes are followed from receipt to the model update and
+    to the first frame drawn after it, leaving out keys that edit nothing.
+    """
+    clock = player.clock
+    tracker = LatencyTracker(clock)
+    player.set_start_time()
+    player.record_keystroke(ord("a"), INSERT)
+    clock.advance(0.002)
+    player.record_keystroke(0, IGNORED)
+    clock.advance(0.003)
+    tracker.applied(player.keystrokes)
+    tracker.applied(player.keystrokes)
+    clock.advance(0.010)
+    tracker.presented()
+    tracker.presented()
+
+    assert tracker.to_model.count == 1
+    assert tracker.to_model.mean == 5_000_000
+    assert tracker.to_photon.count == 1
+    assert tracker.to_photon.mean == 15_000_000
+    assert tracker.summary()[1].startswith("input to photon: 1 samples")
+
+
+def import_times(module):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns a dict mapping every module imported to its cumulative import
+    time in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:") :].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_startup_import_time():
+    """
+    Test that starting the game doesn't import pygame, NumPy or anything
+    only needed after a race, and that the imports are quick.
+    """
+    times = import_times("typerace")
+    for module in ("pygame", "numpy", "sqlite3", "model.word_list"):
+        assert module not in times
+    # Far more than it takes, to allow for slow machines; with NumPy it took
+    # several times longer
+    assert times["typerace"] < 500_000
@@ -0,0 +1,622 @@
+"""
+Rendering tests run against every view backend under SDL's dummy video
+driver, so they need no display or GPU, along with the keyboard controller
+that reads pygame's events. The terminal view is tested against a stand-in
+for a curses window, and skipped where Python has no curses.
+"""
+
+import os
+import pytest
+from model.model import TypeRacePlayer
+from model.clock import ManualClock
+from model.keystrokes import INSERT, BACKSPACE, IGNORED
+from model.settings import Settings
+from model.standings import OWN_NAME, Standings
+
+pygame = pytest.importorskip("pygame")
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+# pylint: disable=wrong-import-position
+from view.view import GUIView, create_view
+from view.gpu import GPUView, UnderlineStrip
+from view.gui import style_settings
+from view.wrap import WrapIndex
+from controller.controller import TextController
+
+BACKENDS = {
+    "software": GUIView,
+    # The dummy driver has no accelerated renderer, so use SDL's software
+    # renderer behind the same texture code
+    "gpu": lambda player, settings=None: GPUView(
+        player, settings, accelerated=False
+    ),
+}
+
+
+def resize(view, size):
+    """
+    Resize the window of a view, as if the user dragged its edge.
+    """
+    if isinstance(view, GPUView):
+        view._window.size = size
+    else:
+        pygame.display.set_mode(size, pygame.RESIZABLE)
+    pygame.event.pump()
+
+
+@pytest.fixture
+def player():
+    """
+    Fixture that returns a player who has typed the start of the prompt
+    with one mistake.
+    """
+    player = TypeRacePlayer(time_limit=60, clock=ManualClock(), seed=1)
+    player.set_start_time()
+    text = player.prompt_text
+    player.update_text(
+        text[:30] + ("x" if text[30] != "x" else "y") + text[31:40]
+    )
+    return player
+
+
+@pytest.fixture(params=BACKENDS)
+def view(request, player):
+    """
+    Fixture that returns a view of the player for each backend, closing its
+    window afterwards.
+    """
+    view = BACKENDS[request.param](player)
+    yield view
+    view.close()
+
+
+def test_view_layout(view, player):
+    """
+    Test that the caret, underlines, HUD and background are drawn where and
+    in the colors the layout puts them.
+    """
+    screen = view.screenshot()
+    letter_width = view._letter_width
+    typed = len(player.typed_text)
+
+    assert screen.get_at((5, 590))[:3] == style_settings["background_color"]
+    assert (
+        screen.get_at((415 - letter_width, 320))[:3]
+        == style_settings["cursor_color"]
+    )
+
+    # The underline of character i starts (typed - i + 1) letters left of 417
+    def underline(i):
+        x = 417 - (typed - i + 1) * letter_width + letter_width // 2
+        return screen.get_at((x, 338))[:3]
+
+    assert underline(30) == style_settings["mistake_underline"]
+    assert underline(29) == style_settings["correct_underline"]
+    assert underline(31) == style_settings["correct_underline"]
+    assert screen.get_at((417 + letter_width, 338))[:3] == (
+        style_settings["background_color"]
+    )
+
+    hud = {
+        screen.get_at((x, y))[:3]
+        for x in range(20, 20 + 15 * letter_width)
+        for y in range(20, 90)
+    }
+    assert style_settings["text_color"] in hud
+
+
+def test_underlines_follow_edits(view, player, monkeypatch):
+    """
+    Test that correcting an earlier mistake redraws its underline, and that
+    the GPU strip only uploads the characters from the first edit.
+    """
+    view.render()
+    uploads = []
+    update = UnderlineStrip.update
+    monkeypatch.setattr(
+        UnderlineStrip,
+        "update",
+        lambda strip, mistakes, start, end: uploads.append((start, end))
+        or update(strip, mistakes, start, end),
+    )
+
+    # Go back over the mistake at 30 and type it correctly
+    player.update_text(player.prompt_text[:41])
+    screen = view.screenshot()
+    letter_width = view._letter_width
+    x = 417 - (41 - 30 + 1) * letter_width + letter_width // 2
+    assert screen.get_at((x, 338))[:3] == style_settings["correct_underline"]
+    view.render()
+    if isinstance(view, GPUView):
+        assert uploads == [(30, 41)]
+
+
+def test_view_resize(view, player):
+    """
+    Test that the layout is only recomputed when the window is resized, and
+    that the prompt and caret move to the middle of the new window without
+    reloading the font or rendering the prompt again.
+    """
+
+    def prompt():
+        cached = getattr(view, "_prompt_surface", None)
+        return view._prompt if cached is None else cached
+
+    view.render()
+    layout, font, rendered = view._layout, view._font, prompt()
+    view.render()
+    assert view._layout is layout
+    assert prompt() is rendered
+
+    resize(view, (1000, 700))
+    screen = view.screenshot()
+    assert screen.get_size() == (1000, 700)
+    assert view._layout is not layout
+    assert view._font is font
+    assert prompt() is rendered
+    caret_x = 500 + 15 - view._letter_width
+    assert view._layout.caret == [caret_x, 350, 2, 40]
+    assert screen.get_at((caret_x, 370))[:3] == style_settings["cursor_color"]
+    assert screen.get_at((415 - view._letter_width, 320))[:3] == (
+        style_settings["background_color"]
+    )
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_view_scale(backend, player):
+    """
+    Test that the fonts and layout are scaled together.
+    """
+    view = BACKENDS[backend](player, Settings(ui_scale=2))
+    try:
+        screen = view.screenshot()
+        letter_width = view._letter_width
+        assert letter_width > 30
+        assert view._layout.caret == [400 + 30 - letter_width, 300, 4, 80]
+        assert view._layout.hud[1] == (40, 120)
+        assert screen.get_at((403 + 30 - letter_width, 379))[:3] == (
+            style_settings["cursor_color"]
+        )
+    finally:
+        view.close()
+
+
+@pytest.mark.parametrize("lines", [1, 4])
+def test_backends_match(player, lines):
+    """
+    Test that both backends draw exactly the same pixels, with the prompt on
+    one line and wrapped.
+    """
+    screens = []
+    for make in BACKENDS.values():
+        view = make(player, Settings(prompt_lines=lines))
+        screens.append(view.screenshot())
+        view.close()
+    software, gpu = screens
+    assert software.get_size() == gpu.get_size()
+    width, height = software.get_size()
+    assert all(
+        software.get_at((x, y)) == gpu.get_at((x, y))
+        for x in range(width)
+        for y in range(height)
+    )
+
+
+def test_wrap_index():
+    """
+    Test that the prompt is wrapped after spaces, long words are split, and
+    characters are found on the right line and column.
+    """
+    text = "the quick brown fox jumps over a lazy dog incomprehensibilities x"
+    wrap = WrapIndex(text, 12)
+    lines = [text[slice(*wrap.line(i))] for i in range(len(wrap))]
+    assert lines == [
+        "the quick ",
+        "brown fox ",
+        "jumps over ",
+        "a lazy dog ",
+        "incomprehens",
+        "ibilities x",
+    ]
+    for offset in range(len(text) + 1):
+        line, column = wrap.locate(offset)
+        assert wrap.line(line)[0] + column == offset
+    assert wrap.locate(10) == (1, 0)
+    assert wrap.locate(len(text)) == (len(wrap) - 1, len(lines[-1]))
+    assert wrap.first_visible(0, 3) == 0
+    assert wrap.first_visible(3, 3) == 2
+    assert wrap.first_visible(len(wrap) - 1, 3) == len(wrap) - 3
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_wrapped_prompt(backend):
+    """
+    Test that a long wrapped prompt only keeps the lines in view rendered,
+    scrolls a line at a time, and puts the caret and underlines on the line
+    being typed.
+    """
+    player = TypeRacePlayer(
+        time_limit=60, clock=ManualClock(), seed=1, prompt_words=5000
+    )
+    player.set_start_time()
+    view = BACKENDS[backend](player, Settings(prompt_lines=4))
+    try:
+        wrap = view._wrap
+        assert len(wrap) > 100
+        view.render()
+        assert view._first_line == 0
+
+        # Type to the start of the 50th line, with a mistake just before
+        start = wrap.line(50)[0]
+        text = player.prompt_text
+        player.update_text(text[: start - 2] + "#" + text[start - 1 : start])
+        screen = view.screenshot()
+        assert view._first_line == 49
+        cached = getattr(view, "_line_surfaces", None)
+        if cached is None:
+            cached = view._line_textures
+        assert sorted(cached) == [49, 50, 51, 52]
+
+        layout = view._layout
+        x, y, _, height = layout.caret_at(1, 0)
+        assert screen.get_at((x, y + height // 2))[:3] == (
+            style_settings["cursor_color"]
+        )
+        column = start - 2 - wrap.line(49)[0]
+        x, y = layout.underline_at(0, column)
+        assert screen.get_at((x + view._letter_width // 2, y))[:3] == (
+            style_settings["mistake_underline"]
+        )
+        x, y = layout.underline_at(1, 0)
+        assert screen.get_at((x + view._letter_width // 2, y))[:3] == (
+            style_settings["background_color"]
+        )
+    finally:
+        view.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_standings_panel(backend, player, monkeypatch):
+    """
+    Test that the standings of a 50 racer room show the leaders and this
+    player, and that only rows whose racer changed are rendered again.
+    """
+    standings = player.standings = Standings(len(player.prompt_text))
+    for i in range(49):
+        standings.update(f"racer {i}", 100 + i, 50)
+    standings.update(OWN_NAME, 40, 70)
+    view = BACKENDS[backend](player)
+    try:
+        panel = view._standings_panel
+        rendered = []
+        render_row = panel.render_row
+        monkeypatch.setattr(
+            panel,
+            "render_row",
+            lambda position, racer: rendered.append(racer.name)
+            or render_row(position, racer),
+        )
+        screen = view.screenshot()
+        rows = view._layout.standings[3] // panel.row_height
+        assert 1 < rows < 50
+        assert rendered[:2] == ["racer 48", "racer 47"]
+        assert rendered[-1] == OWN_NAME
+        assert len(rendered) == rows
+
+        # This player's bar is drawn in the last row
+        x, y, _, _ = view._layout.standings
+        bar_top = (
+            y + rows * panel.row_height - 2 * view._layout.standings_bar_height
+        )
+        assert screen.get_at((x + 1, bar_top))[:3] == (
+            style_settings["cursor_color"]
+        )
+
+        rendered.clear()
+        view.render()
+        assert not rendered
+        standings.update("racer 47", 147, 55)
+        view.render()
+        assert rendered == ["racer 47"]
+    finally:
+        view.close()
+
+
+def test_summary_ignores_keys_typed_before(view, monkeypatch):
+    """
+    Test that keys pressed before the summary is shown don't close it.
+    """
+    waited = []
+
+    def wait():
+        waited.append(pygame.event.peek(pygame.KEYDOWN))
+        return pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a)
+
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a))
+    monkeypatch.setattr(pygame.event, "wait", wait)
+    view.summary(["Done"])
+    assert waited == [False]
+
+
+def test_text_controller_events(monkeypatch):
+    """
+    Test that the keyboard controller only receives the events it handles,
+    types text input (including punctuation and accents) and applies a
+    burst of events in one batch.
+    """
+    player = TypeRacePlayer(clock=ManualClock())
+    pygame.display.init()
+    try:
+        pygame.display.set_mode((100, 100))
+        controller = TextController(player)
+        batches = []
+        apply_batch = player.apply_batch
+        monkeypatch.setattr(
+            player,
+            "apply_batch",
+            lambda edits: batches.append(edits) or apply_batch(edits),
+        )
+        player.set_start_time()
+        for event in (
+            pygame.event.Event(pygame.MOUSEMOTION, pos=(1, 1)),
+            pygame.event.Event(pygame.KEYDOWN, key=ord("a"), unicode="a"),
+            pygame.event.Event(pygame.TEXTINPUT, text="a"),
+            pygame.event.Event(pygame.TEXTINPUT, text="é,"),
+            pygame.event.Event(pygame.KEYDOWN, key=pygame.K_LSHIFT, unicode=""),
+            pygame.event.Event(
+                pygame.KEYDOWN, key=pygame.K_BACKSPACE, unicode="\b"
+            ),
+        ):
+            pygame.event.post(event)
+        controller.poll()
+        assert len(controller.queue) == 5
+
+        controller.typechecker()
+        assert player.typed_text == "aé"
+        assert batches == [["a", "é", ",", "\b"]]
+        assert list(player.keystrokes.actions) == [
+            INSERT,
+            INSERT,
+            INSERT,
+            IGNORED,
+            BACKSPACE,
+        ]
+
+        # Text past the end of the prompt isn't typed, so backspacing over
+        # it deletes only what was typed
+        short = TypeRacePlayer(clock=ManualClock(), prompt=(0, "ab"))
+        controller = TextController(short)
+        short.set_start_time()
+        pygame.event.post(pygame.event.Event(pygame.TEXTINPUT, text="abc"))
+        for _ in range(3):
+            pygame.event.post(
+                pygame.event.Event(
+                    pygame.KEYDOWN, key=pygame.K_BACKSPACE, unicode="\b"
+                )
+            )
+        controller.typechecker()
+        assert short.typed_text == ""
+        assert list(short.keystrokes.actions) == [
+            INSERT,
+            INSERT,
+            IGNORED,
+            BACKSPACE,
+            BACKSPACE,
+            IGNORED,
+        ]
+    finally:
+        pygame.display.quit()
+
+
+def test_gpu_falls_back_to_software(player, capsys):
+    """
+    Test that asking for GPU rendering without an accelerated renderer
+    opens the software view instead.
+    """
+    try:
+        view = create_view(player, Settings(render_mode="gpu"))
+        assert isinstance(view, GUIView)
+        assert "using software rendering" in capsys.readouterr().out
+        assert isinstance(create_view(player), GUIView)
+    finally:
+        pygame.display.quit()
+
+
+class FakeTerminal:
+    """
+    Stand-in for a curses window, recording what is written to it, so the
+    terminal view and controller can be tested without a terminal.
+    """
+
+    def __init__(self, rows, columns, keys=()):
+        self.size = (rows, columns)
+        self.keys = list(keys)
+        self.written = []
+
+    def getmaxyx(self):
+        return self.size
+
+    def addstr(self, row, column, text, attribute=0):
+        self.written.append((row, column, text, attribute))
+
+    def clear(self):
+        self.written.clear()
+
+    def erase(self):
+        self.written.clear()
+
+    def refresh(self):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def getch(self):
+        return ord(self.keys.pop(0)) if self.keys else -1
+
+    def get_wch(self):
+        if not self.keys:
+            # pylint: disable=import-outside-toplevel
+            import curses
+
+            raise curses.error("no input")
+        return self.keys.pop(0)
+
+
+def test_terminal_view_writes_changes():
+    """
+    Test that the terminal view marks typed characters and the caret, and
+    only writes the cells that changed since the last frame.
+    """
+    pytest.importorskip("curses")
+    # pylint: disable=import-outside-toplevel
+    from view.terminal import CARET, CORRECT, HEADER_ROWS, MISTAKE
+    from view.terminal import TerminalView
+
+    player = TypeRacePlayer(
+        clock=ManualClock(),
+        prompt=(0, "the quick brown fox jumps over the lazy dog"),
+    )
+    screen = FakeTerminal(12, 23)
+    view = TerminalView(player, screen)
+    view.draw()
+    assert view.writes > 0
+    first_frame = view.writes
+
+    view.draw()
+    assert view.writes == first_frame
+
+    player.set_start_time()
+    player.update_text("tx")
+    view.draw()
+    # The two typed cells and the caret, then the WPM line at most
+    assert view.writes - first_frame <= 4
+
+    frame = view.compose(12, 23)
+    assert frame.text(HEADER_ROWS).startswith(" the quick brown fox ")
+    assert frame.text(HEADER_ROWS + 1).startswith(" jumps over the ")
+    assert frame.kind(HEADER_ROWS, 1) == CORRECT
+    assert frame.kind(HEADER_ROWS, 2) == MISTAKE
+    assert frame.kind(HEADER_ROWS, 3) == CARET
+
+    screen.size = (12, 40)
+    view.draw()
+    assert {row for row, _, _, _ in screen.written} >= {0, 1, HEADER_ROWS}
+
+
+def test_terminal_summary_ignores_keys_typed_before(monkeypatch):
+    """
+    Test that keys typed before the terminal summary is shown are flushed
+    rather than closing it.
+    """
+    curses = pytest.importorskip("curses")
+    # pylint: disable=import-outside-toplevel
+    from view import terminal
+
+    screen = FakeTerminal(12, 40, ["a"])
+    monkeypatch.setattr(curses, "flushinp", screen.keys.clear)
+    waited = []
+    getch = screen.getch
+    monkeypatch.setattr(
+        screen, "getch", lambda: waited.append(list(screen.keys)) or getch()
+    )
+    monkeypatch.setattr(terminal, "close_terminal", lambda screen: None)
+    player = TypeRacePlayer(clock=ManualClock())
+    terminal.TerminalView(player, screen).summary(["Done"])
+    assert waited == [[]]
+    assert (0, 0, "Done", 0) in screen.written
+
+
+def test_replay_in_terminal(tmp_path, monkeypatch):
+    """
+    Test that replay mode plays in the terminal when the terminal is
+    chosen, and that escape stops it early.
+    """
+    pytest.importorskip("curses")
+    # pylint: disable=import-outside-toplevel
+    import typerace
+    from model.replay import save_replay
+    from view import terminal
+
+    player = TypeRacePlayer(time_limit=2, clock=ManualClock())
+    player.set_start_time()
+    for char in player.prompt_text[:4]:
+        player.clock.advance(0.25)
+        player.apply_keystroke(ord(char), INSERT)
+    player.clock.advance(1.0)
+    player.update_time()
+    path = str(tmp_path / "race.trr")
+    save_replay(player, path)
+
+    screens = []
+    monkeypatch.setattr(terminal, "close_terminal", screens.remove)
+    argv = [
+        "--mode=replay",
+        f"--replay={path}",
+        "--speed=max",
+        "--set=render_mode=terminal",
+    ]
+    # The race lasts two seconds, played one second a frame unless escape
+    # stops it after the first
+    for keys, frames in ((), 2), (["\x1b"], 1):
+        screen = FakeTerminal(12, 40, keys)
+        draws = []
+        screen.refresh = lambda: draws.append(None)
+        monkeypatch.setattr(
+            terminal, "open_terminal", lambda: screens.append(screen) or screen
+        )
+        assert typerace.main(argv) == 0
+        assert len(draws) == frames
+        assert not screens  # The terminal was given back
+
+
+def test_terminal_controller_keys():
+    """
+    Test that the terminal controller types printable keys, handles the
+    backspace codes terminals send, records other keys as ignored and ends
+    the race on escape.
+    """
+    curses = pytest.importorskip("curses")
+    # pylint: disable=import-outside-toplevel
+    from controller.terminal import TerminalController
+
+    player = TypeRacePlayer(clock=ManualClock())
+
+    screen = FakeTerminal(
+        24,
+        80,
+        ["\x7f", "a", "é", curses.KEY_LEFT, curses.KEY_RESIZE, "\x7f", "b"],
+    )
+    controller = TerminalController(player, screen)
+    player.set_start_time()
+    controller.typechecker()
+    assert player.typed_text == "ab"
+    assert list(player.keystrokes.actions) == [
+        IGNORED,
+        INSERT,
+        INSERT,
+        IGNORED,
+        BACKSPACE,
+        INSERT,
+    ]
+    assert not player.game_over
+
+    screen.keys.append("\x1b")
+    controller.typechecker()
+    assert player.game_over
+
+    # Keys past the end of the prompt aren't typed
+    player = TypeRacePlayer(clock=ManualClock(), prompt=(0, "ab"))
+    screen = FakeTerminal(24, 80, ["a", "b", "c", "\x7f", "\x7f", "\x7f"])
+    controller = TerminalController(player, screen)
+    player.set_start_time()
+    controller.typechecker()
+    assert player.typed_text == ""
+    assert list(player.keystrokes.actions) == [
+        INSERT,
+        INSERT,
+        IGNORED,
+        BACKSPACE,
+        BACKSPACE,
+        IGNORED,
+    ]
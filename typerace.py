@@ -0,0 +1,615 @@
+"""
+Command line entry point for the game. Run from the repository root with:
+
+    python -m typerace --mode single
+    python -m typerace --mode host --port 6000
+    python -m typerace --mode client --host-ip 192.168.1.20
+    python -m typerace --mode single --headless --bench
+    python -m typerace --mode single --set render_mode=terminal
+
+Modes not given on the command line are asked for interactively, as before.
+Pygame is only imported when a window is opened, so headless servers, bots
+and benchmarks never start SDL.
+"""
+
+import argparse
+import getpass
+import glob
+import sys
+from datetime import datetime
+from functools import partial
+from model.model import TypeRacePlayer, HostPlayer, ClientPlayer
+from model.clock import ManualClock
+from model.scheduler import Scheduler
+from model.latency import LatencyTracker
+from model.settings import Settings, load_settings, parse_override
+from model.prompt_pool import PromptPool
+from model.text_gen import MAX_SEED, seeded_paragraph
+from controller.bot import BotController
+from controller.input_queue import InputQueue
+
+MODES = {
+    "s": "single",
+    "h": "host",
+    "c": "client",
+    "g": "ghost",
+    "r": "replay",
+}
+
+
+def game_mode_select():
+    """
+    Ask the user to select single player or multi-player. Will recursively ask
+    until a valid response is received.
+
+    Returns str 's' for single player mode, 'h' for host, 'c' for client, 'g'
+    to race a ghost and 'r' to watch a replay.
+    """
+
+    mode = input(
+        "Enter 's' for single player, 'h' for host (multiplayer), 'c' for "
+        "client (multiplayer), 'g' to race a ghost, or 'r' to watch a replay: "
+    )
+    if mode in MODES:
+        return mode
+    return game_mode_select()
+
+
+def window_closed():
+    """
+    Keep the replay window responsive while it plays.
+
+    Returns True if the user closed the window.
+    """
+    import pygame  # pylint: disable=import-outside-toplevel
+
+    return any(event.type == pygame.QUIT for event in pygame.event.get())
+
+
+def escape_pressed(screen):
+    """
+    Let the user stop a replay playing in the terminal.
+
+    Args:
+        screen: curses window to read keys from, which must not wait for
+            keys
+
+    Returns True if the user pressed escape.
+    """
+    # pylint: disable=import-outside-toplevel
+    import curses
+    from controller.terminal import ESCAPE
+
+    while True:
+        try:
+            if screen.get_wch() == ESCAPE:
+                return True
+        except curses.error:
+            return False  # No more keys waiting
+
+
+def parse_seed(text):
+    """
+    Parse a prompt seed from the command line.
+
+    Args:
+        text: string given on the command line, an int from 0 to MAX_SEED
+
+    Returns an int.
+    """
+    try:
+        seed = int(text)
+    except ValueError:
+        seed = -1
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(
+            f"expected a whole number from 0 to {MAX_SEED}, got {text!r}"
+        )
+    return seed
+
+
+def parse_speed(text):
+    """
+    Parse a replay playback speed from the command line.
+
+    Args:
+        text: string given on the command line, a positive number or "max"
+
+    Returns a float representing the speed relative to real time, or None
+    to play as fast as possible.
+    """
+    if text == "max":
+        return None
+    try:
+        speed = float(text)
+    except ValueError:
+        speed = 0.0
+    if not 0 < speed < float("inf"):
+        raise argparse.ArgumentTypeError(
+            f"expected a positive number or 'max', got {text!r}"
+        )
+    return speed
+
+
+def parse_wpm(text):
+    """
+    Parse the bot's typing speed from the command line.
+
+    Args:
+        text: string given on the command line, a positive number
+
+    Returns a float representing the speed in words per minute.
+    """
+    try:
+        wpm = float(text)
+    except ValueError:
+        wpm = 0.0
+    if not 0 < wpm < float("inf"):
+        raise argparse.ArgumentTypeError(
+            f"expected a positive number, got {text!r}"
+        )
+    return wpm
+
+
+def parse_accuracy(text):
+    """
+    Parse the bot's accuracy from the command line.
+
+    Args:
+        text: string given on the command line, a number above 0 and up to 1
+
+    Returns a float representing the chance each character is typed
+    correctly.
+    """
+    try:
+        accuracy = float(text)
+    except ValueError:
+        accuracy = 0.0
+    if not 0 < accuracy <= 1:
+        raise argparse.ArgumentTypeError(
+            f"expected a number above 0 and up to 1, got {text!r}"
+        )
+    return accuracy
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line.
+
+    Args:
+        argv: list of command line arguments. Defaults to sys.argv[1:].
+
+    Returns a (namespace of arguments, Settings) tuple.
+    """
+    parser = argparse.ArgumentParser(description="Play Type Race.")
+    parser.add_argument(
+        "--mode", choices=MODES.values(), help="asked for if not given"
+    )
+    parser.add_argument("--config", help="TOML settings file to load")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        type=parse_override,
+        metavar="NAME=VALUE",
+        help="override a setting, e.g. --set time_limit=30",
+    )
+    parser.add_argument("--port", type=int, help="same as --set port=PORT")
+    parser.add_argument(
+        "--host-ip",
+        help="address of the host (client) or to listen on (host)",
+    )
+    parser.add_argument(
+        "--replay", help="replay file to watch (replay) or race (ghost)"
+    )
+    parser.add_argument(
+        "--speed",
+        type=parse_speed,
+        default=1.0,
+        help="replay playback speed, e.g. 1, 4 or 'max'",
+    )
+    parser.add_argument("--seed", type=parse_seed, help="seed of the prompt")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="race without a window, typed by a bot",
+    )
+    parser.add_argument(
+        "--bot", action="store_true", help="let a bot type in the window"
+    )
+    parser.add_argument("--bot-wpm", type=parse_wpm, default=80)
+    parser.add_argument("--bot-accuracy", type=parse_accuracy, default=0.97)
+    parser.add_argument(
+        "--bench",
+        action="store_true",
+        help=(
+            "run the race as fast as possible on a simulated clock and "
+            "report how each part of the game loop kept up, without saving "
+            "results"
+        ),
+    )
+    parser.add_argument(
+        "--latency",
+        action="store_true",
+        help="measure how long each keystroke takes to reach the screen",
+    )
+    parser.add_argument(
+        "--name", default=None, help="name to save the result under"
+    )
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="save races typed by a bot (--headless or --bot) like your own",
+    )
+    args = parser.parse_args(argv)
+
+    overrides = dict(args.set)
+    if args.port is not None:
+        overrides["port"] = args.port
+    try:
+        settings = load_settings(args.config, overrides=overrides)
+    except OSError as e:
+        parser.error(f"can't read {e.filename}: {e.strerror}")
+    except ValueError as e:
+        parser.error(str(e))
+    if args.headless and args.mode in ("ghost", "replay") and not args.replay:
+        parser.error(f"--replay is required in headless {args.mode} mode")
+    return args, settings
+
+
+def watch_replay(args, settings):
+    """
+    Play back a recorded race in a window or the terminal, or re-score it
+    without either if headless.
+
+    Args:
+        args: namespace of command line arguments
+        settings: Settings to use
+    """
+    # pylint: disable=import-outside-toplevel
+    from model.replay import ReplayEngine, load_replay
+
+    engine = ReplayEngine(load_replay(args.replay or input("Replay file: ")))
+    if args.headless:
+        engine.advance_to(engine.replay.duration)
+    elif settings.render_mode == "terminal":
+        from view.terminal import TerminalView, close_terminal, open_terminal
+
+        screen = open_terminal()
+        try:
+            engine.attach_view(TerminalView(engine.player, screen, settings))
+            screen.nodelay(True)
+            engine.play(args.speed, on_frame=partial(escape_pressed, screen))
+        finally:
+            close_terminal(screen)
+    else:
+        from view.view import create_view
+
+        engine.attach_view(create_view(engine.player, settings))
+        engine.play(args.speed, on_frame=window_closed)
+    print(f"\nReplay over. WPM: {engine.player.wpm}")
+
+
+def start_prompt_pool(args, settings):
+    """
+    Start generating a prompt in the background, so it is ready by the time
+    the mode has been chosen and the window or connection is open.
+
+    Args:
+        args: namespace of command line arguments
+        settings: Settings to use
+
+    Returns a PromptPool, or None if the race won't need a new prompt: one
+    was seeded on the command line, the mode replays a recorded prompt, or
+    the adaptive engine has yet to be updated with the player's statistics.
+    """
+    if (
+        args.seed is not None
+        or args.mode in ("ghost", "replay")
+        or settings.text_engine == "adaptive"
+    ):
+        return None
+    generate = partial(
+        seeded_paragraph,
+        settings.text_engine,
+        num_words=settings.prompt_words,
+    )
+    return PromptPool(generate, size=1, low_water=1)
+
+
+def make_player(args, settings, clock, prompt_pool=None):
+    """
+    Create the player for the chosen mode. Host and client players connect
+    to each other before this returns.
+
+    Args:
+        args: namespace of command line arguments
+        settings: Settings to use
+        clock: Clock for the player to measure race time with
+        prompt_pool: PromptPool from start_prompt_pool to take the prompt
+            from, or None to generate it here
+
+    Returns a TypeRacePlayer.
+    """
+    kwargs = {"clock": clock}
+    if args.mode == "ghost":
+        # pylint: disable=import-outside-toplevel
+        from model.ghost import GhostPlayer
+
+        path = args.replay or input("Replay file of the ghost: ")
+        return GhostPlayer(path, **kwargs)
+
+    if settings.text_engine == "adaptive":
+        # Adapt prompts to the keys that slowed the player down in recorded
+        # races
+        # pylint: disable=import-outside-toplevel
+        from model.analytics import analyze_replays
+        from model.text_gen import adaptive_generator
+
+        stats = analyze_replays(glob.glob("replays/*.trr"))
+        for path, reason in stats.unreadable:
+            print(f"Skipping unreadable replay {path}: {reason}")
+        adaptive_generator().update(stats)
+        prompt_pool = None
+
+    kwargs.update(
+        text_engine=settings.text_engine,
+        prompt_words=settings.prompt_words,
+        seed=args.seed,
+        prompt_pool=prompt_pool,
+    )
+    if args.mode == "single":
+        return TypeRacePlayer(settings.time_limit, **kwargs)
+    network = {
+        "port": settings.port,
+        "network_rate": settings.network_rate,
+        "host_ip": args.host_ip,
+    }
+    if args.mode == "host":
+        return HostPlayer(settings.time_limit, **network, **kwargs)
+    return ClientPlayer(settings.time_limit, **network, **kwargs)
+
+
+def run_race(
+    player, controller, scheduler, view=None, settings=None, tracker=None
+):
+    """
+    Run the game loop until the race is over.
+
+    Input is collected at the input rate, applied and scored on a fixed
+    timestep at the tick rate, and the view is drawn at up to the frame rate
+    cap, each on its own schedule.
+
+    Args:
+        player: TypeRacePlayer racing, created with the scheduler's
+            tick_clock as its clock
+        controller: TypeRaceController providing the player's input, whose
+            queue stamps input with the scheduler's clock
+        scheduler: Scheduler to run the loop with
+        view: TypeRaceView to draw each frame with, or None to race headless
+        settings: Settings with the tick rate and frame rate cap. Defaults
+            to the default settings.
+        tracker: LatencyTracker to follow each keystroke to the screen with,
+            or None to skip measuring
+    """
+    settings = Settings() if settings is None else settings
+
+    # Collect input more often than the simulation runs, so it is stamped
+    # close to when it happened
+    scheduler.add("input", settings.input_rate, controller.poll)
+
+    def simulate():
+        # Check the controller for new user input
+        controller.typechecker()
+        if tracker is not None:
+            tracker.applied(player.keystrokes)
+        # Update the time and wpm of the player
+        player.update_time()
+        player.update_wpm()
+        # If the game over condition is True, exit the game loop
+        if player.game_over:
+            scheduler.stop()
+
+    scheduler.add("simulation", settings.tick_rate, simulate, fixed=True)
+
+    def render():
+        view.draw()
+        tracker.presented()
+
+    if view is not None:
+        scheduler.add(
+            "render", settings.fps_cap, view.draw if tracker is None else render
+        )
+
+    # Set start time to the first tick
+    player.set_start_time()
+    scheduler.run()
+
+
+def bench_report(player, controller, scheduler, tracker):
+    """
+    Summarize how each part of the game loop kept up with its rate, and how
+    long input took to reach the model and the screen.
+
+    Args:
+        player: TypeRacePlayer whose race is over
+        controller: TypeRaceController that provided the player's input
+        scheduler: Scheduler the race was run with
+        tracker: LatencyTracker that followed the keystrokes
+
+    Returns a list of strings, one per line.
+    """
+    lines = scheduler.report()
+    lines.append(controller.queue.latency.summary("input queue wait"))
+    lines += tracker.summary()
+    if hasattr(player, "network"):
+        lines.append(player.network.stats.summary("network"))
+    return lines
+
+
+def finish_race(player, view, name, save=True):
+    """
+    Record the race and save the result, then show the key analysis in the
+    window and print the leaderboard.
+
+    Args:
+        player: TypeRacePlayer whose race is over
+        view: TypeRaceView to show the summary in, or None if headless
+        name: string representing the name to save the result under
+        save: bool representing whether to write the replay and the result.
+            Races typed by a bot aren't saved by default, so they don't end
+            up in the player's leaderboard and key statistics.
+    """
+    # pylint: disable=import-outside-toplevel
+    from model.replay import save_replay
+    from model.results import ResultsStore
+    from model.analytics import analyze_player, analyze_replays
+
+    # Record the race so it can be replayed later, and save the result
+    # before anything else can go wrong
+    leaders = None
+    if save:
+        save_replay(
+            player, datetime.now().strftime("replays/%Y-%m-%d_%H-%M-%S.trr")
+        )
+        with ResultsStore() as results:
+            results.add_race(name, player)
+            leaders = results.top_by_day(count=5)
+
+    # Show which keys slowed the player down, in this race and across every
+    # recorded race
+    if view is not None:
+        view.summary(
+            ["This race"]
+            + analyze_player(player).summary()
+            + ["", "All recorded races"]
+            + analyze_replays(glob.glob("replays/*.trr")).summary()
+            + ["", "Press any key to continue"]
+        )
+
+    if leaders is None:
+        print("\nRace typed by a bot, not saved (use --save to keep it)")
+        return
+
+    # Show today's leaderboard
+    print("\nToday's fastest races:")
+    for rank, (racer, _, wpm, accuracy, _, _) in enumerate(leaders, start=1):
+        print(f"{rank}. {racer}: {wpm} WPM, {accuracy:.0%} accuracy")
+
+
+def print_outcome(player):
+    """
+    Print the result of the race.
+
+    Args:
+        player: TypeRacePlayer whose race is over
+    """
+    if hasattr(player, "opponent_wpm"):  # If multiplayer game
+        if player.wpm > player.opponent_wpm:
+            print("\nCongratulations! You won!")
+        elif player.wpm == player.opponent_wpm:
+            print("\nYou... tied??? Good thing our code checks for that!")
+        else:
+            print("\nWomp womp! You lost!")
+        print(f"My wpm: {player.wpm}, Opponent wpm: {player.opponent_wpm}\n")
+        if player.opponent_detector.flagged:
+            print(
+                "Your opponent's typing looked suspicious: "
+                + ", ".join(player.opponent_detector.reasons())
+            )
+    elif hasattr(player, "ghost_wpm"):  # If racing a ghost
+        print(f"\nGame over. WPM: {player.wpm}, Ghost WPM: {player.ghost_wpm}")
+    else:
+        print(f"\nGame over. WPM: {player.wpm}")
+
+
+def main(argv=None):
+    """
+    Run the game from the command line.
+
+    Args:
+        argv: list of command line arguments. Defaults to sys.argv[1:].
+
+    Returns an int exit code.
+    """
+    args, settings = parse_args(argv)
+    prompt_pool = start_prompt_pool(args, settings)
+    if args.mode is None:
+        args.mode = MODES[game_mode_select()]
+
+    # Watch a recorded race instead of playing
+    if args.mode == "replay":
+        if prompt_pool is not None:
+            prompt_pool.close()
+        watch_replay(args, settings)
+        return 0
+
+    # Benchmarks run on a simulated clock, as fast as possible
+    scheduler = Scheduler(ManualClock() if args.bench else None)
+    try:
+        player = make_player(args, settings, scheduler.tick_clock, prompt_pool)
+    finally:
+        if prompt_pool is not None:
+            prompt_pool.close()
+
+    # Initialize View and Controller classes
+    view = None
+    screen = None  # curses window when playing in the terminal
+    if not args.headless and settings.render_mode == "terminal":
+        # pylint: disable=import-outside-toplevel
+        from view.terminal import TerminalView, open_terminal
+
+        screen = open_terminal()
+        view = TerminalView(player, screen, settings)
+    elif not args.headless:
+        # pylint: disable=import-outside-toplevel
+        from view.view import create_view
+
+        view = create_view(player, settings)
+    queue = InputQueue(scheduler.clock)
+    if args.headless or args.bot:
+        controller = BotController(
+            player, args.bot_wpm, args.bot_accuracy, args.seed, queue
+        )
+    elif screen is not None:
+        # pylint: disable=import-outside-toplevel
+        from controller.terminal import TerminalController
+
+        controller = TerminalController(player, screen, queue)
+    else:
+        # pylint: disable=import-outside-toplevel
+        from controller.controller import TextController
+
+        controller = TextController(player, queue)
+
+    # Measure latency for benchmarks, or when asked to
+    tracker = None
+    if args.bench or args.latency:
+        tracker = LatencyTracker(scheduler)
+    try:
+        run_race(player, controller, scheduler, view, settings, tracker)
+        if not args.bench:
+            finish_race(
+                player,
+                view,
+                args.name or getpass.getuser(),
+                save=args.save or not (args.headless or args.bot),
+            )
+    finally:
+        if screen is not None:
+            # pylint: disable=import-outside-toplevel
+            from view.terminal import close_terminal
+
+            # Give the terminal back before printing anything
+            close_terminal(screen)
+
+    if args.bench:
+        print("\n".join(bench_report(player, controller, scheduler, tracker)))
+    elif tracker is not None:
+        print("\n" + "\n".join(tracker.summary()))
+    print_outcome(player)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Abstract base class for the view component of a typing game.
+
+Kept apart from the pygame views so views that don't open a window, such as
+the terminal view, can be used without importing pygame.
+"""
+
+from abc import ABC, abstractmethod
+
+
+class TypeRaceView(ABC):
+    """
+    Abstract base class for the game's visual interface.
+
+    Provides a framework for creating and managing the game's display window.
+    Subclasses must implement additional drawing functionality as needed.
+
+    Attributes:
+        _player: TypeRacePlayer object representing the player linked to this
+            view
+    """
+
+    def __init__(self, player):
+        """
+        Initialize the TextView with a reference to the player or game logic.
+
+        Args:
+            player: An object representing the player or the game state manager.
+        """
+        self._player = player
+
+    @abstractmethod
+    def summary(self, lines):
+        """
+        Show a summary screen after the race until the user presses a key or
+        closes the window.
+
+        Args:
+            lines: list of strings to show, one per line
+        """
+
+    @abstractmethod
+    def draw(self):
+        """
+        Update the view according to the current state of the player
+        """
@@ -0,0 +1,541 @@
+"""
+View of the typing game drawn with pygame's SDL2 renderer, so the prompt,
+text and underlines are kept in GPU textures and only redrawn as textured
+rectangles each frame.
+
+Lays the screen out exactly like GUIView, so either can be used.
+"""
+
+import math
+import pygame
+from pygame._sdl2.sdl2 import error as SDLError
+from pygame._sdl2.video import Renderer, Texture, Window
+from view.layout import Layout, window_scale
+from view.view import WindowView, load_style
+
+# Characters in the glyph atlas, other characters get their own texture
+ATLAS_CHARS = "".join(chr(code) for code in range(32, 127))
+# Characters of the prompt in each prompt strip texture. Textures can't be
+# wider than the GPU allows (often 8192 pixels), so long prompts are split.
+CHUNK_LENGTH = 64
+
+
+def _white_texture(renderer, font, text):
+    """
+    Render text in white, to be tinted to any color when drawn.
+
+    Args:
+        renderer: Renderer to create the texture for
+        font: pygame Font to render with
+        text: string to render
+
+    Returns a Texture.
+    """
+    return Texture.from_surface(
+        renderer, font.render(text, False, (255, 255, 255))
+    )
+
+
+class GlyphAtlas:
+    """
+    Every printable character of a monospaced font rendered once into one
+    texture, so changing text like the timer is drawn without rendering any
+    text.
+
+    Attributes:
+        _renderer: Renderer the atlas is drawn with
+        _font: pygame Font the glyphs were rendered with
+        _texture: Texture with the glyphs of ATLAS_CHARS side by side
+        _columns: dict mapping each character to its index in the texture
+        _extra: dict mapping characters outside ATLAS_CHARS to their own
+            Texture, rendered when first drawn
+        width: int representing the width of each glyph in pixels
+        height: int representing the height of each glyph in pixels
+    """
+
+    def __init__(self, renderer, font):
+        """
+        Render the glyphs.
+
+        Args:
+            renderer: Renderer to draw with
+            font: monospaced pygame Font to render with
+        """
+        self._renderer = renderer
+        self._font = font
+        self._texture = _white_texture(renderer, font, ATLAS_CHARS)
+        self._columns = {char: i for i, char in enumerate(ATLAS_CHARS)}
+        self._extra = {}
+        self.width = self._texture.width // len(ATLAS_CHARS)
+        self.height = self._texture.height
+
+    def draw(self, text, position, color):
+        """
+        Draw a line of text.
+
+        Args:
+            text: string to draw
+            position: (x, y) tuple of the top left corner in pixels
+            color: pygame Color of the text
+        """
+        x, y = position
+        self._texture.color = color
+        for char in text:
+            column = self._columns.get(char)
+            if column is not None:
+                self._texture.draw(
+                    srcrect=(column * self.width, 0, self.width, self.height),
+                    dstrect=(x, y, self.width, self.height),
+                )
+            elif char not in " \t":
+                if char not in self._extra:
+                    self._extra[char] = _white_texture(
+                        self._renderer, self._font, char
+                    )
+                texture = self._extra[char]
+                texture.color = color
+                texture.draw(dstrect=(x, y))
+            x += self.width
+
+
+class PromptStrip:
+    """
+    The prompt rendered into a row of textures, CHUNK_LENGTH characters
+    each, so scrolling it is only a change of where the textures are drawn.
+    Chunks are rendered the first time they come into view.
+
+    Attributes:
+        _renderer: Renderer the strip is drawn with
+        _font: pygame Font to render with
+        _text: string of the prompt
+        _chunks: dict mapping chunk indexes to their Texture
+        _letter_width: int representing the width of each character in
+            pixels
+    """
+
+    def __init__(self, renderer, font, text, letter_width):
+        """
+        Create a strip with nothing rendered yet.
+
+        Args:
+            renderer: Renderer to draw with
+            font: monospaced pygame Font to render with
+            text: string of the prompt
+            letter_width: int representing the width of each character in
+                pixels
+        """
+        self._renderer = renderer
+        self._font = font
+        self._text = text
+        self._chunks = {}
+        self._letter_width = letter_width
+
+    def draw(self, x, y, color, window_width):
+        """
+        Draw the chunks of the prompt that are in view.
+
+        Args:
+            x: number representing where the start of the prompt is drawn
+            y: number representing the top of the prompt
+            color: pygame Color of the text
+            window_width: int representing the width of the window in pixels
+        """
+        chunk_width = CHUNK_LENGTH * self._letter_width
+        first = max(0, math.floor(-x / chunk_width))
+        last = min(
+            math.ceil(len(self._text) / CHUNK_LENGTH),
+            math.ceil((window_width - x) / chunk_width),
+        )
+        for index in range(first, last):
+            texture = self._chunks.get(index)
+            if texture is None:
+                start = index * CHUNK_LENGTH
+                texture = self._chunks[index] = _white_texture(
+                    self._renderer,
+                    self._font,
+                    self._text[start : start + CHUNK_LENGTH],
+                )
+            texture.color = color
+            texture.draw(dstrect=(x + index * chunk_width, y))
+
+
+class UnderlineStrip:
+    """
+    The underlines of the typed text kept as one pixel per character in a
+    texture, which is stretched to the width of the characters when drawn.
+    Only the pixels of characters that changed are uploaded again.
+
+    Attributes:
+        _texture: streaming Texture with a pixel per prompt character
+        _colors: (correct, mistake) tuple of the pygame Colors of the
+            underlines
+    """
+
+    def __init__(self, renderer, length, correct_color, mistake_color):
+        """
+        Create a strip with no underlines.
+
+        Args:
+            renderer: Renderer to draw with
+            length: int representing the number of characters in the prompt
+            correct_color: pygame Color of correct characters' underlines
+            mistake_color: pygame Color of mistaken characters' underlines
+        """
+        self._texture = Texture(renderer, (max(1, length), 1), streaming=True)
+        self._colors = (correct_color, mistake_color)
+
+    def update(self, mistakes, start, end):
+        """
+        Upload the underlines of a range of characters that changed.
+
+        Args:
+            mistakes: list of bools representing whether each character of
+                the prompt was a mistake
+            start: int representing the index of the first character
+            end: int representing the index after the last character
+        """
+        if start >= end:
+            return
+        pixels = pygame.Surface((end - start, 1))
+        for i in range(start, end):
+            pixels.set_at((i - start, 0), self._colors[bool(mistakes[i])])
+        self._texture.update(pixels, (start, 0, end - start, 1))
+
+    def draw(self, first, last, x, y, letter_width, height):
+        """
+        Draw the underlines of some typed characters.
+
+        Args:
+            first: int representing the index of the first character
+            last: int representing the index after the last character
+            x: number representing the left of the first underline
+            y: number representing the top of the underlines
+            letter_width: int representing the width of each underline
+            height: int representing the height of the underlines
+        """
+        if first < last:
+            self._texture.draw(
+                srcrect=(first, 0, last - first, 1),
+                dstrect=(x, y, (last - first) * letter_width, height),
+            )
+
+
+class GPUView(WindowView):
+    """
+    Subclass of WindowView that draws the game with the SDL2 renderer.
+
+    Attributes:
+        _style: dict containing style settings for the view
+        _colors: dict mapping the color names of the style settings to
+            pygame Colors
+        _window: pygame._sdl2 Window of the game
+        _renderer: Renderer drawing into the window
+        _font: pygame font object representing the chosen font
+        _atlas: GlyphAtlas of the font
+        _prompt: PromptStrip of the player's prompt
+        _line_textures: dict mapping the wrapped lines in view to their
+            Textures
+        _standings_panel: StandingsPanel of a multiplayer race, with rows
+            kept as Textures, or None
+        _underlines: UnderlineStrip of the player's typed text
+    """
+
+    def __init__(self, player, settings=None, accelerated=True):
+        """
+        Create and show the game window and the textures drawn into it.
+
+        Args:
+            player: The player object containing game state information.
+            settings: Settings whose window size and font size override the
+                style settings, or None to use the style settings as they are.
+            accelerated: bool representing whether to require a GPU
+                renderer. If False, SDL's software renderer may be used.
+
+        Raises pygame.error if the renderer can't be created.
+        """
+        super().__init__(player)
+        pygame.display.init()
+        pygame.font.init()
+        self._style = load_style(settings)
+        self._colors = {
+            name: pygame.Color(value)
+            for name, value in self._style.items()
+            if name.endswith(("_color", "_underline"))
+        }
+
+        self._window = Window(
+            self._style["window_caption"],
+            (self._style["window_width"], self._style["window_height"]),
+            resizable=True,
+        )
+        try:
+            self._renderer = Renderer(
+                self._window, accelerated=1 if accelerated else 0
+            )
+        except (pygame.error, SDLError) as e:
+            # Close the window so another view can open its own
+            self._window.destroy()
+            raise pygame.error(str(e)) from e
+        # Show the empty window straight away, before loading the font
+        self._renderer.draw_color = self._colors["background_color"]
+        self._renderer.clear()
+        self._renderer.present()
+
+        self._font = None
+        self._atlas = None
+        self._prompt = None
+        self._line_textures = {}
+        self._standings_panel = None
+        self.update_layout()
+        self._underlines = UnderlineStrip(
+            self._renderer,
+            len(player.prompt_text),
+            self._colors["correct_underline"],
+            self._colors["mistake_underline"],
+        )
+
+    def update_layout(self):
+        """
+        Lay the window out again if it was resized, and render the font's
+        textures at a new size if the scale changed. The prompt is wrapped
+        again only if the number of columns changed. Does nothing otherwise,
+        so it is cheap to call every frame.
+        """
+        size = tuple(self._renderer.get_viewport().size)
+        scale = window_scale(
+            self._style["ui_scale"], size[0], self._window.size[0]
+        )
+        layout = self._layout
+        if layout is not None and layout.size == size and layout.scale == scale:
+            return
+        if layout is None or layout.scale != scale:
+            self._font = pygame.font.Font(
+                self._style["font_path"],
+                round(self._style["font_size"] * scale),
+            )
+            self._atlas = GlyphAtlas(self._renderer, self._font)
+            self._letter_width = self._atlas.width
+            self._prompt = PromptStrip(
+                self._renderer,
+                self._font,
+                self._player.prompt_text,
+                self._letter_width,
+            )
+        self._layout = Layout(
+            size, scale, self._letter_width, self._style["prompt_lines"]
+        )
+        self._wrap = self.wrap_prompt(self._wrap, self._layout)
+        self._line_textures.clear()
+        self._standings_panel = self.standings_panel(
+            lambda surface: Texture.from_surface(self._renderer, surface)
+        )
+
+    def _rect(self, color, rect):
+        """
+        Fill a rectangle.
+
+        Args:
+            color: string naming the color in the style settings
+            rect: (x, y, width, height) list of the rectangle
+        """
+        self._renderer.draw_color = self._colors[color]
+        self._renderer.fill_rect(rect)
+
+    def text(self):
+        """
+        Clear the window, then draw the visible part of the prompt shifted
+        by the number of typed characters, and the caret.
+        """
+        layout = self._layout
+        self._renderer.draw_color = self._colors["background_color"]
+        self._renderer.clear()
+        if self._wrap is not None:
+            self.wrapped_text()
+            return
+        self._prompt.draw(
+            layout.char_x(0, self._player.typed_length),
+            layout.prompt_y,
+            self._colors["text_color"],
+            layout.size[0],
+        )
+        self._rect("cursor_color", layout.caret)
+
+    def wrapped_text(self):
+        """
+        Draw the lines of the wrapped prompt in view and the caret. Lines
+        are rendered into textures when they scroll into view and kept until
+        they scroll out.
+        """
+        layout = self._layout
+        prompt = self._player.prompt_text
+        caret_row, column = self.scroll()
+        visible = self.visible_lines()
+        for index in [i for i in self._line_textures if i not in visible]:
+            del self._line_textures[index]
+        for row, index in enumerate(visible):
+            texture = self._line_textures.get(index)
+            if texture is None:
+                start, end = self._wrap.line(index)
+                texture = self._line_textures[index] = _white_texture(
+                    self._renderer, self._font, prompt[start:end]
+                )
+            texture.color = self._colors["text_color"]
+            texture.draw(dstrect=(layout.cell_x(0), layout.line_y(row)))
+        self._rect("cursor_color", layout.caret_at(caret_row, column))
+
+    def underlines(self):
+        """
+        Draw underlines beneath the visible typed characters, red for
+        mistakes and white for correct letters.
+        """
+        player = self._player
+        # Only upload the underlines of characters edited since last frame
+        start = player.take_first_change()
+        if start is not None:
+            self._underlines.update(
+                player.mistake_indexes, start, player.typed_length
+            )
+        for first, last, x, y in self.underline_runs():
+            self._underlines.draw(
+                first,
+                last,
+                x,
+                y,
+                self._letter_width,
+                self._layout.underline_height,
+            )
+
+    def info(self):
+        """
+        Draw the countdown timer, the player's WPM and the opponent's WPM, if
+        there is an opponent, in the top left corner.
+        """
+        hud = self._layout.hud
+        color = self._colors["text_color"]
+        seconds_left = max(0, math.ceil(self._player.time_remaining))
+        self._atlas.draw(f"{seconds_left} seconds left", hud[0], color)
+        self._atlas.draw(
+            f"{self._player.wpm} WPM ({self._player.instant_wpm} now)",
+            hud[1],
+            color,
+        )
+        if hasattr(self._player, "opponent_wpm"):  # If multiplayer game
+            if self._player.opponent_wpm > self._player.wpm:
+                color = self._colors["alternate_text_color"]
+            opp_wpm_text = f"{self._player.opponent_wpm} Opponent WPM"
+            if self._player.opponent_detector.flagged:
+                opp_wpm_text += " (suspicious)"
+                color = self._colors["alternate_text_color"]
+            self._atlas.draw(opp_wpm_text, hud[2], color)
+
+    def standings(self):
+        """
+        Draw the position, progress and WPM of every racer that fits in the
+        standings area, uploading only rows that changed.
+        """
+        panel = self._standings_panel
+        x, y, _, height = self._layout.standings
+        textures = panel.images(
+            self._player.standings, height // panel.row_height
+        )
+        for row, texture in enumerate(textures):
+            texture.draw(dstrect=(x, y + row * panel.row_height))
+
+    def ghost(self):
+        """
+        Draw the caret of the ghost being raced against, and progress bars
+        comparing the player with the ghost.
+        """
+        layout = self._layout
+        ghost_position = self._player.ghost_position
+        typed_length = self._player.typed_length
+        caret = self.caret_at(ghost_position)
+        if caret is not None:
+            self._rect("ghost_color", caret)
+
+        # Progress bars along the bottom of the window
+        prompt_length = len(self._player.prompt_text)
+        for top, position, color in zip(
+            layout.bar_rows,
+            (typed_length, ghost_position),
+            ("progress_color", "ghost_color"),
+        ):
+            width = layout.bar_width * position // prompt_length
+            if width > 0:
+                self._rect(color, [layout.bar_x, top, width, layout.bar_height])
+
+    def summary(self, lines):
+        """
+        Show a summary screen after the race until the user presses a key or
+        closes the window.
+
+        Args:
+            lines: list of strings to show, one per line
+        """
+        self.update_layout()
+        layout = self._layout
+        font = pygame.font.Font(
+            self._style["font_path"],
+            round(self._style["summary_font_size"] * layout.scale),
+        )
+        self._renderer.draw_color = self._colors["background_color"]
+        self._renderer.clear()
+        x, y = layout.hud[0]
+        for row, line in enumerate(lines):
+            if line:
+                texture = _white_texture(self._renderer, font, line)
+                texture.color = self._colors["text_color"]
+                texture.draw(dstrect=(x, y + row * font.get_linesize()))
+        self._renderer.present()
+
+        # Keys typed as the race ended shouldn't close the summary
+        pygame.event.clear()
+        while True:
+            event = pygame.event.wait()
+            if event.type in (pygame.QUIT, pygame.KEYDOWN):
+                return
+
+    def close(self):
+        """
+        Close the window. The textures are released first, since SDL frees
+        them along with the window and releasing them afterwards would free
+        them twice.
+        """
+        self._atlas = None
+        self._prompt = None
+        self._line_textures.clear()
+        if self._standings_panel is not None:
+            self._standings_panel.clear()
+        self._standings_panel = None
+        self._underlines = None
+        self._renderer = None
+        self._window.destroy()
+        pygame.display.quit()
+
+    def render(self):
+        """
+        Draw all visual elements of the game screen without showing them,
+        laying the window out again first if it was resized.
+        """
+        self.update_layout()
+        self.text()
+        self.underlines()
+        self.info()
+        if self._standings_panel is not None:  # If multiplayer game
+            self.standings()
+        if hasattr(self._player, "ghost_position"):  # If racing a ghost
+            self.ghost()
+
+    def screenshot(self):
+        """
+        Draw the game screen and return it as a pygame Surface.
+        """
+        self.render()
+        return self._renderer.to_surface()
+
+    def draw(self):
+        """
+        Draw all visual elements of the game screen and show them.
+        """
+        self.render()
+        self._renderer.present()
@@ -15,11 +15,16 @@ style_settings = {
     "window_width": 800,
     "window_height": 600,
     "window_caption": "Type Racer",
+    # Scale of the fonts and layout, e.g. 2 for a HiDPI screen
+    "ui_scale": 1,
     # Background
     "background_color": colors["black"],
     # Text
     "font_path": "view/fonts/Hack-Regular.ttf",  # Must be monospaced
     "font_size": 32,
+    # Lines of the prompt to show, or 1 for a single scrolling line
+    "prompt_lines": 1,
+    "summary_font_size": 18,
     "text_color": colors["grey"],
     "alternate_text_color": colors["red"],
     # Cursor
@@ -27,4 +32,7 @@ style_settings = {
     # Underlines
     "mistake_underline": colors["red"],
     "correct_underline": colors["white"],
+    # Ghost caret and progress bars
+    "ghost_color": colors["green"],
+    "progress_color": colors["grey"],
 }
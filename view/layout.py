@@ -0,0 +1,235 @@
+"""
+Positions of everything drawn in the game window, worked out from the window
+size and scale so the views don't hard-code an 800x600 window.
+"""
+
+# Distances in the layout in pixels at a scale of 1, matching the original
+# 800x600 window with the prompt font at 32 points
+CARET_OFFSET = 15
+CARET_SIZE = (2, 40)
+UNDERLINE_OFFSET = 17
+UNDERLINE_GAP = 38
+UNDERLINE_HEIGHT = 2
+LINE_PITCH = 48
+STANDINGS_WIDTH = 260
+STANDINGS_BAR_HEIGHT = 4
+MARGIN = 20
+HUD_SPACING = 40
+BAR_BOTTOM = 40
+BAR_SPACING = 16
+BAR_HEIGHT = 8
+
+
+def window_scale(ui_scale, drawable_width, window_width):
+    """
+    Work out how much to scale the layout and fonts by.
+
+    Args:
+        ui_scale: float representing the scale chosen in the settings
+        drawable_width: int representing the width drawn to in pixels
+        window_width: int representing the width of the window in screen
+            coordinates, which is less than drawable_width on HiDPI screens
+
+    Returns a float.
+    """
+    return ui_scale * drawable_width / max(1, window_width)
+
+
+class Layout:
+    """
+    Positions of the prompt, caret, underlines, HUD and progress bars for
+    one window size and scale. Views create a new Layout only when the
+    window is resized or its scale changes, and read positions from it every
+    frame.
+
+    The prompt is either one line scrolling past a fixed caret, or wrapped
+    into several lines of columns, centered in the window, with the caret
+    moving along them.
+
+    Attributes:
+        size: (width, height) tuple of the drawable area in pixels
+        scale: float representing how much the layout is scaled by
+        letter_width: int representing the width of each character of the
+            prompt font in pixels
+        prompt_x: int representing where the next character to type is drawn
+        prompt_y: int representing the top of the prompt
+        caret: [x, y, width, height] list of the caret's rectangle
+        _underline_shift: int representing how far left of its character
+            an underline starts
+        underline_y: int representing the top of the underlines
+        underline_height: int representing the height of the underlines
+        hud: list of (x, y) tuples of each line of the HUD, top first
+        bar_x: int representing the left of the progress bars
+        bar_width: int representing the width of a full progress bar
+        bar_rows: list of the tops of each progress bar, top first
+        bar_height: int representing the height of the progress bars
+        lines: int representing how many lines of the prompt are shown, or
+            1 for a single scrolling line
+        columns: int representing how many characters fit on a wrapped line
+        line_pitch: int representing the distance between wrapped lines
+        lines_left: int representing the left of the wrapped lines
+        lines_top: int representing the top of the first wrapped line
+        standings: [x, y, width, height] list of the area for the standings
+            of a multiplayer race, in the top right corner above the prompt
+        standings_bar_height: int representing the height of the progress
+            bars in the standings
+    """
+
+    def __init__(self, size, scale, letter_width, lines=1):
+        """
+        Compute the layout.
+
+        Args:
+            size: (width, height) tuple of the drawable area in pixels
+            scale: float representing how much to scale the layout by
+            letter_width: int representing the width of each character of
+                the prompt font in pixels
+            lines: int representing how many lines of the prompt to show,
+                or 1 for a single scrolling line
+        """
+        width, height = size
+        self.size = tuple(size)
+        self.scale = scale
+        self.letter_width = letter_width
+        self.lines = lines
+
+        self.prompt_x = width // 2
+        self.prompt_y = height // 2
+        self.caret = [
+            self.prompt_x + self._px(CARET_OFFSET) - letter_width,
+            self.prompt_y,
+            self._px(CARET_SIZE[0]),
+            self._px(CARET_SIZE[1]),
+        ]
+        self._underline_shift = self._px(UNDERLINE_OFFSET) - letter_width
+        self.underline_y = self.prompt_y + self._px(UNDERLINE_GAP)
+        self.underline_height = self._px(UNDERLINE_HEIGHT)
+
+        margin = self._px(MARGIN)
+        self.hud = [
+            (margin, margin + self._px(HUD_SPACING) * row) for row in range(3)
+        ]
+        self.bar_x = margin
+        self.bar_width = width - 2 * margin
+        bottom = height - self._px(BAR_BOTTOM)
+        self.bar_rows = [
+            bottom + self._px(BAR_SPACING) * row for row in range(2)
+        ]
+        self.bar_height = self._px(BAR_HEIGHT)
+
+        self.columns = max(1, self.bar_width // letter_width)
+        self.line_pitch = self._px(LINE_PITCH)
+        self.lines_left = (width - self.columns * letter_width) // 2
+        self.lines_top = (height - lines * self.line_pitch) // 2
+
+        prompt_top = self.lines_top if lines > 1 else self.prompt_y
+        standings_width = max(1, min(self._px(STANDINGS_WIDTH), width // 2))
+        self.standings = [
+            width - margin - standings_width,
+            margin,
+            standings_width,
+            max(0, prompt_top - 2 * margin),
+        ]
+        self.standings_bar_height = self._px(STANDINGS_BAR_HEIGHT)
+
+    def _px(self, distance):
+        """
+        Scale a distance of the layout, keeping it at least one pixel.
+
+        Args:
+            distance: int representing the distance at a scale of 1
+
+        Returns an int representing the distance in pixels.
+        """
+        return max(1, round(distance * self.scale))
+
+    def char_x(self, index, typed):
+        """
+        Find where a character of the prompt is drawn.
+
+        Args:
+            index: int representing the index of the character
+            typed: int representing the number of characters typed
+
+        Returns an int representing the left of the character.
+        """
+        return self.prompt_x + (index - typed) * self.letter_width
+
+    def underline_x(self, index, typed):
+        """
+        Find where the underline of a typed character is drawn.
+
+        Args:
+            index: int representing the index of the character
+            typed: int representing the number of characters typed
+
+        Returns an int representing the left of the underline.
+        """
+        return self.char_x(index, typed) + self._underline_shift
+
+    def first_visible(self, typed):
+        """
+        Find the first typed character whose underline is in the window.
+
+        Args:
+            typed: int representing the number of characters typed
+
+        Returns an int representing the index of the character.
+        """
+        return max(0, -self.underline_x(0, typed) // self.letter_width - 1)
+
+    def line_y(self, row):
+        """
+        Find the top of a wrapped line.
+
+        Args:
+            row: int representing the index of the line in view, 0 at the
+                top
+
+        Returns an int.
+        """
+        return self.lines_top + row * self.line_pitch
+
+    def cell_x(self, column):
+        """
+        Find the left of a column of the wrapped lines.
+
+        Args:
+            column: int representing the index of the column
+
+        Returns an int.
+        """
+        return self.lines_left + column * self.letter_width
+
+    def caret_at(self, row, column):
+        """
+        Find the caret's rectangle on the wrapped lines.
+
+        Args:
+            row: int representing the index of the line in view
+            column: int representing the column of the next character
+
+        Returns an [x, y, width, height] list.
+        """
+        x, y, width, height = self.caret
+        return [
+            x - self.prompt_x + self.cell_x(column),
+            y - self.prompt_y + self.line_y(row),
+            width,
+            height,
+        ]
+
+    def underline_at(self, row, column):
+        """
+        Find where the underline of a character on the wrapped lines starts.
+
+        Args:
+            row: int representing the index of the line in view
+            column: int representing the column of the character
+
+        Returns an (x, y) tuple.
+        """
+        return (
+            self.cell_x(column) + self._underline_shift,
+            self.underline_y - self.prompt_y + self.line_y(row),
+        )
@@ -0,0 +1,123 @@
+"""
+Panel listing every racer's position, progress and WPM in a multiplayer
+race, for rooms with many racers.
+"""
+
+import pygame
+
+
+class StandingsPanel:
+    """
+    Rows of the standings, each rendered into its own image that is kept
+    until that racer's values or position change. A frame with no changes
+    renders nothing, and a network update only renders the rows it changed,
+    however many racers there are.
+
+    Attributes:
+        _font: pygame Font to write the rows with
+        _style: dict containing style settings
+        _width: int representing the width of a row in pixels
+        _bar_height: int representing the height of a progress bar
+        _prompt_length: int representing the number of characters in the
+            prompt
+        _own_name: string naming the racer playing on this computer
+        _to_image: function converting a rendered Surface into whatever the
+            view draws, e.g. a Texture
+        _rows: dict mapping racer names to ((position, version), image)
+            tuples of the rows drawn in the last frame
+        row_height: int representing the height of a row in pixels
+    """
+
+    def __init__(
+        self, font, style, width, bar_height, prompt_length, own_name, to_image
+    ):
+        """
+        Create a panel with no rows rendered yet.
+
+        Args:
+            font: pygame Font to write the rows with
+            style: dict containing style settings
+            width: int representing the width of a row in pixels
+            bar_height: int representing the height of a progress bar
+            prompt_length: int representing the number of characters in the
+                prompt
+            own_name: string naming the racer playing on this computer
+            to_image: function converting a rendered Surface into whatever
+                the view draws
+        """
+        self._font = font
+        self._style = style
+        self._width = width
+        self._bar_height = bar_height
+        self._prompt_length = max(1, prompt_length)
+        self._own_name = own_name
+        self._to_image = to_image
+        self._rows = {}
+        self.row_height = font.get_linesize() + 2 * bar_height
+
+    def render_row(self, position, racer):
+        """
+        Render one racer's row: their position, name and WPM with a progress
+        bar underneath.
+
+        Args:
+            position: int representing the racer's place, 1 for first
+            racer: Racer to render
+
+        Returns a pygame Surface.
+        """
+        style = self._style
+        surface = pygame.Surface((self._width, self.row_height))
+        surface.fill(style["background_color"])
+        name = self._font.render(
+            f"{position}. {racer.name}", True, style["text_color"]
+        )
+        wpm = self._font.render(f"{racer.wpm} WPM", True, style["text_color"])
+        surface.blit(name, (0, 0))
+        surface.blit(wpm, (self._width - wpm.get_width(), 0))
+        color = style["progress_color"]
+        if racer.name == self._own_name:
+            color = style["cursor_color"]
+        progress = min(racer.progress, self._prompt_length)
+        pygame.draw.rect(
+            surface,
+            color,
+            [
+                0,
+                self._font.get_linesize(),
+                self._width * progress // self._prompt_length,
+                self._bar_height,
+            ],
+        )
+        return surface
+
+    def images(self, standings, count):
+        """
+        Get the images of the rows to draw, rendering only rows that are new
+        or changed since the last frame.
+
+        Args:
+            standings: Standings of the race
+            count: int representing how many rows fit
+
+        Returns a list of images, top first.
+        """
+        rows = {}
+        images = []
+        for position, racer in standings.leaders(count, self._own_name):
+            key = (position, racer.version)
+            row = self._rows.get(racer.name)
+            if row is None or row[0] != key:
+                row = (key, self._to_image(self.render_row(position, racer)))
+            rows[racer.name] = row
+            images.append(row[1])
+        # Only keep the rows in view
+        self._rows = rows
+        return images
+
+    def clear(self):
+        """
+        Forget the rendered rows, so they are rendered again when next
+        drawn and their images can be freed.
+        """
+        self._rows = {}
@@ -0,0 +1,384 @@
+"""
+View of the typing game drawn in a terminal with curses, for lab machines
+and remote play over SSH without SDL.
+
+Each frame is composed into a buffer of cells, compared with the previous
+frame, and only the cells that changed are written to the terminal.
+"""
+
+import curses
+import math
+from model.standings import OWN_NAME
+from view.base import TypeRaceView
+from view.wrap import WrapIndex
+
+# Kinds of cell, each drawn with its own curses attribute
+NORMAL = 0
+CORRECT = 1  # A correctly typed character
+MISTAKE = 2  # A mistyped character
+CARET = 3  # The next character to type
+GHOST = 4  # The character the ghost has reached
+BAR = 5  # Part of a progress bar
+
+# Color pairs set up by open_terminal
+MISTAKE_PAIR = 1
+GHOST_PAIR = 2
+
+# Rows above the prompt for the timer and WPM
+HEADER_ROWS = 3
+
+
+def open_terminal():
+    """
+    Start curses on the terminal.
+
+    Returns the curses window of the whole terminal.
+    """
+    screen = curses.initscr()
+    curses.noecho()
+    curses.cbreak()
+    screen.keypad(True)
+    try:
+        curses.curs_set(0)
+    except curses.error:
+        pass  # Not every terminal can hide the cursor
+    if curses.has_colors():
+        curses.start_color()
+        curses.use_default_colors()
+        curses.init_pair(MISTAKE_PAIR, curses.COLOR_RED, -1)
+        curses.init_pair(GHOST_PAIR, curses.COLOR_GREEN, -1)
+    return screen
+
+
+def close_terminal(screen):
+    """
+    Give the terminal back to the shell, if curses is still running.
+
+    Args:
+        screen: curses window returned by open_terminal
+    """
+    if not curses.isendwin():
+        screen.keypad(False)
+        curses.nocbreak()
+        curses.echo()
+        curses.endwin()
+
+
+def _attributes():
+    """
+    Get the curses attribute of each kind of cell.
+
+    Returns a list indexed by kind of cell.
+    """
+    try:
+        colors = curses.has_colors()
+    except curses.error:
+        colors = False  # curses isn't running on a terminal
+    mistake = curses.A_UNDERLINE | curses.A_BOLD
+    ghost = curses.A_STANDOUT
+    if colors:
+        mistake = curses.color_pair(MISTAKE_PAIR) | curses.A_UNDERLINE
+        ghost = curses.color_pair(GHOST_PAIR) | curses.A_REVERSE
+    return [
+        curses.A_NORMAL,
+        curses.A_UNDERLINE,
+        mistake,
+        curses.A_REVERSE,
+        ghost,
+        curses.A_REVERSE,
+    ]
+
+
+class FrameBuffer:
+    """
+    The character and kind of every cell of the terminal for one frame.
+
+    Attributes:
+        size: (rows, columns) tuple of the buffer
+        _chars: list of one list of characters per row
+        _kinds: list of one bytearray of cell kinds per row
+    """
+
+    def __init__(self, rows, columns):
+        """
+        Create a blank buffer.
+
+        Args:
+            rows: int representing the number of rows
+            columns: int representing the number of columns
+        """
+        self.size = (rows, columns)
+        self._chars = [[" "] * columns for _ in range(rows)]
+        self._kinds = [bytearray(columns) for _ in range(rows)]
+
+    def put(self, row, column, text, kind=NORMAL):
+        """
+        Write text into the buffer, clipped to its edges.
+
+        Args:
+            row: int representing the row to write in
+            column: int representing the column of the first character
+            text: string to write
+            kind: int representing the kind of every cell written
+        """
+        rows, columns = self.size
+        if not 0 <= row < rows or column >= columns:
+            return
+        if column < 0:
+            text = text[-column:]
+            column = 0
+        text = text[: columns - column]
+        self._chars[row][column : column + len(text)] = text
+        self._kinds[row][column : column + len(text)] = bytes(
+            [kind] * len(text)
+        )
+
+    def mark(self, row, column, kind):
+        """
+        Change the kind of one cell, keeping its character.
+
+        Args:
+            row: int representing the row of the cell
+            column: int representing the column of the cell
+            kind: int representing the new kind of the cell
+        """
+        rows, columns = self.size
+        if 0 <= row < rows and 0 <= column < columns:
+            self._kinds[row][column] = kind
+
+    def changes(self, previous):
+        """
+        Find the cells that differ from another frame.
+
+        Args:
+            previous: FrameBuffer of the frame on the terminal, or None if
+                the terminal is blank
+
+        Returns a list of (row, column, text, kind) tuples, one per run of
+        changed cells of the same kind in a row.
+        """
+        if previous is not None and previous.size != self.size:
+            previous = None
+        runs = []
+        for row, (chars, kinds) in enumerate(zip(self._chars, self._kinds)):
+            if previous is not None:
+                old_chars = previous._chars[row]
+                old_kinds = previous._kinds[row]
+                if chars == old_chars and kinds == old_kinds:
+                    continue
+            start = None
+            for column, (char, kind) in enumerate(zip(chars, kinds)):
+                changed = (
+                    previous is None
+                    or char != old_chars[column]
+                    or kind != old_kinds[column]
+                )
+                if start is not None and (not changed or kind != kinds[start]):
+                    runs.append(
+                        (row, start, "".join(chars[start:column]), kinds[start])
+                    )
+                    start = None
+                if changed and start is None:
+                    start = column
+            if start is not None:
+                runs.append((row, start, "".join(chars[start:]), kinds[start]))
+        return runs
+
+    def text(self, row):
+        """
+        Get the characters of a row, for tests and debugging.
+
+        Args:
+            row: int representing the row
+
+        Returns a string.
+        """
+        return "".join(self._chars[row])
+
+    def kind(self, row, column):
+        """
+        Get the kind of a cell.
+
+        Args:
+            row: int representing the row of the cell
+            column: int representing the column of the cell
+
+        Returns an int.
+        """
+        return self._kinds[row][column]
+
+
+class TerminalView(TypeRaceView):
+    """
+    Subclass of TypeRaceView that draws the game as text with curses.
+
+    The prompt is wrapped into lines, scrolling a line at a time, with typed
+    characters underlined (mistakes in red) and the caret shown in reverse
+    video. Multiplayer standings are listed under the prompt.
+
+    Attributes:
+        _screen: curses window to draw in
+        _prompt_lines: int representing how many lines of the prompt to show
+        _attributes: list of the curses attribute of each kind of cell
+        _wrap: WrapIndex of the prompt for the terminal's width
+        _frame: FrameBuffer of what is on the terminal, or None if it is
+            blank
+        writes: int counting the runs of cells written to the terminal, to
+            measure how much each frame sends
+    """
+
+    def __init__(self, player, screen, settings=None):
+        """
+        Create a view drawing into a curses window.
+
+        Args:
+            player: The player object containing game state information.
+            screen: curses window to draw in, e.g. from open_terminal
+            settings: Settings with the number of prompt lines to show, or
+                None for three lines
+        """
+        super().__init__(player)
+        self._screen = screen
+        lines = 1 if settings is None else settings.prompt_lines
+        # A single line wastes a terminal's height, so show at least three
+        self._prompt_lines = max(3, lines)
+        self._attributes = _attributes()
+        self._wrap = None
+        self._frame = None
+        self.writes = 0
+
+    def compose(self, rows, columns):
+        """
+        Compose the game screen for a terminal size.
+
+        Args:
+            rows: int representing the number of rows of the terminal
+            columns: int representing the number of columns of the terminal
+
+        Returns a FrameBuffer.
+        """
+        # Leave the bottom right cell empty, as writing it scrolls some
+        # terminals
+        frame = FrameBuffer(rows, columns - 1)
+        player = self._player
+
+        seconds_left = max(0, math.ceil(player.time_remaining))
+        frame.put(0, 1, f"{seconds_left} seconds left")
+        frame.put(1, 1, f"{player.wpm} WPM ({player.instant_wpm} now)")
+        if hasattr(player, "opponent_wpm"):  # If multiplayer game
+            opponent = f"{player.opponent_wpm} Opponent WPM"
+            if player.opponent_detector.flagged:
+                opponent += " (suspicious)"
+            frame.put(1, columns // 2, opponent)
+        elif hasattr(player, "ghost_wpm"):  # If racing a ghost
+            frame.put(1, columns // 2, f"{player.ghost_wpm} Ghost WPM")
+
+        width = max(1, columns - 3)
+        if self._wrap is None or self._wrap.columns != width:
+            self._wrap = WrapIndex(player.prompt_text, width)
+        count = max(1, min(self._prompt_lines, rows - HEADER_ROWS - 1))
+        self.prompt(frame, count)
+
+        if hasattr(player, "standings"):
+            self.standings(frame, HEADER_ROWS + count + 1, columns - 3)
+        return frame
+
+    def prompt(self, frame, count):
+        """
+        Write the lines of the prompt in view, marking typed characters, the
+        caret and the ghost.
+
+        Args:
+            frame: FrameBuffer to write into
+            count: int representing how many lines of the prompt fit
+        """
+        player = self._player
+        wrap = self._wrap
+        prompt = player.prompt_text
+        typed = player.typed_length
+        mistakes = player.mistake_indexes
+        line, _ = wrap.locate(typed)
+        first = wrap.first_visible(line, count)
+        for row, index in enumerate(
+            range(first, min(first + count, len(wrap)))
+        ):
+            start, end = wrap.line(index)
+            frame.put(HEADER_ROWS + row, 1, prompt[start:end])
+            for i in range(start, min(end, typed)):
+                frame.mark(
+                    HEADER_ROWS + row,
+                    1 + i - start,
+                    MISTAKE if mistakes[i] else CORRECT,
+                )
+
+        for position, kind in (
+            (typed, CARET),
+            (getattr(player, "ghost_position", None), GHOST),
+        ):
+            if position is None:
+                continue
+            line, column = wrap.locate(position)
+            if first <= line < first + count:
+                frame.mark(HEADER_ROWS + line - first, 1 + column, kind)
+
+    def standings(self, frame, top, width):
+        """
+        Write the position, name, WPM and progress bar of every racer that
+        fits below the prompt.
+
+        Args:
+            frame: FrameBuffer to write into
+            top: int representing the first row to write in
+            width: int representing the width of each row
+        """
+        standings = self._player.standings
+        length = max(1, standings.prompt_length)
+        count = frame.size[0] - top
+        for row, (position, racer) in enumerate(
+            standings.leaders(count, OWN_NAME)
+        ):
+            label = f"{position:>2}. {racer.name[:12]:<12} {racer.wpm:>4} WPM "
+            frame.put(top + row, 1, label)
+            bar = max(0, width - len(label))
+            filled = bar * min(racer.progress, length) // length
+            frame.put(top + row, 1 + len(label), " " * filled, BAR)
+
+    def draw(self):
+        """
+        Compose the game screen and write the cells that changed since the
+        last frame to the terminal.
+        """
+        rows, columns = self._screen.getmaxyx()
+        frame = self.compose(rows, columns)
+        if self._frame is not None and self._frame.size != frame.size:
+            # The terminal was resized, so start from a blank screen
+            self._screen.clear()
+            self._frame = None
+        runs = frame.changes(self._frame)
+        for row, column, text, kind in runs:
+            self._screen.addstr(row, column, text, self._attributes[kind])
+        self.writes += len(runs)
+        self._frame = frame
+        if runs:
+            self._screen.refresh()
+
+    def summary(self, lines):
+        """
+        Show a summary screen after the race until the user presses a key,
+        then give the terminal back to the shell.
+
+        Args:
+            lines: list of strings to show, one per line
+        """
+        rows, columns = self._screen.getmaxyx()
+        self._screen.erase()
+        for row, line in enumerate(lines[: rows - 1]):
+            self._screen.addstr(row, 0, line[: columns - 1])
+        self._screen.refresh()
+        self._frame = None
+
+        # Keys typed as the race ended shouldn't close the summary
+        curses.flushinp()
+        self._screen.nodelay(False)
+        self._screen.getch()
+        close_terminal(self._screen)
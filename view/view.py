@@ -1,119 +1,358 @@
 """
 Class definitions for the view component of a typing game.
 
-Defines an abstract TextView class that sets up and manages
-the graphical display for the game using Pygame.
+Defines the views that set up and manage the graphical display for the game
+using Pygame. The abstract TypeRaceView they extend is in view/base.py.
+GUIView draws with software surfaces; GPUView, in view.gpu, draws the same
+screen with the SDL2 renderer.
 """
 
-from abc import ABC, abstractmethod
+import math
 import pygame
+from view.base import TypeRaceView
 from view.gui import style_settings
+from view.layout import Layout, window_scale
+from view.wrap import WrapIndex
+from view.standings import StandingsPanel
+from model.standings import OWN_NAME
 
 
-class TypeRaceView(ABC):
+def load_style(settings=None):
     """
-    Abstract base class for the game's visual interface.
+    Get the style settings for a window.
 
-    Provides a framework for creating and managing the game's display window.
-    Subclasses must implement additional drawing functionality as needed.
+    Args:
+        settings: Settings whose window size and font size override the
+            style settings, or None to use the style settings as they are.
+
+    Returns a new dict of style settings.
+    """
+    style = dict(style_settings)
+    if settings is not None:
+        style["window_width"] = settings.window_width
+        style["window_height"] = settings.window_height
+        style["font_size"] = settings.font_size
+        style["ui_scale"] = settings.ui_scale
+        style["prompt_lines"] = settings.prompt_lines
+    return style
+
+
+def create_view(player, settings=None):
+    """
+    Create the view chosen by the render_mode setting. If GPU rendering was
+    chosen but no accelerated renderer is available, fall back to software
+    rendering.
+
+    Args:
+        player: TypeRacePlayer to show
+        settings: Settings to use, or None for the default software view
+
+    Returns a TypeRaceView.
+    """
+    if settings is not None and settings.render_mode == "gpu":
+        # pylint: disable=import-outside-toplevel
+        from view.gpu import GPUView
+
+        try:
+            return GPUView(player, settings)
+        except pygame.error as e:
+            print(f"GPU rendering unavailable ({e}), using software rendering")
+    return GUIView(player, settings)
+
+
+class WindowView(TypeRaceView):
+    """
+    Base class of the views that draw into a pygame window, working out
+    where the prompt, caret and underlines go in the same way.
+
+    Subclasses lay the window out and keep the attributes up to date.
 
     Attributes:
-        _player: TypeRacePlayer object representing the player linked to this
-            view
+        _style: dict containing style settings
+        _letter_width: int representing the length of each character of the
+            font in pixels
+        _layout: Layout of the window at its current size and scale
+        _wrap: WrapIndex of the prompt wrapped to the layout's columns, or
+            None if the prompt is shown on one scrolling line
+        _first_line: int representing the first wrapped line in view
     """
 
     def __init__(self, player):
         """
-        Initialize the TextView with a reference to the player or game logic.
+        Initialize the view with nothing laid out yet.
 
         Args:
-            player: An object representing the player or the game state manager.
+            player: The player object containing game state information.
         """
-        self._player = player
+        super().__init__(player)
+        self._style = None
+        self._letter_width = 0
+        self._layout = None
+        self._wrap = None
+        self._first_line = 0
 
-    @abstractmethod
-    def draw(self):
+    def wrap_prompt(self, wrap, layout):
+        """
+        Wrap the prompt to the columns of a layout.
+
+        Args:
+            wrap: WrapIndex of the prompt for the previous layout, or None
+            layout: Layout to wrap the prompt for
+
+        Returns a WrapIndex, reusing wrap if the number of columns is the
+        same, or None if the layout shows a single scrolling line.
         """
-        Update the view according to the current state of the player
+        if layout.lines == 1:
+            return None
+        if wrap is not None and wrap.columns == layout.columns:
+            return wrap
+        return WrapIndex(self._player.prompt_text, layout.columns)
+
+    def standings_panel(self, to_image=None):
         """
+        Create the panel of the standings for the current layout.
 
+        Args:
+            to_image: function converting each rendered row Surface into
+                what the view draws. Defaults to drawing the Surfaces.
 
-class GUIView(TypeRaceView):
+        Returns a StandingsPanel, or None if the race has no standings.
+        """
+        if not hasattr(self._player, "standings"):
+            return None
+        layout = self._layout
+        font = pygame.font.Font(
+            self._style["font_path"],
+            round(self._style["summary_font_size"] * layout.scale),
+        )
+        return StandingsPanel(
+            font,
+            self._style,
+            layout.standings[2],
+            layout.standings_bar_height,
+            len(self._player.prompt_text),
+            OWN_NAME,
+            to_image or (lambda surface: surface),
+        )
+
+    def scroll(self):
+        """
+        Scroll the wrapped prompt a line at a time to keep the caret in view.
+
+        Returns a (row, column) tuple of where the caret is in view.
+        """
+        line, column = self._wrap.locate(self._player.typed_length)
+        self._first_line = self._wrap.first_visible(line, self._layout.lines)
+        return line - self._first_line, column
+
+    def visible_lines(self):
+        """
+        Get the indexes of the wrapped lines in view, top first.
+
+        Returns a range.
+        """
+        return range(
+            self._first_line,
+            min(self._first_line + self._layout.lines, len(self._wrap)),
+        )
+
+    def underline_runs(self):
+        """
+        Find which typed characters to underline and where.
+
+        Returns a list of (first, last, x, y) tuples, one per run of typed
+        characters drawn next to each other, where first and last are the
+        indexes of the first character and after the last character, and
+        (x, y) is where the first underline starts.
+        """
+        layout = self._layout
+        typed = self._player.typed_length
+        if self._wrap is None:
+            first = layout.first_visible(typed)
+            return [
+                (
+                    first,
+                    typed,
+                    layout.underline_x(first, typed),
+                    layout.underline_y,
+                )
+            ]
+        runs = []
+        for row in range(layout.lines):
+            if self._first_line + row >= len(self._wrap):
+                break
+            start, end = self._wrap.line(self._first_line + row)
+            if start >= typed:
+                break
+            runs.append((start, min(end, typed), *layout.underline_at(row, 0)))
+        return runs
+
+    def caret_at(self, position):
+        """
+        Find the rectangle of a caret before a character of the prompt.
+
+        Args:
+            position: int representing the index of the character
+
+        Returns an [x, y, width, height] list, or None if the character's
+        wrapped line is out of view.
+        """
+        layout = self._layout
+        if self._wrap is None:
+            x, y, width, height = layout.caret
+            offset = (position - self._player.typed_length) * self._letter_width
+            return [x + offset, y, width, height]
+        line, column = self._wrap.locate(position)
+        if not 0 <= line - self._first_line < layout.lines:
+            return None
+        return layout.caret_at(line - self._first_line, column)
+
+
+class GUIView(WindowView):
     """
-    Subclass of TypeRaceView that implements the view for by creating a
+    Subclass of WindowView that implements the view for by creating a
     graphical user interface.
 
     Attributes:
         _style: dict containing style settings for GUI view
         _screen: pygame display object representing the GUI's window
         _font: pygame font object representing the chosen font
-        _letter_width: int representing the length of each character of the
-            font in pixels
+        _prompt_surface: Surface of the whole prompt on one line, rendered
+            when first drawn and kept until the font changes, or None
+        _line_surfaces: dict mapping the wrapped lines in view to their
+            rendered Surfaces
+        _standings_panel: StandingsPanel of a multiplayer race, or None
     """
 
-    def __init__(self, player):
+    def __init__(self, player, settings=None):
         """
         Initialize the game view with player data and style settings.
 
-        Sets up the Pygame environment, loads style configuration,
-        creates the game window, initializes the font, and calculates
-        character width for alignment purposes.
+        Starts the display and font subsystems of Pygame, loads style
+        configuration, creates and shows the game window, then initializes
+        the font and lays out the window.
 
         Args:
             player: The player object containing game state information.
+            settings: Settings whose window size and font size override the
+                style settings, or None to use the style settings as they are.
         """
         # Get the player object from the abstract base class
         super().__init__(player)
-        # Start pygame
-        pygame.init()
+        # Start only the pygame subsystems the game uses. pygame.init() would
+        # also start audio and joysticks, which can take longer than the rest
+        # of startup put together.
+        pygame.display.init()
+        pygame.font.init()
         # Get the style settings dict
-        self._style = style_settings
+        self._style = load_style(settings)
 
         # Set up pygame window according to settings
         self._screen = pygame.display.set_mode(
-            (self._style["window_width"], self._style["window_height"])
+            (self._style["window_width"], self._style["window_height"]),
+            pygame.RESIZABLE,
         )
         pygame.display.set_caption(self._style["window_caption"])
+        # Show the empty window straight away, before loading the font
+        self._screen.fill(self._style["background_color"])
+        pygame.display.flip()
 
-        # Set up font attribute
-        self._font = pygame.font.Font(
-            self._style["font_path"], self._style["font_size"]
+        self._font = None
+        self._prompt_surface = None
+        self._line_surfaces = {}
+        self._standings_panel = None
+        self.update_layout()
+
+    def update_layout(self):
+        """
+        Lay the window out again if it was resized, and load the font at a
+        new size if the scale changed, e.g. when the window moved to a HiDPI
+        screen. The prompt is wrapped again only if the number of columns
+        changed. Does nothing otherwise, so it is cheap to call every frame.
+        """
+        size = self._screen.get_size()
+        scale = window_scale(
+            self._style["ui_scale"],
+            size[0],
+            pygame.display.get_window_size()[0],
         )
-        # Determine width of characters with surface that is never displayed
-        letter_surface = self._font.render("a", True, (255, 255, 255))
-        self._letter_width = letter_surface.get_width()
+        layout = self._layout
+        if layout is not None and layout.size == size and layout.scale == scale:
+            return
+        if layout is None or layout.scale != scale:
+            self._font = pygame.font.Font(
+                self._style["font_path"],
+                round(self._style["font_size"] * scale),
+            )
+            # Determine width of characters with surface that is never
+            # displayed
+            letter_surface = self._font.render("a", True, (255, 255, 255))
+            self._letter_width = letter_surface.get_width()
+            self._prompt_surface = None
+        self._layout = Layout(
+            size, scale, self._letter_width, self._style["prompt_lines"]
+        )
+        self._wrap = self.wrap_prompt(self._wrap, self._layout)
+        self._line_surfaces.clear()
+        self._standings_panel = self.standings_panel()
 
     def text(self):
         """
         Render the main prompt text centered on the screen.
 
-        Fills the background with the specified color, renders the full prompt
+        Fills the background with the specified color, draws the full prompt
         text, and shifts it horizontally based on the number of typed
         characters. Draws a white rectangle to represent the current typing
-        position (caret).
+        position (caret). The prompt is only rendered again when the font
+        changes.
         """
         # Draw background
         self._screen.fill(self._style["background_color"])
+        if self._wrap is not None:
+            self.wrapped_text()
+            return
         # Draw text
-        text = self._font.render(
-            self._player.prompt_text, False, self._style["text_color"]
-        )
-        move = (
-            len(self._player.typed_text) * self._letter_width
-        )  # how much letters shift
+        if self._prompt_surface is None:
+            self._prompt_surface = self._font.render(
+                self._player.prompt_text, False, self._style["text_color"]
+            )
+        layout = self._layout
         self._screen.blit(
-            text,
+            self._prompt_surface,
             (
-                (self._style["window_width"]) / 2 - move,
-                (self._style["window_height"]) / 2,
+                layout.char_x(0, self._player.typed_length),
+                layout.prompt_y,
             ),
         )
         # Draw rectangle cursor
+        pygame.draw.rect(
+            self._screen, self._style["cursor_color"], layout.caret
+        )
+
+    def wrapped_text(self):
+        """
+        Render the lines of the wrapped prompt in view and the caret. Lines
+        are rendered when they scroll into view and kept until they scroll
+        out, so the work per frame depends only on the number of lines shown.
+        """
+        layout = self._layout
+        prompt = self._player.prompt_text
+        caret_row, column = self.scroll()
+        visible = self.visible_lines()
+        for index in [i for i in self._line_surfaces if i not in visible]:
+            del self._line_surfaces[index]
+        for row, index in enumerate(visible):
+            surface = self._line_surfaces.get(index)
+            if surface is None:
+                start, end = self._wrap.line(index)
+                surface = self._line_surfaces[index] = self._font.render(
+                    prompt[start:end], False, self._style["text_color"]
+                )
+            self._screen.blit(surface, (layout.cell_x(0), layout.line_y(row)))
         pygame.draw.rect(
             self._screen,
             self._style["cursor_color"],
-            [415 - self._letter_width, 300, 2, 40],
-            1,
+            layout.caret_at(caret_row, column),
         )
 
     def underlines(self):
@@ -121,26 +360,26 @@ class GUIView(TypeRaceView):
         Draw underlines beneath typed characters to indicate correctness.
 
         Renders red underlines for mistakes and white underlines for correct
-        letters, based on the player's mistake index list. Each underline is
-        positioned relative to the typed text and adjusted as more letters are
-        typed.
-        """
-        # Creating either red or white underline under typed letters
-        add = self._letter_width  # how much the letters need to shift
-        mistakes = self._player.mistake_indexes[: len(self._player.typed_text)][
-            ::-1
-        ]  # formatting mistakes array
-        for i in range(len(self._player.typed_text)):  # prints all lines
-            color = self._style["correct_underline"]
-            if mistakes[i]:
-                color = self._style["mistake_underline"]
-            pygame.draw.rect(
-                self._screen,
-                color,
-                [417 - self._letter_width - add, 338, self._letter_width, 2],
-                19,
-            )
-            add += self._letter_width
+        letters, based on the player's mistake index list. Only the typed
+        characters still in the window are underlined.
+        """
+        height = self._layout.underline_height
+        mistakes = self._player.mistake_indexes
+        for first, last, x, y in self.underline_runs():
+            for i in range(first, last):
+                color = self._style["correct_underline"]
+                if mistakes[i]:
+                    color = self._style["mistake_underline"]
+                pygame.draw.rect(
+                    self._screen,
+                    color,
+                    [
+                        x + (i - first) * self._letter_width,
+                        y,
+                        self._letter_width,
+                        height,
+                    ],
+                )
 
     def info(self):
         """
@@ -149,52 +388,136 @@ class GUIView(TypeRaceView):
         Renders and places the WPM and countdown timer text in the top-left
         corner of the screen using the game's font and color settings.
         """
-        # The following is for the timer
-        time = f"{self._player.time_remaining} seconds left"
+        hud = self._layout.hud
+        # The following is for the timer, rounded up to whole seconds
+        seconds_left = max(0, math.ceil(self._player.time_remaining))
+        time = f"{seconds_left} seconds left"
         timer = self._font.render(time, False, self._style["text_color"])
-        self._screen.blit(
-            timer,
-            (
-                20,
-                20,
-            ),
-        )
-        # For player's wpm
-        wpm_text = f"{self._player.wpm} WPM"
+        self._screen.blit(timer, hud[0])
+        # For player's wpm, with the wpm over the last few seconds
+        wpm_text = f"{self._player.wpm} WPM ({self._player.instant_wpm} now)"
         wpm = self._font.render(wpm_text, False, self._style["text_color"])
-        self._screen.blit(
-            wpm,
-            (
-                20,
-                60,
-            ),
-        )
+        self._screen.blit(wpm, hud[1])
         # For opponent's wpm
         if hasattr(self._player, "opponent_wpm"):  # If multiplayer game
             color = self._style["text_color"]
             if self._player.opponent_wpm > self._player.wpm:
                 color = self._style["alternate_text_color"]
             opp_wpm_text = f"{self._player.opponent_wpm} Opponent WPM"
+            if self._player.opponent_detector.flagged:
+                opp_wpm_text += " (suspicious)"
+                color = self._style["alternate_text_color"]
             opp_wpm = self._font.render(opp_wpm_text, False, color)
-            self._screen.blit(
-                opp_wpm,
-                (
-                    20,
-                    100,
-                ),
+            self._screen.blit(opp_wpm, hud[2])
+
+    def standings(self):
+        """
+        Draw the position, progress and WPM of every racer that fits in the
+        standings area, re-rendering only rows that changed.
+        """
+        panel = self._standings_panel
+        x, y, _, height = self._layout.standings
+        images = panel.images(
+            self._player.standings, height // panel.row_height
+        )
+        for row, image in enumerate(images):
+            self._screen.blit(image, (x, y + row * panel.row_height))
+
+    def ghost(self):
+        """
+        Draw the caret of the ghost being raced against, and progress bars
+        comparing the player with the ghost.
+
+        The ghost caret sits in the prompt at the character the ghost has
+        reached, if that is in view.
+        """
+        layout = self._layout
+        ghost_position = self._player.ghost_position
+        typed_length = self._player.typed_length
+        caret = self.caret_at(ghost_position)
+        if caret is not None:
+            pygame.draw.rect(self._screen, self._style["ghost_color"], caret)
+
+        # Progress bars along the bottom of the window
+        prompt_length = len(self._player.prompt_text)
+        for top, position, color in zip(
+            layout.bar_rows,
+            (typed_length, ghost_position),
+            (self._style["progress_color"], self._style["ghost_color"]),
+        ):
+            pygame.draw.rect(
+                self._screen,
+                color,
+                [
+                    layout.bar_x,
+                    top,
+                    layout.bar_width * position // prompt_length,
+                    layout.bar_height,
+                ],
             )
 
-    def draw(self):
+    def summary(self, lines):
         """
-        Draw all visual elements of the game screen.
+        Show a summary screen after the race until the user presses a key or
+        closes the window.
 
-        Clears the screen and renders the prompt text, correctness underlines,
-        and player information (WPM and timer). Updates the display to show the
-        changes.
+        Args:
+            lines: list of strings to show, one per line
+        """
+        self.update_layout()
+        layout = self._layout
+        font = pygame.font.Font(
+            self._style["font_path"],
+            round(self._style["summary_font_size"] * layout.scale),
+        )
+        self._screen.fill(self._style["background_color"])
+        x, y = layout.hud[0]
+        for row, line in enumerate(lines):
+            surface = font.render(line, True, self._style["text_color"])
+            self._screen.blit(surface, (x, y + row * font.get_linesize()))
+        pygame.display.flip()
+
+        # Keys typed as the race ended shouldn't close the summary
+        pygame.event.clear()
+        while True:
+            event = pygame.event.wait()
+            if event.type in (pygame.QUIT, pygame.KEYDOWN):
+                return
+
+    def close(self):
+        """
+        Close the window.
+        """
+        pygame.display.quit()
+
+    def render(self):
         """
+        Draw all visual elements of the game screen without showing them.
 
+        Lays the window out again if it was resized, clears the screen and
+        renders the prompt text, correctness underlines, player information
+        (WPM and timer) and the ghost, if there is one.
+        """
+        self.update_layout()
         self.text()  # text and square around character
         self.underlines()  # Makes underlines
         self.info()  # Makes timer and wpm
+        if self._standings_panel is not None:  # If multiplayer game
+            self.standings()
+        if hasattr(self._player, "ghost_position"):  # If racing a ghost
+            self.ghost()
+
+    def screenshot(self):
+        """
+        Draw the game screen and return a copy of it as a pygame Surface.
+        """
+        self.render()
+        return self._screen.copy()
 
+    def draw(self):
+        """
+        Draw all visual elements of the game screen and update the display to
+        show them.
+        """
+        self.render()
         pygame.display.flip()
@@ -0,0 +1,83 @@
+"""
+Word wrapping of the prompt into lines, computed once so the views can find
+the line and column of any character without wrapping the text again.
+"""
+
+from bisect import bisect_right
+
+
+class WrapIndex:
+    """
+    The prompt wrapped into lines of at most a number of columns, breaking
+    after spaces and splitting words too long for a line.
+
+    Attributes:
+        columns: int representing the most characters on a line
+        _length: int representing the number of characters in the text
+        _starts: list of the index of the first character of each line
+    """
+
+    def __init__(self, text, columns):
+        """
+        Wrap text into lines.
+
+        Args:
+            text: string to wrap
+            columns: int representing the most characters on a line
+        """
+        self.columns = max(1, columns)
+        self._length = len(text)
+        self._starts = [0]
+        start = 0
+        while start + self.columns < self._length:
+            end = start + self.columns
+            # Break after the last space that fits, keeping the space at the
+            # end of the line, or split a word too long for a line
+            space = text.rfind(" ", start, end)
+            start = space + 1 if space >= start else end
+            self._starts.append(start)
+
+    def __len__(self):
+        """Return the number of lines"""
+        return len(self._starts)
+
+    def line(self, index):
+        """
+        Find the characters on a line.
+
+        Args:
+            index: int representing the index of the line
+
+        Returns a (start, end) tuple of the index of the first character of
+        the line and the index after its last character.
+        """
+        if index + 1 < len(self._starts):
+            return self._starts[index], self._starts[index + 1]
+        return self._starts[index], self._length
+
+    def locate(self, offset):
+        """
+        Find where a character is in the wrapped text. An offset at the end
+        of the text is put after the last character of the last line.
+
+        Args:
+            offset: int representing the index of the character
+
+        Returns a (line, column) tuple of ints.
+        """
+        line = bisect_right(self._starts, offset) - 1
+        return line, offset - self._starts[line]
+
+    def first_visible(self, line, count):
+        """
+        Find the first line to show so that a line is in view, keeping one
+        line before it for context. The view scrolls a line at a time as the
+        line moves down.
+
+        Args:
+            line: int representing the index of the line to show
+            count: int representing how many lines are shown
+
+        Returns an int representing the index of the first line to show.
+        """
+        return max(0, min(line - 1, len(self._starts) - count))